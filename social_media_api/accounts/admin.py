@@ -1,15 +1,26 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, UserProfile
+from .models import CustomUser, UserProfile, Follow, AccountDeletion
+
+
+class FollowerInline(admin.TabularInline):
+    model = Follow
+    fk_name = 'followed'
+    raw_id_fields = ('follower',)
+    readonly_fields = ('created_at',)
+    extra = 0
+    verbose_name = 'Follower'
+    verbose_name_plural = 'Followers'
 
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'is_verified')
     list_filter = ('is_staff', 'is_superuser', 'is_verified', 'is_active')
     fieldsets = UserAdmin.fieldsets + (
-        ('Social Media Info', {'fields': ('bio', 'profile_picture', 'followers')}),
+        ('Social Media Info', {'fields': ('bio', 'profile_picture')}),
         ('Verification', {'fields': ('is_verified',)}),
     )
+    inlines = [FollowerInline]
     add_fieldsets = UserAdmin.add_fieldsets + (
         ('Social Media Info', {'fields': ('bio', 'profile_picture')}),
     )
@@ -20,5 +31,15 @@ class UserProfileAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'user__email', 'location')
 
 
+class AccountDeletionAdmin(admin.ModelAdmin):
+    list_display = (
+        'username', 'user_id', 'status', 'current_step', 'rows_deleted', 'attempts', 'requested_at', 'completed_at'
+    )
+    list_filter = ('status',)
+    search_fields = ('username',)
+    readonly_fields = ('requested_at', 'updated_at', 'completed_at')
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
-admin.site.register(UserProfile, UserProfileAdmin)
\ No newline at end of file
+admin.site.register(UserProfile, UserProfileAdmin)
+admin.site.register(AccountDeletion, AccountDeletionAdmin)
\ No newline at end of file
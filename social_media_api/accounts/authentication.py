@@ -0,0 +1,54 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+TOKEN_CACHE_PREFIX = 'auth:token:'
+
+
+def token_cache_key(key):
+    """Return the cache key for a token without storing the raw secret."""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f"{TOKEN_CACHE_PREFIX}{digest}"
+
+
+def invalidate_token(key):
+    """Drop a single token from the cache."""
+    cache.delete(token_cache_key(key))
+
+
+def invalidate_user_tokens(user):
+    """Drop every cached token belonging to a user."""
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches the token -> user lookup.
+
+    Entries live for TOKEN_CACHE_TIMEOUT seconds and are dropped as soon as
+    the token is deleted or its user is saved (see accounts.models).
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+
+        if token is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+            cache.set(cache_key, token, getattr(settings, 'TOKEN_CACHE_TIMEOUT', 300))
+
+        return (token.user, token)
@@ -0,0 +1,92 @@
+"""
+Chunked account deletion.
+
+Deleting a user through Django's collector cascades every post, like,
+comment and notification in one transaction. Instead, the account is
+disabled right away and its rows are purged later in small batches by
+``python manage.py process_account_deletions``.
+"""
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .models import AccountDeletion, CustomUser, Follow
+
+
+def request_account_deletion(user):
+    """Disable the account immediately and queue its data for purging."""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        Token.objects.filter(user=user).delete()
+        deletion, created = AccountDeletion.objects.get_or_create(
+            user_id=user.id,
+            defaults={'username': user.username}
+        )
+    return deletion
+
+
+def deletion_steps(user_id):
+    """
+    Return (name, queryset) pairs in purge order.
+
+    Children are removed before their parents so that every batch only
+    cascades to a bounded number of rows.
+    """
+    from notifications.models import Notification
+    from posts.models import Comment, Like, Post, PostHashtag, PostMention
+
+    CommentLike = Comment.likes.through
+    own_posts = Q(post__author_id=user_id)
+
+    return [
+        ('notifications', Notification.objects.filter(
+            Q(recipient_id=user_id) | Q(actor_id=user_id)
+        )),
+        ('follows', Follow.objects.filter(
+            Q(follower_id=user_id) | Q(followed_id=user_id)
+        )),
+        ('comment_likes', CommentLike.objects.filter(
+            Q(customuser_id=user_id)
+            | Q(comment__author_id=user_id)
+            | Q(comment__post__author_id=user_id)
+        )),
+        ('post_likes', Like.objects.filter(Q(user_id=user_id) | own_posts)),
+        ('mentions', PostMention.objects.filter(Q(user_id=user_id) | own_posts)),
+        ('hashtags', PostHashtag.objects.filter(own_posts)),
+        # Newest first so replies go before the comments they answer.
+        ('comments', Comment.objects.filter(
+            Q(author_id=user_id) | own_posts
+        ).order_by('-id')),
+        ('posts', Post.objects.filter(author_id=user_id)),
+    ]
+
+
+def purge_account(deletion, chunk_size=500):
+    """Delete everything belonging to a queued account, batch by batch."""
+    deletion.status = 'running'
+    deletion.save(update_fields=['status', 'updated_at'])
+
+    user = CustomUser.objects.filter(pk=deletion.user_id).first()
+    if user is not None:
+        for name, queryset in deletion_steps(deletion.user_id):
+            deletion.current_step = name
+            while True:
+                ids = list(queryset.values_list('pk', flat=True)[:chunk_size])
+                if not ids:
+                    break
+                with transaction.atomic():
+                    deleted, _ = queryset.model.objects.filter(pk__in=ids).delete()
+                    deletion.rows_deleted += deleted
+                    deletion.save(update_fields=['current_step', 'rows_deleted', 'updated_at'])
+
+        deletion.current_step = 'user'
+        deleted, _ = user.delete()
+        deletion.rows_deleted += deleted
+
+    deletion.status = 'completed'
+    deletion.completed_at = timezone.now()
+    deletion.save()
+    return deletion
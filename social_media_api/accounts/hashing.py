@@ -0,0 +1,22 @@
+"""
+Password hashing helpers for process pools.
+
+This module must not import any models: worker processes started with the
+"spawn" method import it before Django is set up.
+"""
+
+import os
+
+import django
+from django.contrib.auth.hashers import make_password
+
+
+def init_worker(settings_module):
+    """Configure Django inside a freshly started worker process."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def hash_passwords(passwords):
+    """Hash a batch of raw passwords; blank ones become unusable."""
+    return [make_password(password or None) for password in passwords]
@@ -0,0 +1,60 @@
+"""
+Django management command to export one user's data without loading it into memory.
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.export import EXPORT_CHUNK_SIZE, export_sections, stream_csv, stream_ndjson
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Stream a user's posts, comments, likes, follows and notifications to NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='NDJSON file (default: stdout), or a directory for one CSV file per section'
+        )
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        """Execute the export command."""
+        user = CustomUser.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        chunk_size = options['chunk_size']
+        output = options['output']
+
+        if options['format'] == 'ndjson':
+            handle = self.stdout if output == '-' else open(output, 'w', encoding='utf-8')
+            try:
+                lines = self.write_lines(handle, stream_ndjson(user.id, chunk_size=chunk_size))
+            finally:
+                if handle is not self.stdout:
+                    handle.close()
+            self.stderr.write(self.style.SUCCESS(f'Exported {lines} rows for {user.username}'))
+            return
+
+        if output == '-':
+            raise CommandError('--output must be a directory for CSV exports')
+        os.makedirs(output, exist_ok=True)
+        for section, queryset in export_sections(user.id).items():
+            path = os.path.join(output, f'{section}.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as handle:
+                lines = self.write_lines(handle, stream_csv(queryset, chunk_size))
+            self.stderr.write(f'{section}: {lines - 1} rows -> {path}')
+        self.stderr.write(self.style.SUCCESS(f'Exported {user.username} to {output}'))
+
+    def write_lines(self, handle, lines):
+        count = 0
+        for line in lines:
+            handle.write(line)
+            count += 1
+        return count
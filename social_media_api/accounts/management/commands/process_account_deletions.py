@@ -0,0 +1,78 @@
+"""
+Django management command to purge the data of accounts queued for deletion.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.deletion import purge_account
+from accounts.models import AccountDeletion
+
+
+class Command(BaseCommand):
+    help = 'Purge disabled accounts queued for deletion in bounded chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=0,
+            help='Maximum number of accounts to process (0 = all queued)'
+        )
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Keep running, polling for new deletions every SECONDS'
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also retry failed deletions now, including those out of attempts'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the purge command."""
+        while True:
+            self.process_queue(options['chunk_size'], options['limit'], options['retry_failed'])
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+
+    def process_queue(self, chunk_size, limit, retry_failed=False):
+        # Runs that were interrupted or failed are resumed: every step is idempotent.
+        max_attempts = getattr(settings, 'ACCOUNT_DELETION_MAX_ATTEMPTS', 5)
+        if retry_failed:
+            retry = Q(status='failed')
+        else:
+            retry = Q(status='failed', attempts__lt=max_attempts, retry_at__lte=timezone.now())
+        queue = AccountDeletion.objects.filter(Q(status__in=['pending', 'running']) | retry)
+        if limit:
+            queue = queue[:limit]
+
+        for deletion in queue:
+            self.stdout.write(f'Purging account {deletion.username} ({deletion.user_id})...')
+            try:
+                purge_account(deletion, chunk_size=chunk_size)
+            except Exception as exc:
+                # Transient errors (lock timeouts, deadlocks) clear up: back off and retry.
+                deletion.status = 'failed'
+                deletion.error = str(exc)
+                deletion.attempts += 1
+                deletion.retry_at = timezone.now() + timedelta(minutes=2 ** (deletion.attempts - 1))
+                deletion.save(update_fields=['status', 'error', 'attempts', 'retry_at', 'updated_at'])
+                if deletion.attempts < max_attempts:
+                    self.stderr.write(self.style.ERROR(f'Failed, retrying after {deletion.retry_at}: {exc}'))
+                else:
+                    self.stderr.write(self.style.ERROR(f'Failed {deletion.attempts} times, giving up: {exc}'))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {deletion.rows_deleted} rows for {deletion.username}'
+            ))
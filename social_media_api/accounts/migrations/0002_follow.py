@@ -0,0 +1,65 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_followers(apps, schema_editor):
+    """Move existing edges from the implicit followers table into Follow."""
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    Follow = apps.get_model('accounts', 'Follow')
+    Through = CustomUser.followers.through
+    # A row (from_customuser=A, to_customuser=B) means B follows A.
+    edges = Through.objects.values_list('from_customuser_id', 'to_customuser_id')
+    batch = []
+    for followed_id, follower_id in edges.iterator(chunk_size=2000):
+        batch.append(Follow(follower_id=follower_id, followed_id=followed_id))
+        if len(batch) >= 2000:
+            Follow.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    Follow.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('followed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower_relations', to=settings.AUTH_USER_MODEL)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following_relations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(copy_followers, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='followers',
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='followers',
+            field=models.ManyToManyField(blank=True, related_name='following', through='accounts.Follow', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['followed', '-created_at'], name='accounts_fo_followe_571ebf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['follower', '-created_at'], name='accounts_fo_followe_592424_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='follow',
+            unique_together={('follower', 'followed')},
+        ),
+    ]
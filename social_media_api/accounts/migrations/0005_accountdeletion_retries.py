@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_customuser_profile_picture_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accountdeletion',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='accountdeletion',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
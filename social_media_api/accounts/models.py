@@ -1,6 +1,15 @@
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
+from django.utils.functional import cached_property
 from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts.renditions import needs_renditions, schedule_renditions
+
+from .authentication import invalidate_token, invalidate_user_tokens
 
 
 class CustomUser(AbstractUser):
@@ -12,9 +21,12 @@ class CustomUser(AbstractUser):
         null=True,
         default='profile_pictures/default.png'
     )
+    profile_picture_renditions = models.JSONField(default=dict, blank=True, editable=False)
     followers = models.ManyToManyField(
         'self',
         symmetrical=False,
+        through='Follow',
+        through_fields=('followed', 'follower'),
         related_name='following',
         blank=True
     )
@@ -24,11 +36,13 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
     
-    @property
+    # cached_property so list views can fill these with annotations
+    # (see with_follow_counts) instead of one COUNT per user.
+    @cached_property
     def followers_count(self):
         return self.followers.count()
     
-    @property
+    @cached_property
     def following_count(self):
         return self.following.count()
     
@@ -54,6 +68,112 @@ class CustomUser(AbstractUser):
         """Check if current user is followed by the given user."""
         return self.followers.filter(id=user.id).exists()
     
+    def relationships(self, user_ids):
+        """
+        Return {user_id: {'following', 'followed_by', 'mutual'}} for many users.
+        
+        Uses two queries over the Follow table regardless of how
+        many ids are passed.
+        """
+        following = set(
+            Follow.objects.filter(
+                follower_id=self.id,
+                followed_id__in=user_ids
+            ).values_list('followed_id', flat=True)
+        )
+        followed_by = set(
+            Follow.objects.filter(
+                followed_id=self.id,
+                follower_id__in=user_ids
+            ).values_list('follower_id', flat=True)
+        )
+        return {
+            user_id: {
+                'following': user_id in following,
+                'followed_by': user_id in followed_by,
+                'mutual': user_id in following and user_id in followed_by,
+            }
+            for user_id in user_ids
+        }
+
+
+class Follow(models.Model):
+    """A timestamped follow edge: ``follower`` follows ``followed``."""
+    follower = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='following_relations'
+    )
+    followed = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='follower_relations'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['follower', 'followed']
+        ordering = ['-created_at']
+        indexes = [
+            # Back the cursor-paginated follower/following lists.
+            models.Index(fields=['followed', '-created_at']),
+            models.Index(fields=['follower', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.follower_id} follows {self.followed_id}"
+
+
+def _follow_count(field, outer='pk'):
+    edges = (
+        Follow.objects.filter(**{field: OuterRef(outer)})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(edges), Value(0))
+
+
+def with_follow_counts(queryset, viewer=None):
+    """
+    Annotate users with followers_count/following_count in the same query.
+    
+    With a ``viewer``, ``viewer_follows`` says whether they follow each user.
+    """
+    return queryset.annotate(**follow_count_annotations(viewer=viewer))
+
+
+def follow_count_annotations(prefix=None, viewer=None):
+    """
+    The annotations behind ``with_follow_counts``, as a dict.
+    
+    With a ``prefix`` they count follows of the user behind that relation
+    instead, under prefixed names: ``follow_count_annotations('author')``
+    gives ``author_followers_count``, ``author_following_count`` and, with
+    a ``viewer``, ``author_viewer_follows``. Used by ``values()``
+    projections, which cannot prefetch the related user.
+    """
+    outer = prefix or 'pk'
+    name = f'{prefix}_%s' if prefix else '%s'
+    annotations = {
+        name % 'followers_count': _follow_count('followed', outer),
+        name % 'following_count': _follow_count('follower', outer),
+    }
+    if viewer is not None and viewer.is_authenticated:
+        annotations[name % 'viewer_follows'] = Exists(
+            Follow.objects.filter(follower_id=viewer.id, followed=OuterRef(outer))
+        )
+    return annotations
+
+
+def prefetch_users(lookup, viewer=None):
+    """Prefetch a user relation with its profile and follow counts in one query."""
+    return Prefetch(
+        lookup,
+        queryset=with_follow_counts(CustomUser.objects.select_related('user_profile'), viewer)
+    )
+
 
 class UserProfile(models.Model):
     """Extended profile information for users."""
@@ -67,4 +187,58 @@ class UserProfile(models.Model):
     birth_date = models.DateField(null=True, blank=True)
     
     def __str__(self):
-        return f"{self.user.username}'s Profile"
\ No newline at end of file
+        return f"{self.user.username}'s Profile"
+
+
+@receiver(post_delete, sender='authtoken.Token')
+def drop_cached_token(sender, instance, **kwargs):
+    """Forget a token as soon as it is deleted (logout, password change)."""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def drop_cached_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    """Refresh cached users after profile, password or status changes."""
+    if created or update_fields == frozenset(['last_login']):
+        return
+    invalidate_user_tokens(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def queue_profile_picture_renditions(sender, instance, **kwargs):
+    """Render resized variants of a new or changed profile picture off-request."""
+    if needs_renditions(instance, 'profile_picture', 'profile_picture_renditions'):
+        schedule_renditions(instance, 'profile_picture', 'profile_picture_renditions')
+
+
+class AccountDeletion(models.Model):
+    """Tracks the background purge of a disabled account's data."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    
+    # Plain ids rather than a foreign key: the user row is deleted last.
+    user_id = models.BigIntegerField(unique=True)
+    username = models.CharField(max_length=150)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    current_step = models.CharField(max_length=50, blank=True)
+    rows_deleted = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # Failed purges are retried with backoff (see process_account_deletions).
+    attempts = models.PositiveIntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['requested_at']
+        indexes = [
+            models.Index(fields=['status', 'requested_at']),
+        ]
+    
+    def __str__(self):
+        return f"Deletion of {self.username} ({self.status})"
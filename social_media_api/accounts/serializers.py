@@ -2,7 +2,10 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate, get_user_model
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.authtoken.models import Token
-from .models import CustomUser, UserProfile
+from posts.renditions import RenditionsField, rendition_urls
+from social_media_api.lean import LeanSerializer, date_repr, datetime_repr, file_url
+
+from .models import CustomUser, UserProfile, Follow, follow_count_annotations
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -15,12 +18,14 @@ class UserSerializer(serializers.ModelSerializer):
     profile = UserProfileSerializer(source='user_profile', read_only=True)
     followers_count = serializers.IntegerField(read_only=True)
     following_count = serializers.IntegerField(read_only=True)
+    profile_picture_renditions = RenditionsField()
     
     class Meta:
         model = CustomUser
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name', 
-            'bio', 'profile_picture', 'followers_count', 'following_count',
+            'bio', 'profile_picture', 'profile_picture_renditions',
+            'followers_count', 'following_count',
             'date_joined', 'is_verified', 'profile'
         ]
         read_only_fields = ['date_joined', 'is_verified']
@@ -134,6 +139,8 @@ class UserFollowSerializer(serializers.ModelSerializer):
     
     def get_is_following(self, obj):
         """Check if the current user is following this user."""
+        if hasattr(obj, 'viewer_follows'):
+            return obj.viewer_follows
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return request.user.is_following(obj)
@@ -175,4 +182,114 @@ class UserFollowingSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = get_user_model()
-        fields = ['id', 'username', 'following_count', 'following']
\ No newline at end of file
+        fields = ['id', 'username', 'following_count', 'following']
+
+
+class FollowerSerializer(serializers.ModelSerializer):
+    """Serializer for one entry of a user's follower list."""
+    user = UserFollowSerializer(source='follower', read_only=True)
+    followed_at = serializers.DateTimeField(source='created_at', read_only=True)
+    
+    class Meta:
+        model = Follow
+        fields = ['user', 'followed_at']
+
+
+class FollowingSerializer(serializers.ModelSerializer):
+    """Serializer for one entry of the list of users someone follows."""
+    user = UserFollowSerializer(source='followed', read_only=True)
+    followed_at = serializers.DateTimeField(source='created_at', read_only=True)
+    
+    class Meta:
+        model = Follow
+        fields = ['user', 'followed_at']
+
+
+# values()-backed equivalents for list endpoints (see social_media_api.lean)
+
+USER_VALUES = (
+    'username', 'email', 'first_name', 'last_name', 'bio', 'profile_picture',
+    'profile_picture_renditions', 'date_joined', 'is_verified', 'user_profile__id',
+    'user_profile__website', 'user_profile__location', 'user_profile__birth_date'
+)
+
+
+def user_values(prefix):
+    """``values()`` lookups ``user_representation`` reads for a user relation."""
+    return (f'{prefix}_id', *(f'{prefix}__{field}' for field in USER_VALUES))
+
+
+def user_representation(row, prefix, request=None):
+    """``UserSerializer`` output for the ``prefix`` user of a projected row."""
+    user = f'{prefix}__'
+    profile = None
+    if row[f'{user}user_profile__id'] is not None:
+        profile = {
+            'website': row[f'{user}user_profile__website'],
+            'location': row[f'{user}user_profile__location'],
+            'birth_date': date_repr(row[f'{user}user_profile__birth_date']),
+        }
+    return {
+        'id': row[f'{prefix}_id'],
+        'username': row[f'{user}username'],
+        'email': row[f'{user}email'],
+        'first_name': row[f'{user}first_name'],
+        'last_name': row[f'{user}last_name'],
+        'bio': row[f'{user}bio'],
+        'profile_picture': file_url(row[f'{user}profile_picture'], request),
+        'profile_picture_renditions': rendition_urls(row[f'{user}profile_picture_renditions'], request),
+        'followers_count': row[f'{prefix}_followers_count'],
+        'following_count': row[f'{prefix}_following_count'],
+        'date_joined': datetime_repr(row[f'{user}date_joined']),
+        'is_verified': row[f'{user}is_verified'],
+        'profile': profile,
+    }
+
+
+class LeanUserFollowSerializer(LeanSerializer):
+    """``UserFollowSerializer`` output from ``values()`` rows."""
+    fields = ('id', 'username', 'profile_picture')
+
+    @classmethod
+    def annotations(cls, request=None):
+        return follow_count_annotations(viewer=request.user if request else None)
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'username': row['username'],
+            'profile_picture': file_url(row['profile_picture'], self.context.get('request')),
+            'followers_count': row['followers_count'],
+            'following_count': row['following_count'],
+            'is_following': row.get('viewer_follows', False),
+        }
+
+
+class LeanFollowerSerializer(LeanSerializer):
+    """``FollowerSerializer`` output from ``values()`` rows of Follow."""
+    relation = 'follower'
+    fields = ('id', 'created_at', 'follower_id', 'follower__username', 'follower__profile_picture')
+
+    @classmethod
+    def annotations(cls, request=None):
+        return follow_count_annotations(cls.relation, request.user if request else None)
+
+    def to_representation(self, row):
+        user = self.relation
+        return {
+            'user': {
+                'id': row[f'{user}_id'],
+                'username': row[f'{user}__username'],
+                'profile_picture': file_url(row[f'{user}__profile_picture'], self.context.get('request')),
+                'followers_count': row[f'{user}_followers_count'],
+                'following_count': row[f'{user}_following_count'],
+                'is_following': row.get(f'{user}_viewer_follows', False),
+            },
+            'followed_at': datetime_repr(row['created_at']),
+        }
+
+
+class LeanFollowingSerializer(LeanFollowerSerializer):
+    """``FollowingSerializer`` output from ``values()`` rows of Follow."""
+    relation = 'followed'
+    fields = ('id', 'created_at', 'followed_id', 'followed__username', 'followed__profile_picture')
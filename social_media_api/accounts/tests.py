@@ -1,3 +1,446 @@
-from django.test import TestCase
+"""
+Tests for the accounts app.
+"""
 
-# Create your tests here.
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from notifications.models import Notification
+from posts.models import Comment, Like, Post
+from social_media_api.testing import QueryBudgetMixin
+
+from .authentication import token_cache_key
+from .models import AccountDeletion, CustomUser, Follow, UserProfile, prefetch_users, with_follow_counts
+from .serializers import (
+    FollowerSerializer,
+    FollowingSerializer,
+    LeanFollowerSerializer,
+    LeanFollowingSerializer,
+    LeanUserFollowSerializer,
+    UserFollowSerializer,
+)
+from .views import DataExportView
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    """Tests for the cached token -> user lookup."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='alice',
+            password='S3cure-pass-123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_token_query(self):
+        """Only the first request should hit the token table."""
+        url = reverse('notification_count')
+        self.client.get(url)
+        self.assertIsNotNone(cache.get(token_cache_key(self.token.key)))
+
+        with self.assertNumQueries(2):  # unread count + total count
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token not-a-real-token')
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.get(reverse('profile'))
+        response = self.client.post(reverse('logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_change_password_rotates_cached_token(self):
+        self.client.get(reverse('profile'))
+        response = self.client.put(reverse('change_password'), {
+            'old_password': 'S3cure-pass-123',
+            'new_password': 'An0ther-pass-456',
+            'new_password2': 'An0ther-pass-456',
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        new_key = Token.objects.get(user=self.user).key
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {new_key}')
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(reverse('profile'))
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ProvisionUsersCommandTests(APITestCase):
+    """Tests for the provision_users management command."""
+
+    def test_provisions_users_and_skips_duplicates(self):
+        CustomUser.objects.create_user(username='existing', email='taken@example.com')
+        rows = [
+            {'username': 'bob', 'email': 'bob@example.com', 'password': 'pw-bob-123'},
+            {'username': 'carol', 'email': 'carol@example.com', 'password': 'pw-carol-123'},
+            {'username': 'bob', 'email': 'other@example.com', 'password': 'x'},
+            {'username': 'existing', 'email': 'new@example.com', 'password': 'x'},
+            {'username': 'dave', 'email': 'taken@example.com', 'password': 'x'},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as handle:
+            handle.write('\n'.join(json.dumps(row) for row in rows))
+        self.addCleanup(os.remove, handle.name)
+
+        call_command('provision_users', handle.name, chunk_size=2, workers=1, stdout=StringIO())
+
+        bob = CustomUser.objects.get(username='bob')
+        self.assertTrue(bob.check_password('pw-bob-123'))
+        self.assertEqual(CustomUser.objects.count(), 3)
+        self.assertTrue(UserProfile.objects.filter(user=bob).exists())
+        self.assertTrue(Token.objects.filter(user__username='carol').exists())
+
+
+class RelationshipStatusViewTests(APITestCase):
+    """Tests for the batch relationship-status endpoint."""
+
+    def setUp(self):
+        self.viewer = CustomUser.objects.create_user(username='viewer', password='pw')
+        self.followed = CustomUser.objects.create_user(username='followed', password='pw')
+        self.fan = CustomUser.objects.create_user(username='fan', password='pw')
+        self.friend = CustomUser.objects.create_user(username='friend', password='pw')
+        self.viewer.follow(self.followed)
+        self.fan.follow(self.viewer)
+        self.viewer.follow(self.friend)
+        self.friend.follow(self.viewer)
+        self.client.force_authenticate(self.viewer)
+
+    def test_returns_flags_for_every_requested_user(self):
+        ids = [self.followed.id, self.fan.id, self.friend.id, 9999]
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('user_relationships'),
+                {'ids': ','.join(str(user_id) for user_id in ids)}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {row['user_id']: row for row in response.data['results']}
+        self.assertEqual(list(results), ids)
+        self.assertTrue(results[self.followed.id]['following'])
+        self.assertFalse(results[self.followed.id]['followed_by'])
+        self.assertTrue(results[self.fan.id]['followed_by'])
+        self.assertFalse(results[self.fan.id]['following'])
+        self.assertTrue(results[self.friend.id]['mutual'])
+        self.assertFalse(results[9999]['following'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_rejects_invalid_ids(self):
+        for ids in ('1,abc', '0', '-3', str(2 ** 63), '99999999999999999999'):
+            response = self.client.get(reverse('user_relationships'), {'ids': ids})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, ids)
+            self.assertIn('comma-separated list of user IDs', response.data['error'])
+
+
+class FollowListViewTests(APITestCase):
+    """Tests for the cursor-paginated follower/following lists."""
+
+    def setUp(self):
+        self.star = CustomUser.objects.create_user(username='star', password='pw')
+        self.fans = [
+            CustomUser.objects.create_user(username=f'fan{i}', password='pw')
+            for i in range(5)
+        ]
+        for fan in self.fans:
+            fan.follow(self.star)
+        self.client.force_authenticate(self.star)
+
+    def test_followers_are_cursor_paginated_newest_first(self):
+        url = reverse('user_followers', args=[self.star.id])
+        response = self.client.get(url, {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        usernames = [row['user']['username'] for row in response.data['results']]
+        self.assertEqual(usernames, ['fan4', 'fan3', 'fan2'])
+        self.assertIn('followed_at', response.data['results'][0])
+
+        response = self.client.get(response.data['next'])
+        usernames = [row['user']['username'] for row in response.data['results']]
+        self.assertEqual(usernames, ['fan1', 'fan0'])
+        self.assertIsNone(response.data['next'])
+
+    def test_following_list(self):
+        url = reverse('user_following', args=[self.fans[0].id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['user']['username'], 'star')
+
+
+class LeanFollowSerializerTests(APITestCase):
+    """The lean follow serializers render exactly what the model serializers do."""
+
+    def setUp(self):
+        self.star = CustomUser.objects.create_user(username='star', password='pw')
+        self.fans = [CustomUser.objects.create_user(username=f'fan{i}', password='pw') for i in range(4)]
+        for fan in self.fans:
+            fan.follow(self.star)
+        self.star.follow(self.fans[0])
+        self.fans[1].follow(self.fans[2])
+        CustomUser.objects.filter(pk=self.fans[3].pk).update(profile_picture='')
+
+    def request(self, user=None):
+        request = APIRequestFactory().get('/api/auth/users/')
+        if user is not None:
+            force_authenticate(request, user)
+        request = Request(request)
+        request.user  # authenticate now, as the view would
+        return request
+
+    def assertSameData(self, lean_class, serializer_class, queryset, prefetch, request):
+        context = {'request': request}
+        expected = serializer_class(
+            queryset.prefetch_related(prefetch_users(prefetch, request.user)), many=True, context=context
+        ).data
+        self.assertTrue(expected)
+        data = lean_class(lean_class.project(queryset, request), many=True, context=context).data
+        self.assertEqual(data, expected)
+
+    def test_same_data(self):
+        for viewer in (self.star, self.fans[1], None):
+            request = self.request(viewer)
+            viewer = request.user
+            users = CustomUser.objects.order_by('pk')
+            self.assertEqual(
+                LeanUserFollowSerializer(
+                    LeanUserFollowSerializer.project(users, request), many=True, context={'request': request}
+                ).data,
+                UserFollowSerializer(with_follow_counts(users, viewer), many=True, context={'request': request}).data
+            )
+            edges = Follow.objects.order_by('-created_at', '-id')
+            self.assertSameData(LeanFollowerSerializer, FollowerSerializer, edges, 'follower', request)
+            self.assertSameData(LeanFollowingSerializer, FollowingSerializer, edges, 'followed', request)
+
+
+class AccountDeletionTests(APITestCase):
+    """Tests for disabling an account and purging it in chunks."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='leaver', password='pw-leaver-1')
+        self.other = CustomUser.objects.create_user(username='stayer', password='pw')
+        self.user.follow(self.other)
+        self.other.follow(self.user)
+
+        own_post = Post.objects.create(author=self.user, title='Mine', content='x')
+        other_post = Post.objects.create(author=self.other, title='Theirs', content='y')
+        comment = Comment.objects.create(post=own_post, author=self.other, content='hi')
+        Comment.objects.create(post=own_post, author=self.user, content='re', parent_comment=comment)
+        self.other_comment = Comment.objects.create(post=other_post, author=self.other, content='ok')
+        Comment.objects.create(post=other_post, author=self.user, content='nice')
+        self.other_comment.likes.add(self.user)
+        Like.objects.create(user=self.user, post=other_post)
+        Like.objects.create(user=self.other, post=own_post)
+        Notification.objects.create(recipient=self.other, actor=self.user, verb='like', message='m')
+        self.other_post = other_post
+
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_delete_disables_then_command_purges(self):
+        response = self.client.post(reverse('delete_account'), {'password': 'pw-leaver-1'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+
+        call_command('process_account_deletions', chunk_size=1, stdout=StringIO())
+
+        deletion = AccountDeletion.objects.get(user_id=self.user.id)
+        self.assertEqual(deletion.status, 'completed')
+        self.assertGreater(deletion.rows_deleted, 0)
+        self.assertFalse(CustomUser.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.other_post])
+        self.assertEqual(list(Comment.objects.all()), [self.other_comment])
+        self.assertEqual(Like.objects.count(), 0)
+        self.assertEqual(self.other_comment.likes.count(), 0)
+        self.assertEqual(Follow.objects.count(), 0)
+        self.assertEqual(Notification.objects.count(), 0)
+
+    def test_failed_purges_are_retried_with_backoff(self):
+        self.client.post(reverse('delete_account'), {'password': 'pw-leaver-1'})
+        deletion = AccountDeletion.objects.get(user_id=self.user.id)
+        with mock.patch('accounts.deletion.transaction.atomic', side_effect=OperationalError('database is locked')):
+            call_command('process_account_deletions', stdout=StringIO(), stderr=StringIO())
+        deletion.refresh_from_db()
+        self.assertEqual((deletion.status, deletion.attempts), ('failed', 1))
+        self.assertGreater(deletion.retry_at, timezone.now())
+
+        # Not before the backoff has passed...
+        call_command('process_account_deletions', stdout=StringIO())
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, 'failed')
+
+        # ...then the purge resumes and finishes.
+        AccountDeletion.objects.update(retry_at=timezone.now())
+        call_command('process_account_deletions', stdout=StringIO())
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, 'completed')
+        self.assertFalse(CustomUser.objects.filter(pk=self.user.pk).exists())
+
+    def test_exhausted_purges_wait_for_retry_failed(self):
+        self.client.post(reverse('delete_account'), {'password': 'pw-leaver-1'})
+        AccountDeletion.objects.update(status='failed', attempts=5, retry_at=timezone.now())
+        call_command('process_account_deletions', stdout=StringIO())
+        self.assertEqual(AccountDeletion.objects.get().status, 'failed')
+
+        call_command('process_account_deletions', retry_failed=True, stdout=StringIO())
+        self.assertEqual(AccountDeletion.objects.get().status, 'completed')
+
+    def test_wrong_password_keeps_account(self):
+        response = self.client.post(reverse('delete_account'), {'password': 'nope'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+
+class DataExportTests(APITestCase):
+    """Tests for the streaming personal data export."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='exporter', password='pw')
+        self.other = CustomUser.objects.create_user(username='friend', password='pw')
+        self.user.follow(self.other)
+        self.other.follow(self.user)
+        self.post = Post.objects.create(author=self.user, title='Mine', content='hello, "world"')
+        other_post = Post.objects.create(author=self.other, title='Theirs', content='y')
+        Comment.objects.create(post=other_post, author=self.user, content='nice')
+        Like.objects.create(user=self.user, post=other_post)
+        Notification.objects.create(recipient=self.user, actor=self.other, verb='follow', message='m')
+        self.client.force_authenticate(self.user)
+
+    def test_ndjson_export_streams_every_section(self):
+        response = self.client.get(reverse('data_export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        by_type = {}
+        for row in rows:
+            by_type.setdefault(row['type'], []).append(row)
+        self.assertEqual(by_type['profile'][0]['username'], 'exporter')
+        self.assertEqual([row['title'] for row in by_type['posts']], ['Mine'])
+        self.assertEqual(len(by_type['comments']), 1)
+        self.assertEqual(len(by_type['post_likes']), 1)
+        self.assertEqual(by_type['following'][0]['username'], 'friend')
+        self.assertEqual(by_type['followers'][0]['username'], 'friend')
+        self.assertEqual(by_type['notifications'][0]['actor_username'], 'friend')
+
+    def test_csv_section_export(self):
+        response = self.client.get(reverse('data_export_section', args=['posts', 'csv']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,title,content'))
+        self.assertIn('"hello, ""world"""', lines[1])
+
+        response = self.client.get(reverse('data_export_section', args=['comment_likes', 'csv']))
+        self.assertEqual(b''.join(response.streaming_content).decode().strip(), 'comment_id')
+
+        response = self.client.get(reverse('data_export_section', args=['passwords', 'csv']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_asgi_requests_stream_from_the_async_orm(self):
+        view = DataExportView.as_view()
+        factory = AsyncRequestFactory()
+
+        async def consume(response):
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        for url, kwargs in (
+            (reverse('data_export'), {}),
+            (reverse('data_export_section', args=['posts', 'csv']), {'section': 'posts', 'extension': 'csv'}),
+            (reverse('data_export_section', args=['comment_likes', 'csv']),
+             {'section': 'comment_likes', 'extension': 'csv'}),
+        ):
+            request = factory.get(url)
+            force_authenticate(request, self.user)
+            response = view(request, **kwargs)
+            self.assertTrue(response.is_async)
+            expected = b''.join(self.client.get(url).streaming_content)
+            self.assertEqual(async_to_sync(consume)(response), expected)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_user_data', 'exporter', stdout=out, stderr=StringIO())
+        types = [json.loads(line)['type'] for line in out.getvalue().splitlines()]
+        self.assertEqual(types.count('posts'), 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_user_data', 'exporter', format='csv', output=directory, stderr=StringIO())
+            with open(os.path.join(directory, 'following.csv')) as handle:
+                self.assertIn('friend', handle.read())
+
+
+class AccountQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Fixed query counts for every accounts endpoint, whatever the page size."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(username='budget', password='pw-budget-1')
+        UserProfile.objects.create(user=self.user)
+        self.star = CustomUser.objects.create_user(username='star', password='pw')
+        self.fans = [
+            CustomUser.objects.create_user(username=f'fan{index}', first_name='Fan', password='pw')
+            for index in range(24)
+        ]
+        for index, fan in enumerate(self.fans):
+            fan.follow(self.star)
+            self.star.follow(fan)
+            if index % 2:
+                self.user.follow(fan)
+        self.client.force_authenticate(self.user)
+
+    def test_read_endpoints(self):
+        self.assertQueryBudget(2, reverse('user_followers', args=[self.star.id]), paginate=True)
+        self.assertQueryBudget(2, reverse('user_following', args=[self.star.id]), paginate=True)
+        self.assertQueryBudget(1, reverse('user_search') + '?q=fan1', reverse('user_search') + '?q=fan')
+        ids = ','.join(str(fan.id) for fan in self.fans)
+        self.assertQueryBudget(2, reverse('user_relationships') + '?ids=' + ids)
+        self.assertQueryBudget(2, reverse('profile'))
+        self.assertQueryBudget(2, reverse('token-retrieve'))
+        self.assertQueryBudget(8, reverse('data_export'))
+
+    def test_write_endpoints(self):
+        self.assertQueryBudget(4, reverse('profile'), method='patch', data={'bio': 'Hi'}, format='json')
+        self.assertQueryBudget(9, reverse('follow_user', args=[self.star.id]), method='post')
+        self.assertQueryBudget(5, reverse('unfollow_user', args=[self.star.id]), method='post')
+        self.assertQueryBudget(
+            9, reverse('register'), method='post', format='json',
+            data={'username': 'newbie', 'email': 'n@example.com',
+                  'password': 'Sturdy-pass-42', 'password2': 'Sturdy-pass-42'}
+        )
+        self.assertQueryBudget(
+            16, reverse('login'), method='post', format='json',
+            data={'username': 'budget', 'password': 'pw-budget-1'}
+        )
+        self.assertQueryBudget(12, reverse('delete_account'), method='post', data={'password': 'pw-budget-1'})
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from .views import (
     RegisterView,
     LoginView,
@@ -6,11 +6,14 @@ from .views import (
     TokenRetrieveView,
     UserProfileView,
     ChangePasswordView,
+    DeleteAccountView,
+    DataExportView,
     FollowUserView,
     UnfollowUserView,  # Add this import
     UserFollowersView,
     UserFollowingView,
-    UserSearchView
+    UserSearchView,
+    RelationshipStatusView
 )
 
 urlpatterns = [
@@ -23,6 +26,13 @@ urlpatterns = [
     # User profile endpoints
     path('profile/', UserProfileView.as_view(), name='profile'),
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
+    path('account/delete/', DeleteAccountView.as_view(), name='delete_account'),
+    path('account/export/', DataExportView.as_view(), name='data_export'),
+    re_path(
+        r'^account/export/(?P<section>\w+)\.(?P<extension>csv|ndjson)$',
+        DataExportView.as_view(),
+        name='data_export_section'
+    ),
     
     # Follow/unfollow endpoints
     # The toggle endpoint that can both follow and unfollow
@@ -37,4 +47,7 @@ urlpatterns = [
     
     # User search endpoint
     path('users/search/', UserSearchView.as_view(), name='user_search'),
+    
+    # Batch follow-status lookup: ?ids=1,2,3
+    path('users/relationships/', RelationshipStatusView.as_view(), name='user_relationships'),
 ]
\ No newline at end of file
@@ -1,23 +1,38 @@
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.pagination import CursorPagination
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import authenticate, login, logout
 from django.shortcuts import get_object_or_404
 from django.db import models
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from social_media_api.throttling import BUCKET_THROTTLES
 from .serializers import (
     UserSerializer, 
     RegisterSerializer, 
     LoginSerializer,
     ChangePasswordSerializer,
     TokenSerializer,
-    UserFollowSerializer, 
     FollowActionSerializer,
-    UserFollowersSerializer,
-    UserFollowingSerializer
+    LeanUserFollowSerializer,
+    LeanFollowerSerializer,
+    LeanFollowingSerializer
 )
-from .models import CustomUser, UserProfile
+from .models import CustomUser, UserProfile, Follow
+from .deletion import request_account_deletion
+from .export import astream_csv, astream_ndjson, export_sections, stream_csv, stream_ndjson
+
+
+class FollowCursorPagination(CursorPagination):
+    """Newest-first cursor pagination backed by the Follow indexes."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
 
 
 class RegisterView(generics.CreateAPIView):
@@ -142,6 +157,58 @@ class ChangePasswordView(generics.UpdateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class DeleteAccountView(APIView):
+    """View for deleting the current user's account."""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        """Disable the account now and queue its data for purging."""
+        password = request.data.get('password', '')
+        if not request.user.check_password(password):
+            return Response(
+                {"password": ["Wrong password."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        deletion = request_account_deletion(request.user)
+        logout(request)
+        return Response({
+            "message": "Account disabled and scheduled for deletion",
+            "deletion_id": deletion.id,
+            "status": deletion.status
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class DataExportView(APIView):
+    """View streaming a full export of the current user's data."""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, section=None, extension='ndjson'):
+        """Stream every section as NDJSON, or one section as CSV/NDJSON."""
+        sections = export_sections(request.user.id)
+        if section is not None and section not in sections:
+            return Response(
+                {"error": f"Unknown section. Choose from: {', '.join(sections)}."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        name = f"{request.user.username}-{section or 'export'}.{extension}"
+        # An async iterator keeps ASGI responses streaming instead of buffered.
+        served_async = isinstance(request._request, ASGIRequest)
+        if extension == 'csv':
+            stream = astream_csv if served_async else stream_csv
+            response = StreamingHttpResponse(stream(sections[section]), content_type='text/csv')
+        else:
+            stream = astream_ndjson if served_async else stream_ndjson
+            response = StreamingHttpResponse(
+                stream(request.user.id, sections=[section] if section else None),
+                content_type='application/x-ndjson'
+            )
+        response['Content-Disposition'] = f'attachment; filename="{name}"'
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+
 class FollowUserView(generics.GenericAPIView):
     """View for following/unfollowing users using generics.GenericAPIView."""
     permission_classes = [IsAuthenticated]
@@ -183,6 +250,8 @@ class FollowUserView(generics.GenericAPIView):
 class UnfollowUserView(generics.GenericAPIView):
     """View specifically for unfollowing users."""
     permission_classes = [IsAuthenticated]
+    throttle_classes = BUCKET_THROTTLES
+    throttle_scope = 'follow'
     
     def post(self, request, user_id):
         """Unfollow a user."""
@@ -215,64 +284,36 @@ class UnfollowUserView(generics.GenericAPIView):
         })
 
 
-class UserFollowersView(generics.GenericAPIView):
-    """View to get a user's followers."""
-    serializer_class = UserFollowersSerializer
+class UserFollowersView(generics.ListAPIView):
+    """View to get a user's followers, most recent first."""
+    serializer_class = LeanFollowerSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = FollowCursorPagination
     
-    def get(self, request, user_id):
-        """Get followers of a specific user."""
-        # Use CustomUser.objects.all() as specified
-        user = get_object_or_404(CustomUser.objects.all(), id=user_id)
-        
-        # Get followers with pagination
-        followers = user.followers.all()
-        page = self.paginate_queryset(followers)
-        
-        if page is not None:
-            serializer = UserFollowSerializer(page, many=True, context={'request': request})
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = UserFollowSerializer(followers, many=True, context={'request': request})
-        return Response({
-            'user_id': user.id,
-            'username': user.username,
-            'followers_count': user.followers_count,
-            'followers': serializer.data
-        })
+    def get_queryset(self):
+        """Get follow edges pointing at a specific user."""
+        user = get_object_or_404(CustomUser.objects.all(), id=self.kwargs['user_id'])
+        return LeanFollowerSerializer.project(Follow.objects.filter(followed=user), self.request)
 
 
-class UserFollowingView(generics.GenericAPIView):
-    """View to get who a user is following."""
-    serializer_class = UserFollowingSerializer
+class UserFollowingView(generics.ListAPIView):
+    """View to get who a user is following, most recent first."""
+    serializer_class = LeanFollowingSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = FollowCursorPagination
     
-    def get(self, request, user_id):
-        """Get users that a specific user is following."""
-        # Use CustomUser.objects.all() as specified
-        user = get_object_or_404(CustomUser.objects.all(), id=user_id)
-        
-        # Get following with pagination
-        following = user.following.all()
-        page = self.paginate_queryset(following)
-        
-        if page is not None:
-            serializer = UserFollowSerializer(page, many=True, context={'request': request})
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = UserFollowSerializer(following, many=True, context={'request': request})
-        return Response({
-            'user_id': user.id,
-            'username': user.username,
-            'following_count': user.following_count,
-            'following': serializer.data
-        })
+    def get_queryset(self):
+        """Get follow edges starting from a specific user."""
+        user = get_object_or_404(CustomUser.objects.all(), id=self.kwargs['user_id'])
+        return LeanFollowingSerializer.project(Follow.objects.filter(follower=user), self.request)
 
 
 class UserSearchView(generics.GenericAPIView):
     """View to search for users."""
-    serializer_class = UserFollowSerializer
+    serializer_class = LeanUserFollowSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = BUCKET_THROTTLES
+    throttle_scope = 'search'
     
     def get(self, request):
         """Search for users."""
@@ -290,6 +331,7 @@ class UserSearchView(generics.GenericAPIView):
             models.Q(first_name__icontains=query) |
             models.Q(last_name__icontains=query)
         ).exclude(id=request.user.id)
+        queryset = LeanUserFollowSerializer.project(queryset, request)
         
         page = self.paginate_queryset(queryset)
         
@@ -306,6 +348,8 @@ from notifications.notify import NotificationManager
 class FollowUserView(generics.GenericAPIView):
     """View for following/unfollowing users using generics.GenericAPIView."""
     permission_classes = [IsAuthenticated]
+    throttle_classes = BUCKET_THROTTLES
+    throttle_scope = 'follow'
     
     def post(self, request, user_id):
         """Follow or unfollow a user."""
@@ -341,4 +385,51 @@ class FollowUserView(generics.GenericAPIView):
             "following_count": current_user.following_count,
             "followers_count": user_to_follow.followers_count,
             "is_following": not is_following
-        })
\ No newline at end of file
+        })
+
+
+class RelationshipStatusView(APIView):
+    """View to look up follow relationships with many users at once."""
+    permission_classes = [IsAuthenticated]
+    max_ids = 100
+    cache_max_age = 30
+    # Largest BigAutoField id; the database cannot compare anything larger.
+    max_user_id = 2 ** 63 - 1
+    
+    def get(self, request):
+        """Return following/followed_by/mutual flags for ?ids=1,2,3."""
+        raw_ids = request.query_params.get('ids', '')
+        try:
+            user_ids = list(dict.fromkeys(
+                int(user_id) for user_id in raw_ids.split(',') if user_id.strip()
+            ))
+            if not all(1 <= user_id <= self.max_user_id for user_id in user_ids):
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"error": "Query parameter 'ids' must be a comma-separated list of user IDs."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not user_ids:
+            return Response(
+                {"error": "Query parameter 'ids' is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(user_ids) > self.max_ids:
+            return Response(
+                {"error": f"At most {self.max_ids} user IDs can be requested at once."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        relationships = request.user.relationships(user_ids)
+        response = Response({
+            'results': [
+                {'user_id': user_id, **relationships[user_id]}
+                for user_id in user_ids
+            ]
+        })
+        # Answers depend on the viewer, so only private caches may keep them.
+        patch_cache_control(response, private=True, max_age=self.cache_max_age)
+        patch_vary_headers(response, ['Authorization'])
+        return response
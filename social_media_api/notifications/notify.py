@@ -90,6 +90,42 @@ class NotificationManager:
             )
         return None
     
+    @staticmethod
+    def notify_mentions(actor, post, user_ids):
+        """Create mention notifications for many users in one batch."""
+        return NotificationManager.notify_mentions_for_posts([(actor, post, user_ids)])
+    
+    @staticmethod
+    def notify_mentions_for_posts(mentions):
+        """
+        Create mention notifications for several posts in one batch.
+        
+        ``mentions`` is a list of (actor, post, user_ids) tuples.
+        """
+        all_user_ids = {user_id for _, _, user_ids in mentions for user_id in user_ids}
+        if not all_user_ids:
+            return []
+        muted = set(
+            NotificationSettings.objects.filter(
+                user_id__in=all_user_ids,
+                app_mention=False
+            ).values_list('user_id', flat=True)
+        )
+        content_type = ContentType.objects.get_for_model(mentions[0][1])
+        return Notification.objects.bulk_create([
+            Notification(
+                recipient_id=user_id,
+                actor=actor,
+                verb='mention',
+                target_content_type=content_type,
+                target_object_id=post.id,
+                message=f"{actor.username} mentioned you in a post: {post.title[:50]}"
+            )
+            for actor, post, user_ids in mentions
+            for user_id in user_ids
+            if user_id not in muted and user_id != actor.id
+        ])
+    
     @staticmethod
     def mark_all_as_read(user):
         """Mark all notifications as read for a user."""
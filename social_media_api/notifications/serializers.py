@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Notification, NotificationSettings
+from django.contrib.contenttypes.models import ContentType
+from social_media_api.lean import LeanSerializer, datetime_repr, file_url
+from .models import Notification, NotificationSettings, time_since
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -45,6 +47,50 @@ class NotificationSerializer(serializers.ModelSerializer):
         return None
 
 
+class LeanNotificationSerializer(LeanSerializer):
+    """``NotificationSerializer`` output from ``values()`` rows."""
+    fields = (
+        'id', 'actor_id', 'actor__username', 'actor__profile_picture',
+        'recipient_id', 'recipient__username', 'verb', 'message',
+        'target_content_type_id', 'target_object_id', 'is_read', 'created_at', 'timestamp'
+    )
+    
+    def prepare(self, rows):
+        """Load targets in bulk, only for models that have a URL to link."""
+        self.targets = {}
+        for content_type_id in {row['target_content_type_id'] for row in rows} - {None}:
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            if model is not None and hasattr(model, 'get_absolute_url'):
+                self.targets[content_type_id] = model._base_manager.in_bulk([
+                    row['target_object_id'] for row in rows
+                    if row['target_content_type_id'] == content_type_id
+                ])
+        return rows
+    
+    def to_representation(self, row):
+        target = self.targets.get(row['target_content_type_id'], {}).get(row['target_object_id'])
+        return {
+            'id': row['id'],
+            'actor': {
+                'id': row['actor_id'],
+                'username': row['actor__username'],
+                'profile_picture': file_url(row['actor__profile_picture'])
+            },
+            'recipient': {
+                'id': row['recipient_id'],
+                'username': row['recipient__username']
+            },
+            'verb': row['verb'],
+            'message': row['message'],
+            'target_content_type': row['target_content_type_id'],
+            'target_object_id': row['target_object_id'],
+            'is_read': row['is_read'],
+            'created_at': datetime_repr(row['created_at']),
+            'time_since': time_since(row['timestamp']),
+            'target_url': target.get_absolute_url() if target is not None else None,
+        }
+
+
 class NotificationSettingsSerializer(serializers.ModelSerializer):
     """Serializer for notification settings."""
     class Meta:
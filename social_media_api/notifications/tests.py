@@ -1,3 +1,104 @@
-from django.test import TestCase
+"""
+Tests for the notifications app.
+"""
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from accounts.models import CustomUser
+from posts.models import Comment, Post
+from social_media_api.testing import QueryBudgetMixin
+
+from .models import Notification
+from .notify import NotificationManager
+from .serializers import LeanNotificationSerializer, NotificationSerializer
+from .views import (
+    AsyncNotificationCountView,
+    AsyncNotificationListView,
+    NotificationCountView,
+    NotificationListView,
+)
+
+
+class NotificationQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Fixed query counts for every notifications endpoint, whatever the page size."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(username='budget', password='pw')
+        actors = [CustomUser.objects.create_user(username=f'actor{index}', password='pw') for index in range(4)]
+        for index in range(24):
+            actor = actors[index % 4]
+            post = Post.objects.create(author=self.user, title=f'Post {index}', content='x')
+            if index % 3 == 0:
+                NotificationManager.notify_like(actor, post)
+            elif index % 3 == 1:
+                NotificationManager.notify_comment(actor, Comment.objects.create(post=post, author=actor, content='hi'))
+            else:
+                NotificationManager.notify_follow(actor, self.user)
+        Notification.objects.filter(pk__in=Notification.objects.values('pk')[:6]).update(is_read=True)
+        self.client.force_authenticate(self.user)
+
+    def test_read_endpoints(self):
+        # Count and page only: no target model has a URL to link, so none are loaded.
+        self.assertQueryBudget(2, reverse('notification_list'), paginate=True)
+        self.assertQueryBudget(1, reverse('unread_notifications'))
+        self.assertQueryBudget(2, reverse('notification_count'))
+        self.assertQueryBudget(1, reverse('notification_settings'))
+
+    def test_write_endpoints(self):
+        notification = Notification.objects.filter(recipient=self.user).first()
+        self.assertQueryBudget(2, reverse('mark_notification_read', args=[notification.id]), method='post')
+        self.assertQueryBudget(1, reverse('mark_all_notifications_read'), method='post')
+        self.assertQueryBudget(
+            2, reverse('notification_settings'), method='patch', format='json', data={'app_like': False}
+        )
+
+
+class AsyncNotificationViewTests(APITestCase):
+    """The async notification views answer exactly like the sync ones."""
+
+    def test_list_and_count(self):
+        user = CustomUser.objects.create_user(username='reader', password='pw')
+        actor = CustomUser.objects.create_user(username='actor', password='pw')
+        for index in range(5):
+            post = Post.objects.create(author=user, title=f'Post {index}', content='x')
+            NotificationManager.notify_like(actor, post)
+            NotificationManager.notify_comment(actor, Comment.objects.create(post=post, author=actor, content='hi'))
+        Notification.objects.filter(pk__in=Notification.objects.values('pk')[:3]).update(is_read=True)
+
+        factory = APIRequestFactory()
+        for sync_view, async_view, path in [
+            (NotificationListView, AsyncNotificationListView, '/api/notifications/?page=2&page_size=4'),
+            (NotificationCountView, AsyncNotificationCountView, '/api/notifications/count/'),
+        ]:
+            responses = []
+            for view in (sync_view.as_view(), async_to_sync(async_view.as_view())):
+                request = factory.get(path)
+                force_authenticate(request, user)
+                responses.append(view(request).render())
+            self.assertEqual(responses[1].status_code, 200)
+            self.assertEqual(responses[1].content, responses[0].content)
+        self.assertEqual(responses[1].data, {'unread_count': 7, 'total_count': 10})
+
+
+class LeanNotificationSerializerTests(APITestCase):
+    """LeanNotificationSerializer renders exactly what NotificationSerializer does."""
+
+    def test_same_data(self):
+        user = CustomUser.objects.create_user(username='reader', password='pw')
+        actor = CustomUser.objects.create_user(username='actor', password='pw')
+        plain = CustomUser.objects.create_user(username='plain', password='pw')
+        CustomUser.objects.filter(pk=plain.pk).update(profile_picture='')
+        post = Post.objects.create(author=user, title='Post', content='x')
+        NotificationManager.notify_like(actor, post)
+        NotificationManager.notify_comment(plain, Comment.objects.create(post=post, author=plain, content='hi'))
+        NotificationManager.notify_follow(actor, user)
+        Notification.objects.create(recipient=user, actor=plain, verb='system', message='Welcome')
+
+        notifications = Notification.objects.filter(recipient=user).select_related('actor', 'recipient')
+        expected = NotificationSerializer(notifications.prefetch_related('target'), many=True).data
+        self.assertEqual(len(expected), 4)
+        data = LeanNotificationSerializer(LeanNotificationSerializer.project(notifications), many=True).data
+        self.assertEqual(data, expected)
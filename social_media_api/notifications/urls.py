@@ -1,18 +1,25 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     NotificationListView,
+    AsyncNotificationListView,
     UnreadNotificationListView,
     MarkNotificationAsReadView,
     MarkAllNotificationsAsReadView,
     NotificationCountView,
+    AsyncNotificationCountView,
     NotificationSettingsView
 )
 
+# Under ASGI the list and count polls are served by async views.
+list_view = AsyncNotificationListView if settings.ASYNC_VIEWS else NotificationListView
+count_view = AsyncNotificationCountView if settings.ASYNC_VIEWS else NotificationCountView
+
 urlpatterns = [
-    path('', NotificationListView.as_view(), name='notification_list'),
+    path('', list_view.as_view(), name='notification_list'),
     path('unread/', UnreadNotificationListView.as_view(), name='unread_notifications'),
     path('<int:notification_id>/read/', MarkNotificationAsReadView.as_view(), name='mark_notification_read'),
     path('mark-all-read/', MarkAllNotificationsAsReadView.as_view(), name='mark_all_notifications_read'),
-    path('count/', NotificationCountView.as_view(), name='notification_count'),
+    path('count/', count_view.as_view(), name='notification_count'),
     path('settings/', NotificationSettingsView.as_view(), name='notification_settings'),
 ]
\ No newline at end of file
@@ -3,8 +3,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
+from social_media_api.async_views import AsyncDispatchMixin, apaginate
 from .models import Notification, NotificationSettings
-from .serializers import NotificationSerializer, NotificationSettingsSerializer
+from .serializers import LeanNotificationSerializer, NotificationSettingsSerializer
 from .notify import NotificationManager
 
 
@@ -17,26 +18,28 @@ class StandardResultsSetPagination(PageNumberPagination):
 
 class NotificationListView(generics.ListAPIView):
     """View to list user's notifications."""
-    serializer_class = NotificationSerializer
+    serializer_class = LeanNotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
     
     def get_queryset(self):
         """Get notifications for the current user."""
-        return Notification.objects.filter(recipient=self.request.user).select_related('actor', 'recipient')
+        return LeanNotificationSerializer.project(Notification.objects.filter(
+            recipient=self.request.user
+        ))
 
 
 class UnreadNotificationListView(generics.ListAPIView):
     """View to list user's unread notifications."""
-    serializer_class = NotificationSerializer
+    serializer_class = LeanNotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         """Get unread notifications for the current user."""
-        return Notification.objects.filter(
+        return LeanNotificationSerializer.project(Notification.objects.filter(
             recipient=self.request.user,
             is_read=False
-        ).select_related('actor', 'recipient').order_by('-created_at')
+        ).order_by('-created_at'))
 
 
 class MarkNotificationAsReadView(APIView):
@@ -96,4 +99,24 @@ class NotificationSettingsView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """Get or create notification settings for the current user."""
         obj, created = NotificationSettings.objects.get_or_create(user=self.request.user)
-        return obj
\ No newline at end of file
+        return obj
+
+
+class AsyncNotificationListView(AsyncDispatchMixin, NotificationListView):
+    """NotificationListView on the async ORM, for ASGI."""
+
+    async def get(self, request, *args, **kwargs):
+        page = await apaginate(self.paginator, self.get_queryset(), request)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class AsyncNotificationCountView(AsyncDispatchMixin, NotificationCountView):
+    """NotificationCountView on the async ORM, for ASGI."""
+
+    async def get(self, request):
+        notifications = Notification.objects.filter(recipient=request.user)
+        return Response({
+            'unread_count': await notifications.filter(is_read=False).acount(),
+            'total_count': await notifications.acount()
+        })
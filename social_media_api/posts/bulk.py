@@ -0,0 +1,40 @@
+"""
+Helpers shared by the bulk import and data generation commands.
+"""
+
+from contextlib import contextmanager
+from itertools import islice
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def original_timestamps(*models):
+    """
+    Let bulk_create keep the given created_at/updated_at values.
+
+    auto_now/auto_now_add would otherwise stamp every row with the current
+    time. bulk_create sends no model signals, so the rendition, hashtag and
+    mention receivers are skipped as well; callers index entities themselves.
+    """
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
@@ -0,0 +1,92 @@
+"""
+Conditional GET support (ETag) for viewsets.
+
+The ETag is computed from a few aggregate queries over the ids on the
+requested page, so a 304 is answered without loading or serializing the
+objects themselves. Nested users have no modification time, so their
+rendered columns and follow counts go into the ETag as they are.
+
+No Last-Modified is sent: deleted likes and comments, user edits and
+follow counts change the page without moving any timestamp, so an
+``If-Modified-Since`` check would answer 304 for a stale copy.
+"""
+
+import hashlib
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.utils.cache import get_conditional_response
+
+from accounts.models import CustomUser, follow_count_annotations
+from accounts.serializers import USER_VALUES
+
+
+def user_condition_state(*user_ids):
+    """
+    State of the users a page renders with ``UserSerializer``, in one query.
+
+    Each argument is a ``values()`` queryset of user ids, e.g. the authors
+    of the posts on the page.
+    """
+    users = CustomUser.objects.filter(reduce(or_, (Q(pk__in=ids) for ids in user_ids)))
+    return {
+        'users': list(
+            users.annotate(**follow_count_annotations())
+            .order_by('pk')
+            .values_list('pk', *USER_VALUES, 'followers_count', 'following_count')
+        )
+    }
+
+
+class ConditionalGetMixin:
+    """
+    Add an ETag to list and retrieve, answering 304 when possible.
+
+    Subclasses implement ``get_condition_state(ids)`` returning a list of
+    aggregate dicts, which are hashed into the ETag.
+    """
+
+    def get_condition_state(self, ids):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = queryset.prefetch_related(None).values_list('pk', flat=True)
+        page = self.paginate_queryset(ids)
+        total = None
+        if page is not None:
+            total = self.paginator.page.paginator.count
+            ids = page
+
+        not_modified = self.evaluate_conditions(request, list(ids), total)
+        if not_modified is not None:
+            return not_modified
+        return self.with_validators(super().list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        ids = list(
+            self.filter_queryset(self.get_queryset())
+            .filter(**{self.lookup_field: kwargs[lookup]})
+            .values_list('pk', flat=True)
+        )
+
+        not_modified = self.evaluate_conditions(request, ids) if ids else None
+        if not_modified is not None:
+            return not_modified
+        return self.with_validators(super().retrieve(request, *args, **kwargs))
+
+    def evaluate_conditions(self, request, ids, total=None):
+        """Return a 304 response if the client's copy is current."""
+        state = self.get_condition_state(ids)
+        fingerprint = repr((request.get_full_path(), total, ids, state))
+
+        self._etag = 'W/"%s"' % hashlib.md5(fingerprint.encode()).hexdigest()
+        response = get_conditional_response(request, etag=self._etag)
+        return self.with_validators(response) if response is not None else None
+
+    def with_validators(self, response):
+        if response.status_code in (200, 304) and getattr(self, '_etag', None):
+            response['ETag'] = self._etag
+        return response
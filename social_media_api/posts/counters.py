@@ -0,0 +1,143 @@
+"""
+Write-behind buffer for post view and impression counters.
+
+Increments are aggregated in process memory and written as a few batched
+``UPDATE ... SET views_count = views_count + n`` statements once the oldest
+pending increment is older than the flush interval or enough posts are
+pending. Flushing happens on the request that crosses either limit, so no
+extra thread or database connection is needed, and the buffer is flushed on
+interpreter shutdown so a graceful worker restart loses nothing.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ('views_count', 'impressions_count')
+
+
+class CounterBuffer:
+    """Thread-safe in-process aggregation of per-post counter increments."""
+
+    def __init__(self, flush_interval=10, flush_threshold=1000):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(Counter)
+        self._oldest_pending = None
+        self._database = None
+        self.last_flush_at = None
+        self.last_flush_duration = 0.0
+        self.flushed_increments = 0
+        self.failed_flushes = 0
+
+    def add(self, post_ids, field):
+        """Count one view/impression for each of ``post_ids``."""
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f'Unknown counter field: {field}')
+        with self._lock:
+            for post_id in post_ids:
+                self._pending[post_id][field] += 1
+            if self._oldest_pending is None and self._pending:
+                self._oldest_pending = time.monotonic()
+                self._database = connection.settings_dict['NAME']
+            pending = len(self._pending)
+
+        if pending >= self.flush_threshold or self.lag_seconds() >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write all pending increments; returns the number applied."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(Counter)
+                oldest, self._oldest_pending = self._oldest_pending, None
+            if not pending:
+                return 0
+            if connection.settings_dict['NAME'] != self._database:
+                # e.g. a test database torn down before interpreter exit
+                logger.warning('Database changed since counters were recorded; dropping them')
+                return 0
+
+            # Posts with the same increment share one UPDATE statement.
+            groups = defaultdict(list)
+            for post_id, counts in pending.items():
+                for field, amount in counts.items():
+                    groups[(field, amount)].append(post_id)
+
+            started = time.monotonic()
+            try:
+                with transaction.atomic():
+                    for (field, amount), post_ids in groups.items():
+                        Post.objects.filter(pk__in=post_ids).update(**{field: F(field) + amount})
+            except Exception:
+                logger.exception('Flushing post counters failed; keeping increments')
+                self.failed_flushes += 1
+                self._requeue(pending, oldest)
+                return 0
+
+            self.last_flush_at = time.time()
+            self.last_flush_duration = time.monotonic() - started
+            applied = sum(sum(counts.values()) for counts in pending.values())
+            self.flushed_increments += applied
+            return applied
+
+    def _requeue(self, pending, oldest):
+        with self._lock:
+            for post_id, counts in pending.items():
+                self._pending[post_id].update(counts)
+            if oldest is not None and (self._oldest_pending is None or oldest < self._oldest_pending):
+                self._oldest_pending = oldest
+
+    def lag_seconds(self):
+        """Age of the oldest increment not yet written to the database."""
+        oldest = self._oldest_pending
+        return time.monotonic() - oldest if oldest is not None else 0.0
+
+    def metrics(self):
+        return {
+            'pending_posts': len(self._pending),
+            'flush_lag_seconds': round(self.lag_seconds(), 3),
+            'last_flush_at': self.last_flush_at,
+            'last_flush_duration_seconds': round(self.last_flush_duration, 6),
+            'flushed_increments_total': self.flushed_increments,
+            'failed_flushes_total': self.failed_flushes,
+        }
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_counter_buffer():
+    """Return the process-wide counter buffer, creating it on first use."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = CounterBuffer(
+                    flush_interval=getattr(settings, 'POST_COUNTER_FLUSH_INTERVAL', 10),
+                    flush_threshold=getattr(settings, 'POST_COUNTER_FLUSH_THRESHOLD', 1000),
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def record_views(post_ids):
+    get_counter_buffer().add(post_ids, 'views_count')
+
+
+def record_impressions(post_ids):
+    get_counter_buffer().add(post_ids, 'impressions_count')
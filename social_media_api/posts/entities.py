@@ -0,0 +1,108 @@
+"""
+Hashtag and @mention extraction for posts.
+
+Tags and mentions are parsed when a post is saved and stored in indexed
+side tables (PostHashtag, PostMention) so that hashtag timelines and
+mention notifications never have to scan post content.
+"""
+
+import re
+
+
+HASHTAG_RE = re.compile(r'(?<![\w#&])#(\w{1,100})')
+# Same character set as Django usernames, minus '@'.
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]{1,150})')
+
+
+def extract_hashtags(*texts):
+    """Return the set of lowercase hashtags found in the given texts."""
+    return {
+        tag.lower()
+        for text in texts if text
+        for tag in HASHTAG_RE.findall(text)
+    }
+
+
+def extract_mentions(*texts):
+    """Return the set of usernames mentioned in the given texts."""
+    return {
+        username.rstrip('.')
+        for text in texts if text
+        for username in MENTION_RE.findall(text)
+        if username.rstrip('.')
+    }
+
+
+def sync_post_entities(post, created=False):
+    """Bring a post's hashtag and mention rows in line with its text."""
+    from django.contrib.auth import get_user_model
+
+    from .models import PostHashtag, PostMention
+
+    tags = extract_hashtags(post.title, post.content)
+    existing_tags = set() if created else set(
+        PostHashtag.objects.filter(post=post).values_list('tag', flat=True)
+    )
+    if existing_tags - tags:
+        PostHashtag.objects.filter(post=post, tag__in=existing_tags - tags).delete()
+    if tags - existing_tags:
+        PostHashtag.objects.bulk_create([
+            PostHashtag(post=post, tag=tag, created_at=post.created_at)
+            for tag in tags - existing_tags
+        ], ignore_conflicts=True)
+
+    usernames = extract_mentions(post.title, post.content)
+    user_ids = set()
+    if usernames:
+        user_ids = set(
+            get_user_model().objects.filter(username__in=usernames)
+            .exclude(pk=post.author_id)
+            .values_list('pk', flat=True)
+        )
+    existing_mentions = set() if created else set(
+        PostMention.objects.filter(post=post).values_list('user_id', flat=True)
+    )
+    if existing_mentions - user_ids:
+        PostMention.objects.filter(post=post, user_id__in=existing_mentions - user_ids).delete()
+    if user_ids - existing_mentions:
+        PostMention.objects.bulk_create([
+            PostMention(post=post, user_id=user_id)
+            for user_id in user_ids - existing_mentions
+        ], ignore_conflicts=True)
+
+    if post.is_published and (user_ids - existing_mentions or not created):
+        notify_pending_mentions(post)
+
+
+def notify_pending_mentions(post):
+    """Send one batch of mention notifications for users not yet notified."""
+    from notifications.notify import NotificationManager
+
+    from .models import PostMention
+
+    pending = PostMention.objects.filter(post=post, notified=False)
+    user_ids = list(pending.values_list('user_id', flat=True))
+    if not user_ids:
+        return 0
+    NotificationManager.notify_mentions(post.author, post, user_ids)
+    pending.update(notified=True)
+    return len(user_ids)
+
+
+def notify_pending_mentions_for_posts(post_ids):
+    """Like notify_pending_mentions, for many posts in a single batch."""
+    from notifications.notify import NotificationManager
+
+    from .models import PostMention
+
+    pending = PostMention.objects.filter(post_id__in=post_ids, notified=False)
+    by_post = {}
+    for mention in pending.select_related('post__author'):
+        by_post.setdefault(mention.post_id, (mention.post, []))[1].append(mention.user_id)
+    if not by_post:
+        return 0
+    NotificationManager.notify_mentions_for_posts([
+        (post.author, post, user_ids) for post, user_ids in by_post.values()
+    ])
+    pending.update(notified=True)
+    return sum(len(user_ids) for _, user_ids in by_post.values())
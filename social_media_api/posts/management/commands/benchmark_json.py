@@ -0,0 +1,67 @@
+"""
+Django management command to compare the stdlib and orjson JSON renderers.
+
+Serializes real post list and detail payloads from the database once, then
+times rendering them with DRF's JSONRenderer and ORJSONRenderer, and
+parsing the result back with JSONParser and ORJSONParser. Serializer time
+is reported too, to show which share of a response encoding accounts for.
+"""
+
+import timeit
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from posts.serializers import PostDetailSerializer, PostListSerializer
+from posts.views import PostViewSet
+from social_media_api import fastjson
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark JSON rendering and parsing of post payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20, help='Posts per payload')
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Execute the benchmark."""
+        if fastjson.orjson is None:
+            raise CommandError('orjson is not installed; ORJSONRenderer would use the stdlib encoder')
+
+        payloads = {}
+        for action, serializer_class in (('list', PostListSerializer), ('retrieve', PostDetailSerializer)):
+            view = PostViewSet(action=action, request=Request(APIRequestFactory().get('/')), format_kwarg=None)
+            posts = list(view.get_queryset().order_by('-created_at')[:options['posts']])
+            if not posts:
+                raise CommandError('No published posts; run generate_social_data first')
+            serializer_time = self.time(lambda: serializer_class(posts, many=True).data, options)
+            payloads[f'post-{action}'] = (serializer_class(posts, many=True).data, serializer_time)
+
+        self.stdout.write(
+            f"{'payload':<14} {'bytes':>9} {'serialize':>10} {'json':>9} {'orjson':>9} {'speedup':>8} "
+            f"{'parse':>9} {'orjson':>9} {'speedup':>8}"
+        )
+        stdlib, fast = JSONRenderer(), fastjson.ORJSONRenderer()
+        for name, (data, serializer_time) in payloads.items():
+            body = stdlib.render(data)
+            if fast.render(data) != body:
+                raise CommandError(f'{name}: ORJSONRenderer output differs from JSONRenderer')
+            render = self.time(lambda: stdlib.render(data), options)
+            render_fast = self.time(lambda: fast.render(data), options)
+            parse = self.time(lambda: JSONParser().parse(BytesIO(body)), options)
+            parse_fast = self.time(lambda: fastjson.ORJSONParser().parse(BytesIO(body)), options)
+            self.stdout.write(
+                f'{name:<14} {len(body):>9} {serializer_time:>8.0f}us {render:>7.0f}us {render_fast:>7.0f}us '
+                f'{render / render_fast:>7.1f}x {parse:>7.0f}us {parse_fast:>7.0f}us {parse / parse_fast:>7.1f}x'
+            )
+
+    def time(self, function, options):
+        """Best-of-repeat time per call, in microseconds."""
+        runs = timeit.repeat(function, number=options['iterations'], repeat=options['repeat'])
+        return min(runs) / options['iterations'] * 1e6
@@ -0,0 +1,99 @@
+"""
+Django management command to compare WSGI and ASGI servers under read load.
+
+Each server is started with the same number of workers and driven with the
+read-only load_test sessions (feed, post pages, notification count) at
+increasing concurrency, so the sync views under gunicorn can be compared
+with the async views under uvicorn. Install ``gunicorn`` and ``uvicorn``
+first, or pass other servers with ``--server NAME=COMMAND``.
+"""
+
+import asyncio
+import json
+import shlex
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from social_media_api.loadtest import free_port, run_load, start_server, stop_server
+
+
+SERVERS = {
+    'gunicorn-sync': '{python} -m gunicorn social_media_api.wsgi:application --workers {workers} '
+                     '--bind 127.0.0.1:{port}',
+    'uvicorn-asgi': '{python} -m uvicorn social_media_api.asgi:application --workers {workers} '
+                    '--host 127.0.0.1 --port {port}',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput and latency of server setups at increasing concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server',
+            action='append',
+            metavar='NAME=COMMAND',
+            help='Server to test; {python}, {workers} and {port} are replaced (default: gunicorn and uvicorn)'
+        )
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--concurrency', default='1,10,50,100', help='Comma-separated levels')
+        parser.add_argument('--duration', type=float, default=15, help='Seconds per level')
+        parser.add_argument('--prefix', default='user', help='Username prefix of the accounts to use')
+        parser.add_argument('--output', help='Write the JSON results to this file')
+
+    def handle(self, *args, **options):
+        """Execute the benchmark."""
+        servers = SERVERS
+        if options['server']:
+            servers = dict(item.split('=', 1) for item in options['server'])
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        accounts = list(
+            Token.objects.filter(user__username__startswith=options['prefix'], user__is_active=True)
+            .order_by('user_id')
+            .values_list('user_id', 'key')[:max(levels)]
+        )
+        if not accounts:
+            raise CommandError(
+                f"No users with prefix {options['prefix']!r} have tokens; run generate_social_data first"
+            )
+
+        results = {}
+        for name, command in servers.items():
+            port = free_port()
+            argv = shlex.split(command.format(python=sys.executable, workers=options['workers'], port=port))
+            try:
+                server = start_server(argv, port)
+            except (OSError, RuntimeError) as exc:
+                raise CommandError(f'Could not start {name}: {exc}')
+            try:
+                results[name] = {}
+                for level in levels:
+                    self.stdout.write(f'{name}: {level} concurrent users...')
+                    results[name][level] = asyncio.run(run_load(
+                        f'http://127.0.0.1:{port}',
+                        accounts,
+                        concurrency=level,
+                        duration=options['duration'],
+                        writes=False,
+                    ))
+            finally:
+                stop_server(server)
+
+        self.report(results, levels)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump({'workers': options['workers'], 'results': results}, handle, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+    def report(self, results, levels):
+        self.stdout.write(f"{'server':<16} {'users':>6} {'req/s':>9} {'errors':>7} {'feed p95':>9} {'feed p99':>9}")
+        for name, runs in results.items():
+            for level in levels:
+                result = runs[level]
+                feed = result['endpoints'].get('feed', {})
+                self.stdout.write(
+                    f"{name:<16} {level:>6} {result['totals']['throughput']:>9} "
+                    f"{result['totals']['errors']:>7} {feed.get('p95_ms', '-'):>9} {feed.get('p99_ms', '-'):>9}"
+                )
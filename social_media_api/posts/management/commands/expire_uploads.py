@@ -0,0 +1,33 @@
+"""
+Django management command to delete abandoned resumable uploads.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.uploads import expire_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete upload sessions left unfinished for CHUNKED_UPLOAD_TTL, with their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Keep running, checking for expired uploads every SECONDS'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the cleanup."""
+        while True:
+            count = expire_uploads(batch_size=options['batch_size'])
+            if count:
+                self.stdout.write(self.style.SUCCESS(f'Deleted {count} expired uploads'))
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
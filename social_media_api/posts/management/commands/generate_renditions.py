@@ -0,0 +1,45 @@
+"""
+Django management command to (re)build image renditions for existing uploads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.renditions import needs_renditions, run_in_worker
+
+
+class Command(BaseCommand):
+    help = 'Generate missing renditions for post images and profile pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'IMAGE_RENDITION_WORKERS', 2)
+        )
+
+    def handle(self, *args, **options):
+        """Execute the rendition backfill."""
+        targets = [
+            (Post, 'image', 'image_renditions'),
+            (get_user_model(), 'profile_picture', 'profile_picture_renditions'),
+        ]
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for model, field_name, renditions_field in targets:
+                queryset = model.objects.exclude(**{field_name: ''}).exclude(
+                    **{f'{field_name}__isnull': True}
+                ).only('pk', field_name, renditions_field)
+
+                queued = 0
+                for instance in queryset.iterator(chunk_size=500):
+                    if needs_renditions(instance, field_name, renditions_field):
+                        executor.submit(run_in_worker, model, instance.pk, field_name, renditions_field)
+                        queued += 1
+                self.stdout.write(f'Queued {queued} {model._meta.verbose_name_plural}')
+
+        self.stdout.write(self.style.SUCCESS('Renditions generated'))
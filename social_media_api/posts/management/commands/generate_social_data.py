@@ -0,0 +1,267 @@
+"""
+Django management command to generate a production-shaped synthetic social graph.
+
+Follower counts follow a power law (a few accounts are followed by a large
+share of users), likes arrive in bursts shortly after a post is published,
+and comments form threads several replies deep. The same --seed always
+produces the same data.
+"""
+
+import random
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.authtoken.models import Token
+
+from accounts.models import CustomUser, Follow, UserProfile
+from notifications.models import Notification
+from posts.bulk import chunked, original_timestamps
+from posts.models import Comment, Like, Post, PostHashtag
+
+
+PRESETS = {
+    '10k': {'users': 10_000, 'follows': 20, 'posts': 5, 'likes': 8, 'comments': 3},
+    '100k': {'users': 100_000, 'follows': 20, 'posts': 5, 'likes': 8, 'comments': 3},
+    '1m': {'users': 1_000_000, 'follows': 15, 'posts': 3, 'likes': 5, 'comments': 2},
+}
+HASHTAGS = ['django', 'python', 'music', 'travel', 'food', 'news', 'sports', 'art', 'tech', 'photo']
+WORDS = (
+    'the quick brown fox jumps over lazy dog today we shipped a new feature '
+    'coffee morning weekend project release great team idea question thanks'
+).split()
+START = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+DAYS = 365
+
+
+class Command(BaseCommand):
+    help = 'Generate users, follows, posts, likes, comments and notifications for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', choices=PRESETS, default='10k')
+        parser.add_argument('--users', type=int, help='Override the preset user count')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='user', help='Username prefix')
+        parser.add_argument('--password', default='password', help='Password shared by every user')
+        parser.add_argument(
+            '--notification-rate',
+            type=float,
+            default=0.5,
+            help='Share of follows, likes and comments that leave a notification'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the generator."""
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError('The database backend must return ids from bulk inserts.')
+
+        self.config = dict(PRESETS[options['preset']])
+        if options['users'] is not None:
+            if options['users'] < 1:
+                raise CommandError('--users must be at least 1.')
+            self.config['users'] = options['users']
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = max(1, options['chunk_size'])
+        self.prefix = options['prefix']
+        self.notification_rate = options['notification_rate']
+        self.rows = {}
+
+        if CustomUser.objects.filter(username=f'{self.prefix}0000000').exists():
+            raise CommandError(f'Users with prefix {self.prefix!r} already exist; pick another --prefix')
+
+        self.post_type = ContentType.objects.get_for_model(Post)
+        self.comment_type = ContentType.objects.get_for_model(Comment)
+        started = time.monotonic()
+
+        with original_timestamps(CustomUser, Follow, Post, Comment, Like, Notification):
+            self.timed('users', self.create_users, options['password'])
+            self.timed('follows', self.create_follows)
+            self.timed('posts', self.create_posts)
+
+        total_seconds = time.monotonic() - started
+        total_rows = sum(self.rows.values())
+        for table, count in self.rows.items():
+            self.stdout.write(f'  {table}: {count} rows')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total_rows} rows in {total_seconds:.1f}s '
+            f'({total_rows / total_seconds:.0f} rows/s)'
+        ))
+
+    def timed(self, name, step, *args):
+        started = time.monotonic()
+        rows_before = sum(self.rows.values())
+        step(*args)
+        seconds = time.monotonic() - started
+        rows = sum(self.rows.values()) - rows_before
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: {rows} rows in {seconds:.1f}s ({rows / seconds:.0f} rows/s)'
+        ))
+
+    def insert(self, table, model, objects, **kwargs):
+        objects = model.objects.bulk_create(objects, batch_size=self.chunk_size, **kwargs)
+        self.rows[table] = self.rows.get(table, 0) + len(objects)
+        return objects
+
+    def heavy_tailed(self, mean, cap_factor=50):
+        """Draw a count with the given mean from a Pareto(2) distribution."""
+        return min(int(mean / 2 * self.rng.paretovariate(2)), int(mean * cap_factor))
+
+    def timestamp(self, after=START, within=timedelta(days=DAYS)):
+        return after + timedelta(seconds=self.rng.random() * within.total_seconds())
+
+    def pick_user(self):
+        """Pick one user, favouring popular ones (Zipf-weighted)."""
+        index = bisect_left(self.popularity, self.rng.random() * self.popularity[-1])
+        return self.user_ids[min(index, len(self.user_ids) - 1)]
+
+    def sample_users(self, count, exclude=None):
+        """Pick distinct users, favouring popular ones (Zipf-weighted)."""
+        # Capped well below the user count so rare users need not all be drawn.
+        count = min(count, (len(self.user_ids) - 1) // 2)
+        chosen = set()
+        while len(chosen) < count:
+            user_id = self.pick_user()
+            if user_id != exclude:
+                chosen.add(user_id)
+        return chosen
+
+    def create_users(self, password):
+        hashed = make_password(password)
+        self.user_ids = []
+        for start in range(0, self.config['users'], self.chunk_size):
+            numbers = range(start, min(start + self.chunk_size, self.config['users']))
+            with transaction.atomic():
+                users = self.insert('users', CustomUser, [
+                    CustomUser(
+                        username=f'{self.prefix}{number:07d}',
+                        email=f'{self.prefix}{number:07d}@example.com',
+                        password=hashed,
+                        first_name=self.rng.choice(WORDS).title(),
+                        date_joined=self.timestamp(),
+                    )
+                    for number in numbers
+                ])
+                self.insert('profiles', UserProfile, [UserProfile(user_id=user.pk) for user in users])
+                self.insert('tokens', Token, [Token(key=Token.generate_key(), user_id=user.pk) for user in users])
+            self.user_ids.extend(user.pk for user in users)
+            self.stdout.write(f'Created {len(self.user_ids)} users...')
+
+        # Popularity rank is independent of signup order.
+        ranks = list(range(len(self.user_ids)))
+        self.rng.shuffle(ranks)
+        self.user_ids = [self.user_ids[rank] for rank in ranks]
+        self.popularity = list(accumulate(1 / (rank + 1) for rank in range(len(self.user_ids))))
+
+    def create_follows(self):
+        for chunk in chunked(self.user_ids, self.chunk_size // 10 or 1):
+            follows, notifications = [], []
+            for follower_id in chunk:
+                for followed_id in self.sample_users(self.heavy_tailed(self.config['follows']), follower_id):
+                    created_at = self.timestamp()
+                    follows.append(Follow(follower_id=follower_id, followed_id=followed_id, created_at=created_at))
+                    if self.rng.random() < self.notification_rate:
+                        notifications.append(Notification(
+                            recipient_id=followed_id, actor_id=follower_id, verb='follow',
+                            message='started following you', created_at=created_at, timestamp=created_at,
+                        ))
+            with transaction.atomic():
+                self.insert('follows', Follow, follows, ignore_conflicts=True)
+                self.insert('notifications', Notification, notifications)
+
+    def create_posts(self):
+        for chunk in chunked(self.user_ids, self.chunk_size // 10 or 1):
+            posts = []
+            for author_id in chunk:
+                for _ in range(self.heavy_tailed(self.config['posts'])):
+                    tags = self.rng.sample(HASHTAGS, self.rng.randint(0, 2))
+                    words = self.rng.choices(WORDS, k=self.rng.randint(5, 40))
+                    created_at = self.timestamp()
+                    posts.append(Post(
+                        author_id=author_id,
+                        title=' '.join(words[:5]).capitalize(),
+                        content=' '.join(words + [f'#{tag}' for tag in tags]),
+                        created_at=created_at,
+                        updated_at=created_at,
+                    ))
+            if not posts:
+                continue
+            with transaction.atomic():
+                posts = self.insert('posts', Post, posts)
+                self.insert('hashtags', PostHashtag, [
+                    PostHashtag(post_id=post.pk, tag=word[1:], created_at=post.created_at)
+                    for post in posts
+                    for word in post.content.split()
+                    if word.startswith('#')
+                ], ignore_conflicts=True)
+                self.create_likes(posts)
+                self.create_comments(posts)
+            self.stdout.write(f"Created {self.rows['posts']} posts...")
+
+    def create_likes(self, posts):
+        likes, notifications = [], []
+        for post in posts:
+            for user_id in self.sample_users(self.heavy_tailed(self.config['likes']), post.author_id):
+                # Bursty: most likes land within hours of publishing.
+                created_at = post.created_at + timedelta(hours=self.rng.expovariate(1 / 3))
+                likes.append(Like(user_id=user_id, post_id=post.pk, created_at=created_at))
+                if self.rng.random() < self.notification_rate:
+                    notifications.append(Notification(
+                        recipient_id=post.author_id, actor_id=user_id, verb='like',
+                        target_content_type=self.post_type, target_object_id=post.pk,
+                        message='liked your post', created_at=created_at, timestamp=created_at,
+                    ))
+        self.insert('likes', Like, likes, ignore_conflicts=True)
+        self.insert('notifications', Notification, notifications)
+
+    def create_comments(self, posts):
+        """Build comment threads and insert them one depth level at a time."""
+        levels = []
+        for post in posts:
+            thread = []
+            for _ in range(self.heavy_tailed(self.config['comments'])):
+                # Half of the comments reply to an earlier one, so threads get deep.
+                parent = self.rng.choice(thread) if thread and self.rng.random() < 0.5 else None
+                depth = parent['depth'] + 1 if parent else 0
+                after = parent['created_at'] if parent else post.created_at
+                node = {
+                    'post': post,
+                    'parent': parent,
+                    'depth': depth,
+                    'author_id': self.pick_user(),
+                    'created_at': after + timedelta(minutes=self.rng.expovariate(1 / 30)),
+                }
+                thread.append(node)
+                while len(levels) <= depth:
+                    levels.append([])
+                levels[depth].append(node)
+
+        notifications = []
+        for level in levels:
+            comments = self.insert('comments', Comment, [
+                Comment(
+                    post_id=node['post'].pk,
+                    parent_comment_id=node['parent']['pk'] if node['parent'] else None,
+                    author_id=node['author_id'],
+                    content=' '.join(self.rng.choices(WORDS, k=self.rng.randint(3, 20))),
+                    created_at=node['created_at'],
+                    updated_at=node['created_at'],
+                )
+                for node in level
+            ])
+            for node, comment in zip(level, comments):
+                node['pk'] = comment.pk
+                post = node['post']
+                if post.author_id != node['author_id'] and self.rng.random() < self.notification_rate:
+                    notifications.append(Notification(
+                        recipient_id=post.author_id, actor_id=node['author_id'], verb='comment',
+                        target_content_type=self.comment_type, target_object_id=comment.pk,
+                        message='commented on your post',
+                        created_at=node['created_at'], timestamp=node['created_at'],
+                    ))
+        self.insert('notifications', Notification, notifications)
@@ -0,0 +1,216 @@
+"""
+Django management command to bulk import posts, comments and likes from a JSONL dump.
+
+Each line is one post:
+
+    {"author": "alice", "title": "...", "content": "...", "created_at": "2021-05-01T10:00:00Z",
+     "is_published": true, "views_count": 12, "likes": ["bob"],
+     "comments": [{"author": "bob", "content": "...", "created_at": "...", "likes": ["alice"],
+                   "replies": [{"author": "alice", "content": "..."}]}]}
+"""
+
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import CustomUser
+from posts.bulk import chunked, original_timestamps
+from posts.entities import extract_hashtags, extract_mentions
+from posts.models import Comment, Like, Post, PostHashtag, PostMention
+
+
+def read_posts(path):
+    """Yield post dicts from the dump one line at a time."""
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = 'Bulk import posts, comments and likes from a JSONL dump'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL file with one post per line')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        """Execute the import command."""
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError('The database backend must return ids from bulk inserts.')
+
+        chunk_size = max(1, options['chunk_size'])
+        self.user_ids = {}
+        self.imported_ranges = []
+        self.counts = {'posts': 0, 'comments': 0, 'likes': 0, 'skipped': 0}
+        started = time.monotonic()
+
+        with original_timestamps(Post, Comment, Like):
+            for chunk in chunked(read_posts(path), chunk_size):
+                with transaction.atomic():
+                    self.import_chunk(chunk)
+                self.stdout.write(f"Imported {self.counts['posts']} posts...")
+
+        hashtags, mentions = self.rebuild_entities(chunk_size)
+
+        elapsed = time.monotonic() - started
+        rate = self.counts['posts'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.counts['posts']} posts, {self.counts['comments']} comments and "
+            f"{self.counts['likes']} likes ({hashtags} hashtags, {mentions} mentions), "
+            f"skipped {self.counts['skipped']} in {elapsed:.1f}s ({rate:.0f} posts/s)"
+        ))
+
+    def resolve_users(self, usernames):
+        """Fill the username -> id cache with one query per batch of new names."""
+        missing = {name for name in usernames if name not in self.user_ids}
+        if missing:
+            found = dict(
+                CustomUser.objects.filter(username__in=missing).values_list('username', 'id')
+            )
+            for name in missing:
+                self.user_ids[name] = found.get(name)
+
+    def import_chunk(self, chunk):
+        """Insert the posts of one chunk, then their comments and likes."""
+        usernames = set()
+        for row in chunk:
+            usernames.add(row.get('author'))
+            usernames.update(row.get('likes') or ())
+            for comment in iter_comments(row.get('comments') or ()):
+                usernames.add(comment.get('author'))
+                usernames.update(comment.get('likes') or ())
+        self.resolve_users(usernames)
+
+        rows, posts = [], []
+        for row in chunk:
+            author_id = self.user_ids.get(row.get('author'))
+            if author_id is None or not row.get('title'):
+                self.counts['skipped'] += 1
+                continue
+            created_at = parse_timestamp(row.get('created_at'))
+            rows.append(row)
+            posts.append(Post(
+                author_id=author_id,
+                title=row['title'][:255],
+                content=row.get('content') or '',
+                is_published=row.get('is_published', True),
+                created_at=created_at,
+                updated_at=parse_timestamp(row.get('updated_at'), created_at),
+                views_count=row.get('views_count') or 0,
+            ))
+        if not posts:
+            return
+
+        posts = Post.objects.bulk_create(posts)
+        self.imported_ranges.append((posts[0].pk, posts[-1].pk))
+        self.counts['posts'] += len(posts)
+
+        likes = [
+            Like(user_id=self.user_ids[name], post_id=post.pk, created_at=post.created_at)
+            for row, post in zip(rows, posts)
+            for name in set(row.get('likes') or ())
+            if self.user_ids.get(name)
+        ]
+        Like.objects.bulk_create(likes, ignore_conflicts=True)
+        self.counts['likes'] += len(likes)
+
+        # Replies need their parent's id, so comments go in one level at a time.
+        level = [
+            (post, None, comment)
+            for row, post in zip(rows, posts)
+            for comment in row.get('comments') or ()
+        ]
+        while level:
+            known = [item for item in level if self.user_ids.get(item[2].get('author'))]
+            self.counts['skipped'] += len(level) - len(known)
+            level = known
+            comments = Comment.objects.bulk_create([
+                Comment(
+                    post_id=post.pk,
+                    parent_comment_id=parent_id,
+                    author_id=self.user_ids[data['author']],
+                    content=(data.get('content') or '')[:1000],
+                    created_at=parse_timestamp(data.get('created_at'), post.created_at),
+                    updated_at=parse_timestamp(data.get('created_at'), post.created_at),
+                )
+                for post, parent_id, data in level
+            ])
+            self.counts['comments'] += len(comments)
+
+            comment_likes = [
+                Comment.likes.through(comment_id=comment.pk, customuser_id=self.user_ids[name])
+                for comment, (_, _, data) in zip(comments, level)
+                for name in set(data.get('likes') or ())
+                if self.user_ids.get(name)
+            ]
+            Comment.likes.through.objects.bulk_create(comment_likes, ignore_conflicts=True)
+            self.counts['likes'] += len(comment_likes)
+
+            level = [
+                (post, comment.pk, reply)
+                for comment, (post, _, data) in zip(comments, level)
+                for reply in data.get('replies') or ()
+            ]
+
+    def rebuild_entities(self, chunk_size):
+        """
+        Index hashtags and mentions for every imported post in one pass.
+
+        Mentions are stored as already notified: migrated content should
+        not send a burst of notifications about old posts.
+        """
+        hashtags = mentions = 0
+        for first, last in self.imported_ranges:
+            rows = (
+                Post.objects.filter(pk__range=(first, last))
+                .order_by()
+                .values('id', 'author_id', 'title', 'content', 'created_at')
+                .iterator(chunk_size=chunk_size)
+            )
+            for batch in chunked(rows, chunk_size):
+                names = {post['id']: extract_mentions(post['title'], post['content']) for post in batch}
+                self.resolve_users(set().union(*names.values()))
+
+                tag_rows = [
+                    PostHashtag(post_id=post['id'], tag=tag, created_at=post['created_at'])
+                    for post in batch
+                    for tag in extract_hashtags(post['title'], post['content'])
+                ]
+                mention_rows = [
+                    PostMention(post_id=post['id'], user_id=self.user_ids[name], notified=True)
+                    for post in batch
+                    for name in names[post['id']]
+                    if self.user_ids.get(name) not in (None, post['author_id'])
+                ]
+                with transaction.atomic():
+                    PostHashtag.objects.bulk_create(tag_rows, ignore_conflicts=True)
+                    PostMention.objects.bulk_create(mention_rows, ignore_conflicts=True)
+                hashtags += len(tag_rows)
+                mentions += len(mention_rows)
+        return hashtags, mentions
+
+
+def iter_comments(comments):
+    for comment in comments:
+        yield comment
+        yield from iter_comments(comment.get('replies') or ())
+
+
+def parse_timestamp(value, default=None):
+    """Parse an ISO 8601 timestamp, treating naive values as the current timezone."""
+    parsed = parse_datetime(value) if value else None
+    if parsed is None:
+        return default or timezone.now()
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
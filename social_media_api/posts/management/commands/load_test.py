@@ -0,0 +1,125 @@
+"""
+Django management command to load test the API with scripted user sessions.
+
+By default it starts ``runserver`` on a free local port against the
+configured database, so point ``SQLITE_PATH`` (or the production settings)
+at a database filled by ``generate_social_data`` first.
+"""
+
+import asyncio
+import json
+import os
+import shlex
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from social_media_api.loadtest import compare, free_port, run_load, start_server, stop_server
+
+
+class Command(BaseCommand):
+    help = 'Run concurrent feed/like/comment/notification sessions and report latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='Test a running server instead of starting one')
+        parser.add_argument(
+            '--server-command',
+            help='Command that starts the server; {port} is replaced (default: manage.py runserver)'
+        )
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--duration', type=float, default=30, help='Seconds')
+        parser.add_argument('--think-time', type=float, default=0.0, help='Mean pause between requests, in seconds')
+        parser.add_argument('--comment-rate', type=float, default=0.2, help='Share of sessions that comment')
+        parser.add_argument('--read-only', action='store_true', help='Skip the like and comment steps')
+        parser.add_argument('--prefix', default='user', help='Username prefix of the accounts to use')
+        parser.add_argument('--accounts', type=int, help='Accounts to use (default: --concurrency)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON result to this file')
+        parser.add_argument('--baseline', help='JSON result of an earlier run to compare against')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Allowed relative change against the baseline before failing'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the load test."""
+        accounts = list(
+            Token.objects.filter(user__username__startswith=options['prefix'], user__is_active=True)
+            .order_by('user_id')
+            .values_list('user_id', 'key')[:options['accounts'] or options['concurrency']]
+        )
+        if not accounts:
+            raise CommandError(
+                f"No users with prefix {options['prefix']!r} have tokens; run generate_social_data first"
+            )
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as handle:
+                baseline = json.load(handle)
+
+        server = None
+        base_url = options['base_url']
+        if not base_url:
+            port = free_port()
+            server = self.start_server(options['server_command'], port)
+            base_url = f'http://127.0.0.1:{port}'
+        try:
+            result = asyncio.run(run_load(
+                base_url,
+                accounts,
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                think_time=options['think_time'],
+                comment_rate=options['comment_rate'],
+                seed=options['seed'],
+                writes=not options['read_only'],
+            ))
+        finally:
+            if server is not None:
+                stop_server(server)
+
+        self.report(result)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(result, handle, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(result, baseline, options['tolerance'])
+            for endpoint, metric, before, after in regressions:
+                self.stdout.write(self.style.ERROR(f'{endpoint} {metric}: {before} -> {after}'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def start_server(self, command, port):
+        if command:
+            argv = shlex.split(command.format(port=port))
+        else:
+            manage = os.path.join(settings.BASE_DIR, 'manage.py')
+            argv = [sys.executable, manage, 'runserver', f'127.0.0.1:{port}', '--noreload']
+        try:
+            return start_server(argv, port)
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+    def report(self, result):
+        self.stdout.write(
+            f"{'endpoint':<20} {'requests':>8} {'errors':>6} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for endpoint, stats in result['endpoints'].items():
+            self.stdout.write(
+                f"{endpoint:<20} {stats['requests']:>8} {stats['errors']:>6} {stats['throughput']:>8} "
+                f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}"
+            )
+        totals = result['totals']
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['requests']} requests, {totals['errors']} errors, "
+            f"{totals['throughput']} req/s over {result['duration_seconds']}s"
+        ))
+
@@ -0,0 +1,33 @@
+"""
+Django management command to publish scheduled posts that are due.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.scheduling import publish_due_posts
+
+
+class Command(BaseCommand):
+    help = 'Publish drafts whose publish_at time has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Keep running, checking for due posts every SECONDS'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the publisher."""
+        while True:
+            count = publish_due_posts(batch_size=options['batch_size'])
+            if count:
+                self.stdout.write(self.style.SUCCESS(f'Published {count} scheduled posts'))
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
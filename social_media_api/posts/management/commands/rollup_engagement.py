@@ -0,0 +1,34 @@
+"""
+Django management command to fold new engagement into the dashboard rollups.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.rollups import roll_up_engagement
+
+
+class Command(BaseCommand):
+    help = 'Add new likes, comments and follows to the hourly and daily engagement rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--loop',
+            type=int,
+            default=0,
+            metavar='SECONDS',
+            help='Keep running, rolling up new rows every SECONDS'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the rollup."""
+        while True:
+            read = roll_up_engagement(batch_size=options['batch_size'])
+            if read:
+                summary = ', '.join(f'{count} {source}' for source, count in read.items())
+                self.stdout.write(self.style.SUCCESS(f'Rolled up {summary}'))
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
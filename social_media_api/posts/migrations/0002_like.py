@@ -0,0 +1,64 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_post_likes(apps, schema_editor):
+    """Move rows from the implicit post/user table into Like."""
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    Through = Post.likes.through
+    Like.objects.bulk_create(
+        [
+            Like(post_id=row.post_id, user_id=row.customuser_id)
+            for row in Through.objects.all()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Like',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_likes', to='posts.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(copy_post_likes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='post',
+            name='likes',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes',
+            field=models.ManyToManyField(blank=True, related_name='liked_posts', through='posts.Like', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['user', 'post'], name='posts_like_user_id_88178d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['created_at'], name='posts_like_created_1d3e7e_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='like',
+            unique_together={('user', 'post')},
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_mediaupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='impressions_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='views_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
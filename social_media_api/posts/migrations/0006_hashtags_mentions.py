@@ -0,0 +1,69 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from posts.entities import extract_hashtags, extract_mentions
+
+
+def backfill_entities(apps, schema_editor):
+    """Index hashtags and mentions of existing posts (without notifying)."""
+    Post = apps.get_model('posts', 'Post')
+    PostHashtag = apps.get_model('posts', 'PostHashtag')
+    PostMention = apps.get_model('posts', 'PostMention')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    posts = Post.objects.only('id', 'author_id', 'title', 'content', 'created_at')
+    for post in posts.iterator(chunk_size=1000):
+        PostHashtag.objects.bulk_create([
+            PostHashtag(post_id=post.id, tag=tag, created_at=post.created_at)
+            for tag in extract_hashtags(post.title, post.content)
+        ], ignore_conflicts=True)
+        usernames = extract_mentions(post.title, post.content)
+        if usernames:
+            user_ids = User.objects.filter(username__in=usernames).exclude(
+                pk=post.author_id
+            ).values_list('pk', flat=True)
+            PostMention.objects.bulk_create([
+                PostMention(post_id=post.id, user_id=user_id, notified=True)
+                for user_id in user_ids
+            ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0005_post_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostMention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notified', models.BooleanField(default=False)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_mentions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('post', 'user')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PostHashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hashtags', to='posts.post')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['tag', '-created_at'], name='posts_posth_tag_5c6f43_idx')],
+                'unique_together': {('post', 'tag')},
+            },
+        ),
+        migrations.RunPython(backfill_entities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_engagement_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['author', '-created_at'], name='post_author_published_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_feed_author_published_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mediaupload',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'Uploading'), ('finalizing', 'Finalizing'), ('complete', 'Complete'), ('attached', 'Attached')], default='uploading', max_length=20),
+        ),
+    ]
@@ -1,12 +1,18 @@
-from django.db import models
-from django.conf import settings
-from django.utils import timezone
+import uuid
 
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .entities import sync_post_entities
+from .renditions import needs_renditions, schedule_renditions
 
 
 # Add this model before the Post model
@@ -51,6 +57,7 @@ class Post(models.Model):
     
     # Optional fields for future enhancements
     image = models.ImageField(upload_to='posts/images/', blank=True, null=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     likes = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
         related_name='liked_posts',
@@ -58,61 +65,41 @@ class Post(models.Model):
         blank=True
     )
     is_published = models.BooleanField(default=True)
+    # Drafts with a publish_at are flipped by `manage.py publish_scheduled_posts`.
+    publish_at = models.DateTimeField(null=True, blank=True)
     
-    class Meta:
-        ordering = ['-created_at']
-        indexes = [
-            models.Index(fields=['-created_at']),
-            models.Index(fields=['author', '-created_at']),
-        ]
-    
-    def __str__(self):
-        return f"{self.title} by {self.author.username}"
-    
-    @property
-    def likes_count(self):
-        return self.likes.count()
-    
-    @property
-    def comments_count(self):
-        return self.comments.count()
-        
-class Post(models.Model):
-    """Model for user posts in the social media platform."""
-    author = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        related_name='posts'
-    )
-    title = models.CharField(max_length=255)
-    content = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
-    # Optional fields for future enhancements
-    image = models.ImageField(upload_to='posts/images/', blank=True, null=True)
-    likes = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
-        related_name='liked_posts',
-        blank=True
-    )
-    is_published = models.BooleanField(default=True)
+    # Written in batches by posts.counters, so they may lag by a few seconds.
+    views_count = models.PositiveBigIntegerField(default=0, editable=False)
+    impressions_count = models.PositiveBigIntegerField(default=0, editable=False)
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['author', '-created_at']),
+            # Published-post listings never have to walk past drafts.
+            models.Index(fields=['is_published', '-created_at'], name='post_published_recent_idx'),
+            # Due scheduled posts for the publisher job.
+            models.Index(fields=['is_published', 'publish_at'], name='post_scheduled_idx'),
+            # Feed reads and "new posts" counts scan one range per followed
+            # author; drafts are left out of the index altogether.
+            models.Index(
+                fields=['author', '-created_at'],
+                condition=models.Q(is_published=True),
+                name='post_author_published_idx'
+            ),
         ]
     
     def __str__(self):
         return f"{self.title} by {self.author.username}"
     
-    @property
+    # cached_property so list views can fill these with annotations
+    # (see with_post_counts) instead of two COUNTs per post.
+    @cached_property
     def likes_count(self):
         return self.likes.count()
     
-    @property
+    @cached_property
     def comments_count(self):
         return self.comments.count()
 
@@ -157,10 +144,170 @@ class Comment(models.Model):
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
     
-    @property
+    # Filled by with_comment_counts in list views.
+    @cached_property
     def likes_count(self):
         return self.likes.count()
     
-    @property
+    @cached_property
     def replies_count(self):
-        return self.replies.count()
\ No newline at end of file
+        return self.replies.count()
+
+
+def _related_count(queryset, field):
+    rows = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows), Value(0))
+
+
+def with_post_counts(queryset):
+    """Annotate posts with likes_count and comments_count in the same query."""
+    return queryset.annotate(
+        likes_count=_related_count(Like.objects.all(), 'post'),
+        comments_count=_related_count(Comment.objects.all(), 'post'),
+    )
+
+
+def with_comment_counts(queryset):
+    """Annotate comments with likes_count and replies_count in the same query."""
+    return queryset.annotate(
+        likes_count=_related_count(Comment.likes.through.objects.all(), 'comment'),
+        replies_count=_related_count(Comment.objects.all(), 'parent_comment'),
+    )
+
+
+class MediaUpload(models.Model):
+    """A resumable, chunked upload that can later be attached to a post."""
+    STATUS_CHOICES = (
+        ('uploading', 'Uploading'),
+        ('finalizing', 'Finalizing'),
+        ('complete', 'Complete'),
+        ('attached', 'Attached'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='media_uploads'
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    file = models.FileField(upload_to='posts/images/', blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+
+
+class PostHashtag(models.Model):
+    """A hashtag used in a post; backs the hashtag timelines."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='hashtags'
+    )
+    tag = models.CharField(max_length=100)
+    # Copied from the post so timelines page over (tag, created_at) alone.
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['post', 'tag']
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tag', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.tag} on post {self.post_id}"
+
+
+class PostMention(models.Model):
+    """A user @mentioned in a post."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='post_mentions'
+    )
+    notified = models.BooleanField(default=False)
+    
+    class Meta:
+        unique_together = ['post', 'user']
+    
+    def __str__(self):
+        return f"@{self.user_id} in post {self.post_id}"
+
+
+class EngagementRollup(models.Model):
+    """Likes, comments and new followers an author received in one period."""
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    period_start = models.DateTimeField()
+    likes = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    follows = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        abstract = True
+        unique_together = ['author', 'period_start']
+        ordering = ['period_start']
+    
+    def __str__(self):
+        return f"{self.author_id} at {self.period_start:%Y-%m-%d %H:00}"
+
+
+class HourlyEngagement(EngagementRollup):
+    """Engagement per author and UTC hour, kept by posts.rollups."""
+
+
+class DailyEngagement(EngagementRollup):
+    """Engagement per author and UTC day, kept by posts.rollups."""
+
+
+class RollupWatermark(models.Model):
+    """The last source row id folded into the engagement rollups."""
+    source = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.source} up to {self.last_id}"
+
+
+@receiver(post_save, sender=Post)
+def queue_post_image_renditions(sender, instance, **kwargs):
+    """Render resized variants of a new or changed post image off-request."""
+    if needs_renditions(instance, 'image', 'image_renditions'):
+        schedule_renditions(instance, 'image', 'image_renditions')
+
+
+@receiver(post_save, sender=Post)
+def sync_post_hashtags_and_mentions(sender, instance, created, update_fields=None, **kwargs):
+    """Re-parse hashtags and mentions when a post's text or visibility changes."""
+    if update_fields and not {'title', 'content', 'is_published'} & set(update_fields):
+        return
+    sync_post_entities(instance, created=created)
@@ -0,0 +1,148 @@
+"""
+Image renditions for post images and profile pictures.
+
+Uploads are stored as-is; after the transaction commits, a background
+thread pool renders resized JPEG and WebP variants with content-hash file
+names and records their storage paths on the model.
+"""
+
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from rest_framework import serializers
+
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; images are never upscaled.
+RENDITION_SIZES = {
+    'thumbnail': 150,
+    'medium': 600,
+    'large': 1200,
+}
+RENDITION_FORMATS = {
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_RENDITION_WORKERS', 2),
+            thread_name_prefix='renditions'
+        )
+    return _executor
+
+
+def needs_renditions(instance, field_name, renditions_field):
+    """Return True if the image changed since renditions were last built."""
+    image = getattr(instance, field_name)
+    renditions = getattr(instance, renditions_field) or {}
+    default = instance._meta.get_field(field_name).get_default()
+    if not image or image.name == default:
+        return bool(renditions)
+    return renditions.get('source') != image.name
+
+
+def schedule_renditions(instance, field_name, renditions_field):
+    """Queue rendition generation once the current transaction commits."""
+    model = type(instance)
+    pk = instance.pk
+
+    def submit():
+        if getattr(settings, 'IMAGE_RENDITIONS_ASYNC', True):
+            get_executor().submit(run_in_worker, model, pk, field_name, renditions_field)
+        else:
+            generate_renditions(model, pk, field_name, renditions_field)
+
+    transaction.on_commit(submit)
+
+
+def run_in_worker(model, pk, field_name, renditions_field):
+    close_old_connections()
+    try:
+        generate_renditions(model, pk, field_name, renditions_field)
+    except Exception:
+        logger.exception('Rendition generation failed for %s %s', model.__name__, pk)
+    finally:
+        close_old_connections()
+
+
+def generate_renditions(model, pk, field_name, renditions_field):
+    """Render every size/format for one object and store the paths."""
+    from PIL import Image, ImageOps
+
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not needs_renditions(instance, field_name, renditions_field):
+        return None
+
+    image_file = getattr(instance, field_name)
+    renditions = {}
+    if image_file:
+        try:
+            with image_file.open('rb') as handle:
+                data = handle.read()
+        except (FileNotFoundError, OSError):
+            logger.warning('Missing image %s for %s %s', image_file.name, model.__name__, pk)
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        original = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+        renditions['source'] = image_file.name
+
+        for label, size in RENDITION_SIZES.items():
+            resized = original.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            entry = {'width': resized.width, 'height': resized.height}
+            for ext, options in RENDITION_FORMATS.items():
+                path = f"renditions/{digest[:2]}/{digest}-{label}.{ext}"
+                if not default_storage.exists(path):
+                    frame = resized
+                    if options['format'] == 'JPEG' and frame.mode != 'RGB':
+                        frame = frame.convert('RGB')
+                    buffer = BytesIO()
+                    frame.save(buffer, **options)
+                    default_storage.save(path, ContentFile(buffer.getvalue()))
+                entry[ext] = path
+            renditions[label] = entry
+
+    setattr(instance, renditions_field, renditions)
+    instance.save(update_fields=[renditions_field])
+    return renditions
+
+
+def rendition_urls(value, request=None):
+    """Public URLs for stored renditions, or None until they exist."""
+    if not value:
+        return None
+    data = {}
+    for label in RENDITION_SIZES:
+        entry = value.get(label)
+        if not entry:
+            continue
+        data[label] = {'width': entry['width'], 'height': entry['height']}
+        for ext in RENDITION_FORMATS:
+            url = default_storage.url(entry[ext])
+            data[label][ext] = request.build_absolute_uri(url) if request else url
+    return data
+
+
+class RenditionsField(serializers.Field):
+    """Read-only field exposing rendition URLs, or None until they exist."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return rendition_urls(value, self.context.get('request'))
@@ -0,0 +1,44 @@
+"""
+Batch publisher for scheduled posts.
+"""
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from .entities import notify_pending_mentions_for_posts
+from .models import Post, PostHashtag
+
+
+def publish_due_posts(now=None, batch_size=500):
+    """
+    Publish every draft whose publish_at has passed, one batch at a time.
+
+    Published posts take publish_at as their created_at so they appear at
+    the top of feeds and hashtag timelines rather than at draft time.
+    Returns the number of posts published.
+    """
+    now = now or timezone.now()
+    published = 0
+
+    while True:
+        ids = list(
+            Post.objects.filter(is_published=False, publish_at__lte=now)
+            .order_by('publish_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return published
+
+        with transaction.atomic():
+            count = Post.objects.filter(pk__in=ids, is_published=False).update(
+                is_published=True,
+                created_at=F('publish_at')
+            )
+            PostHashtag.objects.filter(post_id__in=ids).update(
+                created_at=Subquery(
+                    Post.objects.filter(pk=OuterRef('post_id')).values('created_at')[:1]
+                )
+            )
+            notify_pending_mentions_for_posts(ids)
+        published += count
@@ -1,7 +1,13 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Post, Comment
-from accounts.serializers import UserSerializer
+from django.db.models.functions import Substr
+from django.utils import timezone
+from .models import Post, Comment, Like, MediaUpload
+from accounts.models import follow_count_annotations
+from accounts.serializers import UserSerializer, user_representation, user_values
+from social_media_api.lean import LeanSerializer, datetime_repr, file_url
+from .renditions import RenditionsField, rendition_urls
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -46,20 +52,57 @@ class PostSerializer(serializers.ModelSerializer):
     comments_count = serializers.IntegerField(read_only=True)
     likes_count = serializers.IntegerField(read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
+    image_renditions = RenditionsField()
+    upload_id = serializers.PrimaryKeyRelatedField(
+        queryset=MediaUpload.objects.filter(status='complete'),
+        source='upload',
+        write_only=True,
+        required=False
+    )
     
     class Meta:
         model = Post
         fields = [
             'id', 'author', 'author_id', 'title', 'content', 'image',
-            'created_at', 'updated_at', 'is_published', 'likes_count',
-            'comments_count', 'comments'
+            'image_renditions', 'upload_id', 'created_at', 'updated_at', 'is_published', 'publish_at',
+            'likes_count', 'comments_count', 'comments'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'author']
     
+    def validate(self, attrs):
+        # A future publish_at keeps the post as a draft until the publisher runs.
+        publish_at = attrs.get('publish_at')
+        if publish_at and publish_at > timezone.now():
+            attrs['is_published'] = False
+        return attrs
+    
+    def validate_upload_id(self, upload):
+        if upload.owner_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Upload not found.")
+        return upload
+    
     def create(self, validated_data):
         # Ensure the author is the current user
         validated_data['author'] = self.context['request'].user
-        return super().create(validated_data)
+        upload = validated_data.pop('upload', None)
+        if upload:
+            validated_data['image'] = upload.file.name
+        post = super().create(validated_data)
+        self._mark_attached(upload)
+        return post
+    
+    def update(self, instance, validated_data):
+        upload = validated_data.pop('upload', None)
+        if upload:
+            validated_data['image'] = upload.file.name
+        post = super().update(instance, validated_data)
+        self._mark_attached(upload)
+        return post
+    
+    def _mark_attached(self, upload):
+        if upload:
+            upload.status = 'attached'
+            upload.save(update_fields=['status', 'updated_at'])
 
 
 class PostListSerializer(serializers.ModelSerializer):
@@ -68,11 +111,12 @@ class PostListSerializer(serializers.ModelSerializer):
     comments_count = serializers.IntegerField(read_only=True)
     likes_count = serializers.IntegerField(read_only=True)
     excerpt = serializers.SerializerMethodField()
+    image_renditions = RenditionsField()
     
     class Meta:
         model = Post
         fields = [
-            'id', 'author', 'title', 'excerpt', 'image', 
+            'id', 'author', 'title', 'excerpt', 'image', 'image_renditions',
             'created_at', 'likes_count', 'comments_count'
         ]
     
@@ -81,6 +125,39 @@ class PostListSerializer(serializers.ModelSerializer):
         return obj.content[:150] + '...' if len(obj.content) > 150 else obj.content
 
 
+class LeanPostListSerializer(LeanSerializer):
+    """
+    ``PostListSerializer`` output from ``values()`` rows.
+    
+    Expects a ``with_post_counts`` queryset; the author, profile and
+    follow counts come from the same query instead of two prefetches.
+    """
+    fields = (
+        'id', 'title', 'image', 'image_renditions', 'created_at',
+        'likes_count', 'comments_count', *user_values('author')
+    )
+    
+    @classmethod
+    def annotations(cls, request=None):
+        # One character past the excerpt is enough to know it was cut.
+        return {'excerpt': Substr('content', 1, 151), **follow_count_annotations('author')}
+    
+    def to_representation(self, row):
+        request = self.context.get('request')
+        excerpt = row['excerpt']
+        return {
+            'id': row['id'],
+            'author': user_representation(row, 'author', request),
+            'title': row['title'],
+            'excerpt': excerpt[:150] + '...' if len(excerpt) > 150 else excerpt,
+            'image': file_url(row['image'], request),
+            'image_renditions': rendition_urls(row['image_renditions'], request),
+            'created_at': datetime_repr(row['created_at']),
+            'likes_count': row['likes_count'],
+            'comments_count': row['comments_count'],
+        }
+
+
 class PostDetailSerializer(PostSerializer):
     """Serializer for detailed post view."""
     pass  # Same as PostSerializer, can be extended if needed
@@ -91,7 +168,7 @@ class FeedPostSerializer(PostSerializer):
     """Serializer for feed posts with additional follow context."""
     class Meta(PostSerializer.Meta):
         fields = [
-            'id', 'author', 'title', 'content', 'image',
+            'id', 'author', 'title', 'content', 'image', 'image_renditions',
             'created_at', 'likes_count', 'comments_count'
         ]
 
@@ -118,4 +195,19 @@ class PostDetailSerializer(PostSerializer):
     post_likes = LikeSerializer(many=True, read_only=True, source='post_likes.all')
     
     class Meta(PostSerializer.Meta):
-        fields = PostSerializer.Meta.fields + ['post_likes']
\ No newline at end of file
+        fields = PostSerializer.Meta.fields + ['post_likes']
+
+
+class MediaUploadSerializer(serializers.ModelSerializer):
+    """Serializer for resumable upload sessions."""
+    
+    class Meta:
+        model = MediaUpload
+        fields = ['id', 'filename', 'size', 'received', 'status', 'sha256', 'created_at']
+        read_only_fields = ['id', 'received', 'status', 'sha256', 'created_at']
+    
+    def validate_size(self, value):
+        max_size = getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+        if value <= 0 or value > max_size:
+            raise serializers.ValidationError(f"Size must be between 1 and {max_size} bytes.")
+        return value
@@ -1,3 +1,936 @@
-from django.test import TestCase
+"""
+Tests for the posts app.
+"""
 
-# Create your tests here.
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from collections import Counter
+from io import BytesIO, StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from accounts.models import CustomUser, Follow, UserProfile, prefetch_users
+from notifications.models import Notification
+from social_media_api.testing import QueryBudgetMixin
+
+from .counters import CounterBuffer
+from .entities import extract_hashtags, extract_mentions
+from .models import (
+    Comment, DailyEngagement, HourlyEngagement, Like, MediaUpload, Post, PostHashtag, PostMention, RollupWatermark,
+    with_post_counts
+)
+from .rollups import roll_up_engagement
+from .scheduling import publish_due_posts
+from .uploads import file_sha256, upload_dir
+from .serializers import LeanPostListSerializer, PostListSerializer
+from .views import (
+    AsyncFeedNewPostsView, AsyncFeedView, AsyncPostViewSet, FeedNewPostsView, FeedView, PostViewSet
+)
+
+
+def make_image(name='photo.png', size=(2000, 1000)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, (200, 30, 30, 255)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImageRenditionTests(APITestCase):
+    """Tests for the off-request image rendition pipeline."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_RENDITIONS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = CustomUser.objects.create_user(username='photographer', password='pw')
+        self.client.force_authenticate(self.user)
+
+    def test_post_image_renditions_are_built_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('post-list'), {
+                'title': 'Sunset',
+                'content': 'Look at this',
+                'author_id': self.user.id,
+                'image': make_image(),
+                'is_published': True,
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertEqual(post.image_renditions['source'], post.image.name)
+        self.assertEqual(post.image_renditions['thumbnail']['width'], 150)
+        self.assertEqual(post.image_renditions['large']['height'], 600)
+
+        response = self.client.get(reverse('post-list'))
+        renditions = response.data['results'][0]['image_renditions']
+        self.assertTrue(renditions['medium']['webp'].endswith('-medium.webp'))
+        self.assertTrue(renditions['medium']['jpeg'].startswith('http://testserver/'))
+
+    def test_identical_uploads_share_rendition_files(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Post.objects.create(author=self.user, title='a', content='a', image=make_image('a.png'))
+            second = Post.objects.create(author=self.user, title='b', content='b', image=make_image('b.png'))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image_renditions['thumbnail'], second.image_renditions['thumbnail'])
+
+
+class ChunkedUploadTests(APITestCase):
+    """Tests for the resumable chunked upload API."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            CHUNKED_UPLOAD_DIR=os.path.join(media_root, 'partial'),
+            IMAGE_RENDITIONS_ASYNC=False
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = CustomUser.objects.create_user(username='uploader', password='pw')
+        self.client.force_authenticate(self.user)
+        self.data = make_image(size=(300, 200)).read()
+
+    def put_chunk(self, upload_id, start, end):
+        return self.client.generic(
+            'PUT',
+            reverse('upload_detail', args=[upload_id]),
+            self.data[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.data)}'
+        )
+
+    def test_upload_in_chunks_then_attach_to_post(self):
+        response = self.client.post(reverse('upload_create'), {
+            'filename': 'photo.png', 'size': len(self.data)
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload_id = response.data['id']
+
+        middle = len(self.data) // 2
+        response = self.put_chunk(upload_id, 0, middle - 1)
+        self.assertEqual(response.data['received'], middle)
+
+        # Re-sending an old range is rejected with the offset to resume from.
+        response = self.put_chunk(upload_id, 0, middle - 1)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['received'], middle)
+
+        response = self.put_chunk(upload_id, middle, len(self.data) - 1)
+        self.assertEqual(response.data['received'], len(self.data))
+
+        response = self.client.post(reverse('upload_finalize', args=[upload_id]), {
+            'sha256': hashlib.sha256(self.data).hexdigest()
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'complete')
+
+        response = self.client.post(reverse('post-list'), {
+            'title': 'Uploaded', 'content': 'x', 'author_id': self.user.id, 'upload_id': upload_id
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        post = Post.objects.get(pk=response.data['id'])
+        with post.image.open('rb') as handle:
+            self.assertEqual(handle.read(), self.data)
+        self.assertEqual(MediaUpload.objects.get(pk=upload_id).status, 'attached')
+
+    def test_finalize_rejects_incomplete_upload(self):
+        upload = MediaUpload.objects.create(owner=self.user, filename='a.png', size=len(self.data))
+        self.put_chunk(upload.id, 0, 9)
+        response = self.client.post(reverse('upload_finalize', args=[upload.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retried_finalize_does_not_store_the_file_twice(self):
+        upload = MediaUpload.objects.create(owner=self.user, filename='a.png', size=len(self.data))
+        self.put_chunk(upload.id, 0, len(self.data) - 1)
+        url = reverse('upload_finalize', args=[upload.id])
+        retries = []
+
+        def retry_while_hashing(path):
+            # A client retry arriving while the first finalize is still running.
+            retries.append(self.client.post(url))
+            return file_sha256(path)
+
+        with mock.patch('posts.uploads.file_sha256', side_effect=retry_while_hashing):
+            response = self.client.post(url)
+        self.assertEqual(response.data['status'], 'complete')
+        self.assertEqual([(r.status_code, r.data['status']) for r in retries], [(200, 'finalizing')])
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'posts', 'images')), ['a.png'])
+        self.assertEqual(self.client.post(url).data['status'], 'complete')
+
+    def test_failed_finalize_can_be_retried(self):
+        upload = MediaUpload.objects.create(owner=self.user, filename='a.png', size=len(self.data))
+        self.put_chunk(upload.id, 0, len(self.data) - 1)
+        url = reverse('upload_finalize', args=[upload.id])
+        response = self.client.post(url, {'sha256': '0' * 64})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(MediaUpload.objects.get(pk=upload.id).status, 'uploading')
+        self.assertEqual(self.client.post(url).data['status'], 'complete')
+
+    def test_abandoned_uploads_expire(self):
+        stale = MediaUpload.objects.create(owner=self.user, filename='a.png', size=len(self.data))
+        self.put_chunk(stale.id, 0, 9)
+        active = MediaUpload.objects.create(owner=self.user, filename='b.png', size=len(self.data))
+        self.put_chunk(active.id, 0, 9)
+        done = MediaUpload.objects.create(owner=self.user, filename='c.png', size=len(self.data), status='complete')
+        MediaUpload.objects.filter(pk__in=[stale.id, done.id]).update(updated_at=timezone.now() - timedelta(days=2))
+
+        out = StringIO()
+        call_command('expire_uploads', stdout=out)
+        self.assertIn('Deleted 1 expired uploads', out.getvalue())
+        self.assertCountEqual(MediaUpload.objects.values_list('pk', flat=True), [active.id, done.id])
+        self.assertEqual(os.listdir(upload_dir()), [f'{active.id}.part'])
+
+
+class ConditionalGetTests(APITestCase):
+    """Tests for ETag handling on posts and comments."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='reader', password='pw')
+        self.post = Post.objects.create(author=self.user, title='Hello', content='World')
+        self.comment = Comment.objects.create(post=self.post, author=self.user, content='First')
+        self.client.force_authenticate(self.user)
+
+    def assert_revalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        return etag
+
+    def test_post_list_and_detail_return_304_until_changed(self):
+        list_etag = self.assert_revalidates(reverse('post-list'))
+        detail_url = reverse('post-detail', args=[self.post.id])
+        detail_etag = self.assert_revalidates(detail_url)
+
+        Like.objects.create(user=self.user, post=self.post)
+
+        response = self.client.get(reverse('post-list'), HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['likes_count'], 1)
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since_alone_never_returns_304(self):
+        like = Like.objects.create(user=self.user, post=self.post)
+        detail_url = reverse('post-detail', args=[self.post.id])
+        since = http_date(time.time() + 60)
+        like.delete()
+
+        response = self.client.get(detail_url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['likes_count'], 0)
+
+    def assertChanged(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_author_changes_invalidate_posts(self):
+        list_url, detail_url = reverse('post-list'), reverse('post-detail', args=[self.post.id])
+        list_etag, detail_etag = self.assert_revalidates(list_url), self.assert_revalidates(detail_url)
+        fan = CustomUser.objects.create_user(username='fan', password='pw')
+        fan.follow(self.user)
+        response = self.assertChanged(list_url, list_etag)
+        self.assertEqual(response.data['results'][0]['author']['followers_count'], 1)
+        self.assertEqual(self.assertChanged(detail_url, detail_etag).data['author']['followers_count'], 1)
+
+        detail_etag = self.assert_revalidates(detail_url)
+        self.user.bio = 'New bio'
+        self.user.save()
+        self.assertEqual(self.assertChanged(detail_url, detail_etag).data['author']['bio'], 'New bio')
+
+        detail_etag = self.assert_revalidates(detail_url)
+        UserProfile.objects.update_or_create(user=self.user, defaults={'location': 'Lagos'})
+        self.assertEqual(self.assertChanged(detail_url, detail_etag).data['author']['profile']['location'], 'Lagos')
+
+    def test_comment_likes_invalidate_post_detail(self):
+        url = reverse('post-detail', args=[self.post.id])
+        etag = self.assert_revalidates(url)
+        self.comment.likes.add(CustomUser.objects.create_user(username='fan', password='pw'))
+        self.assertEqual(self.assertChanged(url, etag).data['comments'][0]['likes_count'], 1)
+
+    def test_renditions_invalidate_posts(self):
+        list_url, detail_url = reverse('post-list'), reverse('post-detail', args=[self.post.id])
+        list_etag, detail_etag = self.assert_revalidates(list_url), self.assert_revalidates(detail_url)
+        self.post.image_renditions = {'thumbnail': {'width': 150, 'height': 150, 'jpeg': 'posts/r/t.jpg', 'webp': 'posts/r/t.webp'}}
+        self.post.save(update_fields=['image_renditions'])
+        self.assertTrue(self.assertChanged(list_url, list_etag).data['results'][0]['image_renditions'])
+        self.assertTrue(self.assertChanged(detail_url, detail_etag).data['image_renditions'])
+
+    def test_not_modified_skips_serialization_queries(self):
+        etag = self.assert_revalidates(reverse('post-list'))
+        # count + page ids + posts + two aggregates + users
+        with self.assertNumQueries(6):
+            self.client.get(reverse('post-list'), HTTP_IF_NONE_MATCH=etag)
+
+    def test_comment_etag_changes_with_replies(self):
+        url = reverse('comment-list')
+        etag = self.assert_revalidates(url)
+        Comment.objects.create(post=self.post, author=self.user, content='Re', parent_comment=self.comment)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CounterBufferTests(APITestCase):
+    """Tests for the write-behind view/impression counters."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='counter', password='pw')
+        self.posts = [
+            Post.objects.create(author=self.user, title=f'Post {i}', content='x')
+            for i in range(3)
+        ]
+        self.buffer = CounterBuffer(flush_interval=3600, flush_threshold=1000)
+
+    def test_increments_are_batched_until_flush(self):
+        first, second, third = self.posts
+        self.buffer.add([first.id, second.id], 'impressions_count')
+        self.buffer.add([first.id], 'impressions_count')
+        self.buffer.add([third.id], 'views_count')
+
+        first.refresh_from_db()
+        self.assertEqual(first.impressions_count, 0)
+        self.assertEqual(self.buffer.metrics()['pending_posts'], 3)
+
+        self.buffer.add([second.id], 'views_count')
+        self.buffer.add([third.id], 'impressions_count')
+
+        # One UPDATE per (field, increment): impressions +2, impressions +1, views +1,
+        # plus the savepoint pair around them.
+        with self.assertNumQueries(5):
+            self.assertEqual(self.buffer.flush(), 6)
+
+        for post in self.posts:
+            post.refresh_from_db()
+        self.assertEqual([p.impressions_count for p in self.posts], [2, 1, 1])
+        self.assertEqual(third.views_count, 1)
+        self.assertEqual(self.buffer.lag_seconds(), 0.0)
+
+    def test_threshold_triggers_flush(self):
+        self.buffer.flush_threshold = 2
+        self.buffer.add([self.posts[0].id], 'views_count')
+        self.buffer.add([self.posts[1].id], 'views_count')
+        self.posts[1].refresh_from_db()
+        self.assertEqual(self.posts[1].views_count, 1)
+
+
+class HashtagAndMentionTests(APITestCase):
+    """Tests for hashtag/mention extraction and the hashtag timeline."""
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='writer', password='pw')
+        self.alice = CustomUser.objects.create_user(username='alice', password='pw')
+        self.bob = CustomUser.objects.create_user(username='bob.smith', password='pw')
+        self.client.force_authenticate(self.author)
+
+    def test_extraction(self):
+        self.assertEqual(extract_hashtags('#Django rocks, #django #py3 a#b &#39;'), {'django', 'py3'})
+        self.assertEqual(extract_mentions('hi @alice and @bob.smith. mail a@b.c'), {'alice', 'bob.smith'})
+
+    def test_mentions_notify_once_in_a_batch(self):
+        post = Post.objects.create(
+            author=self.author, title='Hello', content='cc @alice @bob.smith @nobody @writer'
+        )
+        notifications = Notification.objects.filter(verb='mention')
+        self.assertEqual(
+            set(notifications.values_list('recipient__username', flat=True)),
+            {'alice', 'bob.smith'}
+        )
+
+        post.content = 'cc @alice again #news'
+        post.save()
+        self.assertEqual(notifications.count(), 2)
+        self.assertEqual(
+            set(post.mentions.values_list('user__username', flat=True)), {'alice'}
+        )
+
+    def test_draft_mentions_notify_on_publish(self):
+        post = Post.objects.create(
+            author=self.author, title='Draft', content='@alice', is_published=False
+        )
+        self.assertFalse(Notification.objects.exists())
+        post.is_published = True
+        post.save()
+        self.assertEqual(Notification.objects.get().recipient, self.alice)
+
+    def test_hashtag_timeline_is_keyset_paginated(self):
+        for i in range(3):
+            Post.objects.create(author=self.author, title=f'P{i}', content=f'#Python number {i}')
+        Post.objects.create(author=self.author, title='Other', content='#java')
+        Post.objects.create(author=self.author, title='Draft', content='#python', is_published=False)
+
+        response = self.client.get(reverse('hashtag_posts', args=['python']), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['title'] for p in response.data['results']], ['P2', 'P1'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([p['title'] for p in response.data['results']], ['P0'])
+
+
+class ScheduledPublishingTests(APITestCase):
+    """Tests for publish_at and the batch publisher."""
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='planner', password='pw')
+        self.reader = CustomUser.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(self.author)
+
+    def test_future_post_stays_draft_until_due(self):
+        publish_at = timezone.now() + timedelta(hours=1)
+        response = self.client.post(reverse('post-list'), {
+            'title': 'Later',
+            'content': 'Hi @reader #launch',
+            'author_id': self.author.id,
+            'publish_at': publish_at.isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertFalse(post.is_published)
+        self.assertFalse(Notification.objects.exists())
+
+        self.assertEqual(publish_due_posts(), 0)
+        self.assertEqual(publish_due_posts(now=publish_at + timedelta(seconds=1), batch_size=1), 1)
+
+        post.refresh_from_db()
+        self.assertTrue(post.is_published)
+        self.assertEqual(post.created_at, publish_at)
+        self.assertEqual(PostHashtag.objects.get(post=post).created_at, publish_at)
+        self.assertEqual(Notification.objects.get(verb='mention').recipient, self.reader)
+
+
+class ImportPostsCommandTests(APITestCase):
+    """Tests for the bulk JSONL post importer."""
+
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username='alice', password='pw')
+        self.bob = CustomUser.objects.create_user(username='bob', password='pw')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write_dump(self, rows):
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w') as handle:
+            for row in rows:
+                handle.write(json.dumps(row) + '\n')
+        return path
+
+    def test_import_keeps_history_and_indexes_entities(self):
+        path = self.write_dump([
+            {
+                'author': 'alice',
+                'title': 'Old news',
+                'content': 'Hi @bob #migrated',
+                'created_at': '2020-01-02T03:04:05Z',
+                'views_count': 7,
+                'likes': ['bob', 'bob', 'ghost'],
+                'comments': [{
+                    'author': 'bob',
+                    'content': 'welcome',
+                    'likes': ['alice'],
+                    'replies': [{'author': 'alice', 'content': 'thanks'}],
+                }],
+            },
+            {'author': 'ghost', 'title': 'Unknown author', 'content': 'x'},
+            {'author': 'bob', 'title': 'Second', 'content': 'plain'},
+        ])
+        call_command('import_posts', path, chunk_size=2, stdout=StringIO())
+
+        post = Post.objects.get(title='Old news')
+        self.assertEqual(post.created_at.year, 2020)
+        self.assertEqual(post.views_count, 7)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(list(post.likes.all()), [self.bob])
+
+        comment = Comment.objects.get(post=post, parent_comment=None)
+        self.assertEqual(list(comment.likes.all()), [self.alice])
+        self.assertEqual(comment.replies.get().content, 'thanks')
+
+        hashtag = PostHashtag.objects.get(post=post)
+        self.assertEqual((hashtag.tag, hashtag.created_at), ('migrated', post.created_at))
+        self.assertTrue(PostMention.objects.get(post=post, user=self.bob).notified)
+        self.assertFalse(Notification.objects.exists())
+
+        # Timestamps are stamped automatically again after the import.
+        fresh = Post.objects.create(author=self.alice, title='New', content='y')
+        self.assertEqual(fresh.created_at.year, timezone.now().year)
+
+
+class PostQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Fixed query counts for every posts endpoint, whatever the page size."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(username='budget', password='pw')
+        self.authors = [
+            CustomUser.objects.create_user(username=f'author{index}', password='pw')
+            for index in range(4)
+        ]
+        for author in self.authors:
+            self.user.follow(author)
+            author.follow(self.user)
+
+        self.posts = []
+        for index in range(24):
+            author = self.authors[index % 4]
+            post = Post.objects.create(author=author, title=f'Post {index}', content=f'Body #budget {index}')
+            for liker in self.authors[:index % 3 + 1]:
+                Like.objects.create(user=liker, post=post)
+            comment = Comment.objects.create(post=post, author=self.user, content='first')
+            comment.likes.add(author)
+            Comment.objects.create(post=post, author=author, content='reply', parent_comment=comment)
+            self.posts.append(post)
+
+        # Detail pages with few and many related rows.
+        self.small_post, self.big_post = self.posts[0], self.posts[1]
+        for index in range(8):
+            extra = Comment.objects.create(post=self.big_post, author=self.authors[index % 4], content=str(index))
+            extra.likes.add(self.user)
+            Comment.objects.create(post=self.big_post, author=self.user, content='re', parent_comment=extra)
+        Like.objects.create(user=self.user, post=self.big_post)
+        self.client.force_authenticate(self.user)
+
+    def test_post_endpoints(self):
+        self.assertQueryBudget(7, reverse('post-list'), paginate=True)
+        self.assertQueryBudget(
+            12,
+            reverse('post-detail', args=[self.small_post.id]),
+            reverse('post-detail', args=[self.big_post.id]),
+        )
+        self.assertQueryBudget(3, reverse('feed'), paginate=True)
+        self.assertQueryBudget(2, reverse('hashtag_posts', args=['budget']), paginate=True)
+        self.assertQueryBudget(
+            3,
+            reverse('post_likes', args=[self.small_post.id]),
+            reverse('post_likes', args=[self.big_post.id]),
+        )
+
+    def test_post_writes(self):
+        own = Post.objects.create(author=self.user, title='Mine', content='x')
+        self.assertQueryBudget(
+            8, reverse('post-list'), method='post', format='json',
+            data={'title': 'New', 'content': 'Hello', 'author_id': self.user.id}
+        )
+        self.assertQueryBudget(
+            7, reverse('post-detail', args=[own.id]), method='patch', format='json',
+            data={'content': 'Edited'}
+        )
+        self.assertQueryBudget(5, reverse('post-like', args=[own.id]), method='post')
+        self.assertQueryBudget(10, reverse('post-like', args=[self.small_post.id]), method='post')
+        self.assertQueryBudget(4, reverse('unlike_post', args=[self.big_post.id]), method='post')
+        self.assertQueryBudget(7, reverse('post-detail', args=[own.id]), method='delete')
+
+    def test_comment_endpoints(self):
+        comment = Comment.objects.filter(post=self.big_post, parent_comment=None).first()
+        self.assertQueryBudget(9, reverse('comment-list'), paginate=True)
+        self.assertQueryBudget(7, reverse('comment-detail', args=[comment.id]))
+        self.assertQueryBudget(5, reverse('comment-replies', args=[comment.id]))
+        self.assertQueryBudget(
+            14, reverse('comment-list'), method='post', format='json',
+            data={'post_id': self.small_post.id, 'author_id': self.user.id, 'content': 'Hi'}
+        )
+        self.assertQueryBudget(5, reverse('comment-like', args=[comment.id]), method='post')
+
+    def test_comment_like_toggle_returns_new_count(self):
+        comment = Comment.objects.filter(post=self.small_post, parent_comment=None).first()
+        url = reverse('comment-like', args=[comment.id])
+        response = self.client.post(url)
+        self.assertEqual((response.data['liked'], response.data['likes_count']), (True, 2))
+        response = self.client.post(url)
+        self.assertEqual((response.data['liked'], response.data['likes_count']), (False, 1))
+
+    def test_upload_endpoints(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            CHUNKED_UPLOAD_DIR=os.path.join(media_root, 'partial')
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        response = self.assertQueryBudget(
+            1, reverse('upload_create'), method='post', format='json',
+            data={'filename': 'a.png', 'size': 10}
+        )
+        url = reverse('upload_detail', args=[response.data['id']])
+        self.assertQueryBudget(1, url)
+        self.assertQueryBudget(
+            3, url, method='put', data=b'0123456789',
+            content_type='application/octet-stream', HTTP_CONTENT_RANGE='bytes 0-9/10'
+        )
+
+        self.user.is_staff = True
+        self.assertQueryBudget(0, reverse('counter_metrics'))
+
+
+class GenerateSocialDataCommandTests(APITestCase):
+    """Tests for the synthetic data generator."""
+
+    def generate(self, prefix):
+        call_command(
+            'generate_social_data', users=60, seed=7, chunk_size=50, prefix=prefix, stdout=StringIO()
+        )
+        users = CustomUser.objects.filter(username__startswith=prefix)
+        return {
+            'users': users.count(),
+            'follows': Follow.objects.filter(follower__in=users).count(),
+            'posts': Post.objects.filter(author__in=users).count(),
+            'likes': Like.objects.filter(user__in=users).count(),
+            'comments': Comment.objects.filter(author__in=users).count(),
+        }
+
+    def test_same_seed_gives_same_graph(self):
+        first = self.generate('alpha')
+        self.assertEqual(first['users'], 60)
+        self.assertGreater(first['follows'], 0)
+        self.assertGreater(first['posts'], 0)
+        self.assertTrue(Comment.objects.exclude(parent_comment=None).exists())
+        self.assertEqual(self.generate('beta'), first)
+
+        user = CustomUser.objects.get(username='alpha0000000')
+        self.assertTrue(user.check_password('password'))
+        self.assertEqual(user.date_joined.year, 2024)
+
+    def test_tiny_user_counts(self):
+        for users in (1, 2):
+            call_command(
+                'generate_social_data', users=users, seed=7, prefix=f'tiny{users}', stdout=StringIO()
+            )
+            authors = CustomUser.objects.filter(username__startswith=f'tiny{users}')
+            self.assertEqual(authors.count(), users)
+        self.assertTrue(Comment.objects.filter(author__username__startswith='tiny').exists())
+
+        with self.assertRaisesMessage(CommandError, '--users must be at least 1.'):
+            call_command('generate_social_data', users=0, prefix='none', stdout=StringIO())
+
+
+class AsyncReadViewTests(APITestCase):
+    """The async read views answer exactly like the sync ones."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = CustomUser.objects.create_user(username='reader', password='pw')
+        author = CustomUser.objects.create_user(username='writer', password='pw')
+        self.user.follow(author)
+        for index in range(7):
+            post = Post.objects.create(author=author, title=f'Post {index}', content=f'Body {index}')
+            Like.objects.create(user=self.user, post=post)
+            comment = Comment.objects.create(post=post, author=self.user, content='first')
+            Comment.objects.create(post=post, author=author, content='reply', parent_comment=comment)
+        self.post = post
+
+    def call(self, view, method='get', path='/', data=None, headers=None, **kwargs):
+        request = getattr(self.factory, method)(path, data, format='json', **(headers or {}))
+        force_authenticate(request, self.user)
+        response = view(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def assertSameResponse(self, sync_view, async_view, *args, **kwargs):
+        expected = self.call(sync_view, *args, **kwargs)
+        response = self.call(async_to_sync(async_view), *args, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.get('ETag'), expected.get('ETag'))
+        return response
+
+    def test_post_list_and_detail(self):
+        actions = {'get': 'list'}
+        sync_list, async_list = PostViewSet.as_view(actions), AsyncPostViewSet.as_view(actions)
+        self.assertSameResponse(sync_list, async_list, path='/api/posts/')
+        response = self.assertSameResponse(sync_list, async_list, path='/api/posts/?page=2&page_size=3')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertSameResponse(sync_list, async_list, path='/api/posts/?page=9')
+        self.assertSameResponse(
+            sync_list, async_list, path='/api/posts/', headers={'HTTP_IF_NONE_MATCH': response['ETag']}
+        )
+
+        actions = {'get': 'retrieve'}
+        sync_detail, async_detail = PostViewSet.as_view(actions), AsyncPostViewSet.as_view(actions)
+        response = self.assertSameResponse(sync_detail, async_detail, pk=self.post.pk)
+        self.assertEqual(len(response.data['comments']), 2)
+        response = self.assertSameResponse(
+            sync_detail, async_detail, headers={'HTTP_IF_NONE_MATCH': response['ETag']}, pk=self.post.pk
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertSameResponse(sync_detail, async_detail, pk=0)
+
+    def test_feed(self):
+        response = self.assertSameResponse(FeedView.as_view(), AsyncFeedView.as_view(), path='/api/feed/?page_size=5')
+        self.assertEqual(response.data['count'], 7)
+
+    def test_feed_new_posts(self):
+        sync_view, async_view = FeedNewPostsView.as_view(), AsyncFeedNewPostsView.as_view()
+        oldest = Post.objects.order_by('created_at', 'id').first()
+        response = self.assertSameResponse(sync_view, async_view, path=f'/api/feed/new/?since_id={oldest.id}')
+        self.assertEqual(response.data, {'count': 6, 'capped': False})
+        self.assertSameResponse(sync_view, async_view, path='/api/feed/new/?since_id=0')
+        self.assertSameResponse(sync_view, async_view, path='/api/feed/new/')
+
+    def test_sync_actions_still_work(self):
+        view = AsyncPostViewSet.as_view({'post': 'create'})
+        response = self.call(async_to_sync(view), 'post', data={
+            'title': 'Async', 'content': 'Made in a thread', 'author_id': self.user.id
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Post.objects.filter(title='Async', author=self.user).exists())
+
+        self.client.logout()
+        request = self.factory.get('/api/feed/')
+        self.assertEqual(async_to_sync(AsyncFeedView.as_view())(request).status_code, 401)
+
+
+class FeedNewPostsTests(QueryBudgetMixin, APITestCase):
+    """Tests for the "N new posts" feed watermark endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(username='poller', password='pw')
+        self.author = CustomUser.objects.create_user(username='followed', password='pw')
+        self.stranger = CustomUser.objects.create_user(username='stranger', password='pw')
+        self.user.follow(self.author)
+        self.start = timezone.now() - timedelta(hours=1)
+        self.seen = self.post(self.author, minutes=0)
+        self.client.force_authenticate(self.user)
+
+    def post(self, author, minutes, **kwargs):
+        post = Post.objects.create(author=author, title='t', content='x', **kwargs)
+        Post.objects.filter(pk=post.pk).update(created_at=self.start + timedelta(minutes=minutes))
+        post.refresh_from_db()
+        return post
+
+    def new_posts(self, **params):
+        response = self.client.get(reverse('feed_new'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def test_counts_newer_feed_posts_only(self):
+        self.post(self.author, minutes=-5)
+        self.post(self.author, minutes=5)
+        self.post(self.author, minutes=6, is_published=False)
+        self.post(self.stranger, minutes=7)
+        self.post(self.user, minutes=8)
+        # Same timestamp as the watermark: only the later id is new.
+        tied = self.post(self.author, minutes=0)
+
+        self.assertEqual(self.new_posts(since_id=self.seen.id), {'count': 2, 'capped': False})
+        self.assertEqual(
+            self.new_posts(since_id=self.seen.id, since=self.seen.created_at.isoformat()),
+            {'count': 2, 'capped': False}
+        )
+        self.assertEqual(self.new_posts(since_id=tied.id), {'count': 1, 'capped': False})
+        self.assertEqual(self.new_posts(since=self.seen.created_at.isoformat()), {'count': 1, 'capped': False})
+
+    def test_count_is_capped(self):
+        for minutes in range(1, FeedNewPostsView.max_count + 3):
+            self.post(self.author, minutes=minutes)
+        self.assertEqual(
+            self.new_posts(since_id=self.seen.id),
+            {'count': FeedNewPostsView.max_count, 'capped': True}
+        )
+
+    def test_query_budget(self):
+        self.post(self.author, minutes=1)
+        url = reverse('feed_new')
+        self.assertQueryBudget(2, f'{url}?since_id={self.seen.id}')
+        self.assertQueryBudget(1, f'{url}?since_id={self.seen.id}&since={self.seen.created_at:%Y-%m-%dT%H:%M:%S.%fZ}')
+
+    def test_bad_watermarks(self):
+        for params in (
+            {}, {'since_id': 'abc'}, {'since': 'yesterday'}, {'since_id': 0}, {'since_id': -1},
+            {'since_id': 2 ** 63}, {'since_id': '99999999999999999999'},
+        ):
+            self.assertEqual(self.client.get(reverse('feed_new'), params).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.client.get(reverse('feed_new'), {'since_id': self.seen.id}).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+
+class LeanPostListSerializerTests(APITestCase):
+    """LeanPostListSerializer renders exactly what PostListSerializer does."""
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(
+            username='writer', password='pw', first_name='Ada', bio='Writes a lot'
+        )
+        UserProfile.objects.create(user=self.author, website='https://example.com', birth_date='1990-02-03')
+        bare = CustomUser.objects.create_user(username='bare', password='pw')
+        CustomUser.objects.create_user(username='fan', password='pw').follow(self.author)
+        self.author.follow(bare)
+        contents = ['short', 'x' * 150, 'y' * 151, 'é' * 149 + '\u2028' + 'z' * 20, '']
+        for index, content in enumerate(contents):
+            post = Post.objects.create(author=self.author if index % 2 else bare, title=f'Post {index}', content=content)
+            Like.objects.create(user=self.author, post=post)
+        renditions = {
+            'thumbnail': {'width': 150, 'height': 75, 'jpeg': 'posts/r/1.jpg', 'webp': 'posts/r/1.webp'},
+            'large': {'width': 1200, 'height': 600, 'jpeg': 'posts/r/2.jpg', 'webp': 'posts/r/2.webp'},
+        }
+        # Bypass the save signal so no renditions are actually rendered.
+        Post.objects.filter(pk=post.pk).update(image='posts/images/photo.png', image_renditions=renditions)
+        CustomUser.objects.filter(pk=bare.pk).update(profile_picture='', profile_picture_renditions=renditions)
+
+    def assertSameData(self, request=None):
+        context = {'request': request}
+        posts = with_post_counts(Post.objects.order_by('pk')).prefetch_related(prefetch_users('author'))
+        rows = LeanPostListSerializer.project(with_post_counts(Post.objects.order_by('pk')), request)
+        expected = PostListSerializer(posts, many=True, context=context).data
+        self.assertEqual(len(expected), 5)
+        self.assertEqual(LeanPostListSerializer(rows, many=True, context=context).data, expected)
+        self.assertEqual(LeanPostListSerializer(rows[0], context=context).data, expected[0])
+
+    def test_same_data_with_and_without_request(self):
+        self.assertSameData()
+        self.assertSameData(Request(APIRequestFactory().get('/api/posts/')))
+
+    def test_list_endpoints(self):
+        self.client.force_authenticate(self.author)
+        request = Request(APIRequestFactory().get('/api/posts/'))
+        posts = with_post_counts(Post.objects.order_by('-created_at')).prefetch_related(prefetch_users('author'))
+        expected = json.loads(json.dumps(PostListSerializer(posts, many=True, context={'request': request}).data))
+        self.assertEqual(self.client.get(reverse('post-list')).json()['results'], expected)
+
+        PostHashtag.objects.bulk_create(PostHashtag(post=post, tag='same', created_at=post.created_at) for post in posts)
+        response = self.client.get(reverse('hashtag_posts', args=['same']), {'page_size': 100})
+        self.assertEqual(response.json()['results'], expected)
+
+
+class EngagementRollupTests(QueryBudgetMixin, APITestCase):
+    """Tests for the incremental engagement rollups and the author dashboard."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = CustomUser.objects.create_user(username='creator', password='pw')
+        self.other = CustomUser.objects.create_user(username='other', password='pw')
+        self.fans = [CustomUser.objects.create_user(username=f'fan{index}', password='pw') for index in range(3)]
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {index}', content='x') for index in range(2)]
+        self.other_post = Post.objects.create(author=self.other, title='Other', content='x')
+        self.hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    def backdate(self, instance, when):
+        type(instance).objects.filter(pk=instance.pk).update(created_at=when)
+
+    def engage(self, fan, post, when):
+        self.backdate(Like.objects.create(user=fan, post=post), when)
+        self.backdate(Comment.objects.create(post=post, author=fan, content='nice'), when)
+
+    def assertRollupsMatchRawCounts(self):
+        events = [('likes', like.post.author_id, like.created_at) for like in Like.objects.select_related('post')]
+        events += [('comments', c.post.author_id, c.created_at) for c in Comment.objects.select_related('post')]
+        events += [('follows', follow.followed_id, follow.created_at) for follow in Follow.objects.all()]
+        for model, truncate in (
+            (HourlyEngagement, lambda when: when.replace(minute=0, second=0, microsecond=0)),
+            (DailyEngagement, lambda when: when.replace(hour=0, minute=0, second=0, microsecond=0)),
+        ):
+            expected = Counter((author, truncate(when), metric) for metric, author, when in events)
+            actual = Counter()
+            for row in model.objects.values('author_id', 'period_start', 'likes', 'comments', 'follows'):
+                for metric in ('likes', 'comments', 'follows'):
+                    if row[metric]:
+                        actual[row['author_id'], row['period_start'], metric] = row[metric]
+            self.assertEqual(actual, expected, model.__name__)
+
+    def test_rollups_are_incremental(self):
+        yesterday = self.hour.replace(hour=12) - timedelta(days=1)
+        self.engage(self.fans[0], self.posts[0], yesterday - timedelta(minutes=50))
+        self.engage(self.fans[1], self.posts[0], yesterday - timedelta(minutes=10))
+        self.engage(self.fans[2], self.posts[1], self.hour - timedelta(minutes=30))
+        self.engage(self.fans[0], self.other_post, self.hour - timedelta(minutes=5))
+        for fan in self.fans:
+            fan.follow(self.author)
+        self.backdate(Follow.objects.get(follower=self.fans[0]), self.hour - timedelta(days=2))
+
+        later = timezone.now() + timedelta(minutes=5)
+        self.assertEqual(roll_up_engagement(now=later, batch_size=2), {'likes': 4, 'comments': 4, 'follows': 3})
+        self.assertRollupsMatchRawCounts()
+        daily = DailyEngagement.objects.get(author=self.author, period_start=yesterday.replace(hour=0))
+        self.assertEqual((daily.likes, daily.comments), (2, 2))
+
+        # Nothing new: one probe past each watermark, and nothing is counted twice.
+        RollupWatermark.objects.update(updated_at=self.hour - timedelta(days=1))
+        with self.assertNumQueries(16):
+            self.assertEqual(roll_up_engagement(now=later), {})
+        self.assertRollupsMatchRawCounts()
+        # Idle sources still record the run, so the dashboard does not look stale.
+        self.assertFalse(RollupWatermark.objects.filter(updated_at__lt=self.hour).exists())
+
+        # Only rows past the watermark are read, into the existing periods.
+        self.engage(self.fans[1], self.posts[1], self.hour - timedelta(minutes=20))
+        self.other.follow(self.author)
+        self.assertEqual(roll_up_engagement(now=later), {'likes': 1, 'comments': 1, 'follows': 1})
+        self.assertRollupsMatchRawCounts()
+        self.assertEqual(RollupWatermark.objects.get(source='likes').last_id, Like.objects.latest('id').id)
+
+    def test_recent_rows_wait_for_the_lag(self):
+        self.engage(self.fans[0], self.posts[0], self.hour - timedelta(hours=1))
+        Like.objects.create(user=self.fans[1], post=self.posts[0])
+        with override_settings(ROLLUP_LAG_SECONDS=600):
+            self.assertEqual(roll_up_engagement(), {'likes': 1, 'comments': 1})
+            self.assertEqual(roll_up_engagement(now=timezone.now() + timedelta(minutes=11)), {'likes': 1})
+        self.assertRollupsMatchRawCounts()
+
+    def test_command(self):
+        self.engage(self.fans[0], self.posts[0], self.hour - timedelta(hours=2))
+        out = StringIO()
+        call_command('rollup_engagement', stdout=out)
+        self.assertIn('Rolled up 1 likes, 1 comments', out.getvalue())
+        self.assertRollupsMatchRawCounts()
+
+    def test_dashboard(self):
+        self.engage(self.fans[0], self.posts[0], self.hour - timedelta(hours=2, minutes=30))
+        self.engage(self.fans[1], self.posts[0], self.hour - timedelta(hours=2, minutes=10))
+        self.engage(self.fans[2], self.posts[1], self.hour + timedelta(minutes=1))
+        self.engage(self.fans[0], self.other_post, self.hour)
+        self.fans[0].follow(self.author)
+        self.backdate(Follow.objects.get(), self.hour - timedelta(days=3))
+        roll_up_engagement(now=timezone.now() + timedelta(minutes=5))
+        self.client.force_authenticate(self.author)
+
+        response = self.assertQueryBudget(2, reverse('engagement_dashboard') + '?granularity=hour&periods=4')
+        self.assertEqual(response.data['granularity'], 'hour')
+        self.assertIsNotNone(response.data['updated_at'])
+        self.assertEqual(response.data['totals'], {'likes': 3, 'comments': 3, 'follows': 0})
+        self.assertEqual(
+            [(point['period_start'], point['likes'], point['comments']) for point in response.data['series']],
+            [(self.hour - timedelta(hours=3 - index), likes, likes) for index, likes in enumerate([2, 0, 0, 1])]
+        )
+
+        response = self.client.get(reverse('engagement_dashboard'))
+        self.assertEqual(len(response.data['series']), 30)
+        self.assertEqual(response.data['series'][-1]['period_start'], self.hour.replace(hour=0))
+        self.assertEqual(response.data['totals'], {'likes': 3, 'comments': 3, 'follows': 1})
+
+        for query in ('granularity=week', 'periods=0', 'periods=abc', 'granularity=day&periods=367'):
+            self.assertEqual(
+                self.client.get(reverse('engagement_dashboard') + '?' + query).status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('engagement_dashboard')).status_code, status.HTTP_401_UNAUTHORIZED)
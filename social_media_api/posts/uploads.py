@@ -0,0 +1,158 @@
+"""
+Helpers for resumable chunked media uploads.
+
+Chunks are streamed from the request straight into a partial file on disk,
+so memory use stays bounded no matter how large the upload is. Sessions
+left unfinished for ``CHUNKED_UPLOAD_TTL`` seconds are deleted, with their
+partial files, by ``expire_uploads`` (the ``expire_uploads`` command).
+"""
+
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+
+READ_SIZE = 64 * 1024
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """Raised when a chunk or finalize request cannot be accepted."""
+
+
+def upload_dir():
+    return getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'uploads', 'partial'))
+
+
+def partial_path(upload):
+    return os.path.join(upload_dir(), f"{upload.id}.part")
+
+
+def parse_content_range(header, size):
+    """Return (start, end) from a 'bytes start-end/total' header."""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError("Content-Range header must look like 'bytes start-end/total'.")
+    start, end, total = (int(value) for value in match.groups())
+    if total != size or start > end or end >= size:
+        raise UploadError('Content-Range does not fit the declared upload size.')
+    max_chunk = getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+    if end - start + 1 > max_chunk:
+        raise UploadError(f'Chunks may be at most {max_chunk} bytes.')
+    return start, end
+
+
+def write_chunk(upload, stream, start, end, expected_sha256=None):
+    """Stream bytes start..end from the request into the partial file."""
+    os.makedirs(upload_dir(), exist_ok=True)
+    path = partial_path(upload)
+    length = end - start + 1
+    digest = hashlib.sha256()
+    written = 0
+
+    mode = 'r+b' if os.path.exists(path) else 'wb'
+    with open(path, mode) as handle:
+        handle.seek(start)
+        while written < length:
+            data = stream.read(min(READ_SIZE, length - written)) if stream else b''
+            if not data:
+                break
+            handle.write(data)
+            digest.update(data)
+            written += len(data)
+
+    if written != length:
+        raise UploadError(f'Expected {length} bytes but received {written}.')
+    if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+        raise UploadError('Chunk checksum mismatch.')
+    return written
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize_upload(upload, expected_sha256=None):
+    """
+    Verify a fully received upload and move it into media storage.
+
+    Clients retry finalize on timeout, so the upload is claimed first: a
+    request that finds it already claimed returns it as it is ('finalizing'
+    or 'complete') instead of storing the file a second time.
+    """
+    if upload.received != upload.size:
+        raise UploadError(f'Upload incomplete: {upload.received} of {upload.size} bytes received.')
+
+    uploads = type(upload).objects.filter(pk=upload.pk)
+    if not uploads.filter(status='uploading').update(status='finalizing', updated_at=timezone.now()):
+        upload.refresh_from_db()
+        return upload
+    try:
+        store_upload(upload, expected_sha256)
+    except BaseException:
+        uploads.update(status='uploading')
+        raise
+    return upload
+
+
+def store_upload(upload, expected_sha256):
+    from PIL import Image
+
+    path = partial_path(upload)
+    sha256 = file_sha256(path)
+    if expected_sha256 and sha256 != expected_sha256.lower():
+        raise UploadError('File checksum mismatch.')
+
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        raise UploadError('Uploaded file is not a valid image.')
+
+    with open(path, 'rb') as handle:
+        upload.file.save(os.path.basename(upload.filename), File(handle), save=False)
+    os.remove(path)
+
+    upload.sha256 = sha256
+    upload.status = 'complete'
+    upload.save(update_fields=['file', 'sha256', 'status', 'updated_at'])
+
+
+def expire_uploads(now=None, batch_size=500):
+    """
+    Delete upload sessions not finished within ``CHUNKED_UPLOAD_TTL``.
+
+    Covers sessions still receiving chunks and finalizes that died midway.
+    Returns the number of sessions deleted.
+    """
+    from .models import MediaUpload
+
+    ttl = timedelta(seconds=getattr(settings, 'CHUNKED_UPLOAD_TTL', 24 * 60 * 60))
+    cutoff = (now or timezone.now()) - ttl
+    expired = 0
+    while True:
+        uploads = list(
+            MediaUpload.objects.filter(status__in=['uploading', 'finalizing'], updated_at__lt=cutoff)
+            .order_by('updated_at')[:batch_size]
+        )
+        for upload in uploads:
+            # Only delete sessions nobody touched since they were read.
+            if MediaUpload.objects.filter(pk=upload.pk, updated_at=upload.updated_at).delete()[0]:
+                if upload.file:
+                    upload.file.delete(save=False)
+                try:
+                    os.remove(partial_path(upload))
+                except FileNotFoundError:
+                    pass
+                expired += 1
+        if len(uploads) < batch_size:
+            return expired
@@ -1,24 +1,54 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     PostViewSet, 
+    AsyncPostViewSet,
     CommentViewSet, 
     FeedView,
+    AsyncFeedView,
+    FeedNewPostsView,
+    AsyncFeedNewPostsView,
     LikePostView,          # Add this
     UnlikePostView,        # Add this
-    PostLikesListView      # Add this
+    PostLikesListView,     # Add this
+    MediaUploadCreateView,
+    MediaUploadDetailView,
+    MediaUploadFinalizeView,
+    CounterMetricsView,
+    HashtagPostsView,
+    EngagementDashboardView
 )
 
+# Under ASGI the read-heavy endpoints are served by async views.
+post_viewset = AsyncPostViewSet if settings.ASYNC_VIEWS else PostViewSet
+feed_view = AsyncFeedView if settings.ASYNC_VIEWS else FeedView
+feed_new_view = AsyncFeedNewPostsView if settings.ASYNC_VIEWS else FeedNewPostsView
+
 router = DefaultRouter()
-router.register(r'posts', PostViewSet, basename='post')
+router.register(r'posts', post_viewset, basename='post')
 router.register(r'comments', CommentViewSet, basename='comment')
 
 urlpatterns = [
+    # Before the router so a tag such as "like" is not taken for a post id.
+    path('posts/hashtag/<str:tag>/', HashtagPostsView.as_view(), name='hashtag_posts'),
     path('', include(router.urls)),
-    path('feed/', FeedView.as_view(), name='feed'),
+    path('feed/', feed_view.as_view(), name='feed'),
+    path('feed/new/', feed_new_view.as_view(), name='feed_new'),
     
     # Like endpoints
     path('posts/<int:pk>/like/', LikePostView.as_view(), name='like_post'),
     path('posts/<int:pk>/unlike/', UnlikePostView.as_view(), name='unlike_post'),
     path('posts/<int:pk>/likes/', PostLikesListView.as_view(), name='post_likes'),
+    
+    # Resumable chunked uploads
+    path('uploads/', MediaUploadCreateView.as_view(), name='upload_create'),
+    path('uploads/<uuid:upload_id>/', MediaUploadDetailView.as_view(), name='upload_detail'),
+    path('uploads/<uuid:upload_id>/finalize/', MediaUploadFinalizeView.as_view(), name='upload_finalize'),
+    
+    # Buffered post counters (staff only)
+    path('metrics/counters/', CounterMetricsView.as_view(), name='counter_metrics'),
+    
+    # Author dashboard, served from the engagement rollups
+    path('analytics/engagement/', EngagementDashboardView.as_view(), name='engagement_dashboard'),
 ]
\ No newline at end of file
@@ -1,20 +1,38 @@
+from datetime import timedelta
+
 from rest_framework import viewsets, permissions, filters, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db.models import Count, Max, Min, Prefetch, Q
+from django.http import Http404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.shortcuts import get_object_or_404
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from .models import Post, Comment, Like
+from accounts.models import Follow, prefetch_users
+from social_media_api.async_views import AsyncDispatchMixin, apaginate
+from social_media_api.throttling import BUCKET_THROTTLES
+from .models import (
+    Post, Comment, Like, MediaUpload, PostHashtag, DailyEngagement, HourlyEngagement, RollupWatermark,
+    with_comment_counts, with_post_counts
+)
+from .permissions import IsOwnerOrReadOnly
+from .conditional import ConditionalGetMixin, user_condition_state
+from .counters import get_counter_buffer, record_impressions, record_views
 from .serializers import (
     PostSerializer, 
     PostListSerializer,
+    LeanPostListSerializer,
     PostDetailSerializer,
     CommentSerializer,
-    FeedPostSerializer
+    FeedPostSerializer,
+    MediaUploadSerializer
 )
+from .uploads import UploadError, finalize_upload, parse_content_range, write_chunk
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -24,20 +42,39 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class HashtagCursorPagination(CursorPagination):
+    """Keyset pagination over the (tag, created_at) index."""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class PostViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing posts."""
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'content']
-    ordering_fields = ['created_at', 'updated_at', 'likes_count']
+    ordering_fields = ['created_at', 'updated_at', 'likes_count', 'views_count', 'impressions_count']
     ordering = ['-created_at']
+    # Only the like action has throttle_classes.
+    throttle_scope = 'like'
     
     def get_queryset(self):
         """Return the queryset for posts."""
         # Use Post.objects.all() as specified in requirements
-        queryset = Post.objects.all().filter(is_published=True).select_related('author').prefetch_related('likes', 'comments')
+        queryset = with_post_counts(
+            Post.objects.all().filter(is_published=True)
+        ).prefetch_related(prefetch_users('author'))
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('comments', queryset=with_comment_counts(
+                    Comment.objects.all()
+                ).prefetch_related(prefetch_users('author'))),
+                Prefetch('post_likes', queryset=Like.objects.prefetch_related(prefetch_users('user'))),
+            )
         
         author = self.request.query_params.get('author')
         search_query = self.request.query_params.get('search')
@@ -58,16 +95,73 @@ class PostViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         """Return appropriate serializer class based on action."""
         if self.action == 'list':
+            # The browsable API builds its POST form from the list serializer.
+            if self.request.method in permissions.SAFE_METHODS:
+                return LeanPostListSerializer
             return PostListSerializer
         elif self.action == 'retrieve':
             return PostDetailSerializer
         return PostSerializer
     
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = self.paginate_queryset(queryset.prefetch_related(None).values_list('pk', flat=True))
+        not_modified = self.evaluate_conditions(request, ids, self.paginator.page.paginator.count)
+        if not_modified is not None:
+            return not_modified
+
+        # Count and page over bare ids; only the page is projected for rendering.
+        posts = {row['id']: row for row in self.get_page_rows(queryset, ids)}
+        serializer = self.get_serializer([posts[pk] for pk in ids if pk in posts], many=True)
+        response = self.get_paginated_response(serializer.data)
+        record_impressions(list(posts))
+        return self.with_validators(response)
+    
+    def get_page_rows(self, queryset, ids):
+        return LeanPostListSerializer.project(queryset.filter(pk__in=ids), self.request)
+    
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            record_views([int(kwargs['pk'])])
+        return response
+    
+    def get_condition_state(self, ids):
+        """Aggregate what the post serializers render, for the ETag."""
+        # Renditions are saved without touching updated_at.
+        posts = list(Post.objects.filter(pk__in=ids).values_list('updated_at', 'image_renditions'))
+        users = [Post.objects.filter(pk__in=ids).values('author_id')]
+        state = [
+            {'last': max((updated for updated, _ in posts), default=None), 'renditions': posts},
+            Like.objects.filter(post_id__in=ids).aggregate(
+                count=Count('id'), last_id=Max('id'), last=Max('created_at')
+            ),
+            Comment.objects.filter(post_id__in=ids).aggregate(
+                count=Count('id'), last_id=Max('id'), last=Max('updated_at')
+            ),
+        ]
+        if self.action == 'retrieve':
+            # The detail page also renders comments' likes, commenters and likers.
+            state.append(Comment.likes.through.objects.filter(comment__post_id__in=ids).aggregate(
+                count=Count('id'), last_id=Max('id')
+            ))
+            users += [
+                Comment.objects.filter(post_id__in=ids).values('author_id'),
+                Like.objects.filter(post_id__in=ids).values('user_id'),
+            ]
+        state.append(user_condition_state(*users))
+        return state
+    
     def perform_create(self, serializer):
         """Set the author to the current user when creating a post."""
         serializer.save(author=self.request.user)
     
-    @action(detail=True, methods=['post'])
+    @action(
+        detail=True,
+        methods=['post'],
+        permission_classes=[permissions.IsAuthenticated],
+        throttle_classes=BUCKET_THROTTLES
+    )
     def like(self, request, pk=None):
         """Like or unlike a post (toggle)."""
         post = self.get_object()
@@ -97,16 +191,25 @@ class PostViewSet(viewsets.ModelViewSet):
         })
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing comments."""
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     pagination_class = StandardResultsSetPagination
+    throttle_scope = 'comment'
+    
+    def get_throttles(self):
+        """Budget comment creation; reads and edits are not throttled."""
+        if self.action == 'create':
+            return [throttle() for throttle in BUCKET_THROTTLES]
+        return super().get_throttles()
     
     def get_queryset(self):
         """Return the queryset for comments."""
         # Use Comment.objects.all() as specified in requirements
-        queryset = Comment.objects.all().select_related('author', 'post')
+        queryset = with_comment_counts(
+            Comment.objects.all()
+        ).select_related('post').prefetch_related(prefetch_users('author'))
         
         # Filter by post ID if provided
         post_id = self.request.query_params.get('post')
@@ -120,6 +223,19 @@ class CommentViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def get_condition_state(self, ids):
+        """Aggregate what CommentSerializer renders, for the ETag."""
+        return [
+            Comment.objects.filter(pk__in=ids).aggregate(last=Max('updated_at')),
+            Comment.objects.filter(parent_comment_id__in=ids).aggregate(
+                count=Count('id'), last_id=Max('id')
+            ),
+            Comment.likes.through.objects.filter(comment_id__in=ids).aggregate(
+                count=Count('id'), last_id=Max('id')
+            ),
+            user_condition_state(Comment.objects.filter(pk__in=ids).values('author_id')),
+        ]
+    
     def perform_create(self, serializer):
         """Set the author to the current user when creating a comment."""
         comment = serializer.save(author=self.request.user)
@@ -127,7 +243,7 @@ class CommentViewSet(viewsets.ModelViewSet):
         # Create notification for post author
         NotificationManager.notify_comment(self.request.user, comment)
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def like(self, request, pk=None):
         """Like or unlike a comment."""
         comment = self.get_object()
@@ -142,7 +258,8 @@ class CommentViewSet(viewsets.ModelViewSet):
         
         return Response({
             'liked': liked,
-            'likes_count': comment.likes_count,
+            # Not comment.likes_count: get_queryset annotated it before the toggle.
+            'likes_count': comment.likes.count(),
             'message': 'Comment liked' if liked else 'Comment unliked'
         })
     
@@ -152,7 +269,9 @@ class CommentViewSet(viewsets.ModelViewSet):
         comment = self.get_object()
         
         # Get replies for this comment
-        replies = Comment.objects.all().filter(parent_comment=comment).select_related('author')
+        replies = with_comment_counts(
+            Comment.objects.all().filter(parent_comment=comment)
+        ).prefetch_related(prefetch_users('author'))
         
         page = self.paginate_queryset(replies)
         if page is not None:
@@ -167,24 +286,30 @@ class FeedView(APIView):
     """View to get the feed of posts from followed users."""
     permission_classes = [permissions.IsAuthenticated]
     
-    def get(self, request):
-        """Get feed posts with pagination."""
+    def get_queryset(self):
+        """Published posts from followed users, newest first."""
         # Get users that the current user is following
-        current_user = request.user
-        following_users = current_user.following.all()
+        following_users = self.request.user.following.all()
         
         # Get posts from followed users that are published
         # Use the exact pattern: Post.objects.filter(author__in=following_users).order_by
         feed_posts = Post.objects.filter(author__in=following_users).order_by('-created_at')
         
         # Only include published posts
-        feed_posts = feed_posts.filter(is_published=True)
+        return with_post_counts(
+            feed_posts.filter(is_published=True)
+        ).prefetch_related(prefetch_users('author'))
+    
+    def get(self, request):
+        """Get feed posts with pagination."""
+        feed_posts = self.get_queryset()
         
         # Apply pagination
         paginator = StandardResultsSetPagination()
         page = paginator.paginate_queryset(feed_posts, request)
         
         if page is not None:
+            record_impressions([post.id for post in page])
             serializer = FeedPostSerializer(page, many=True, context={'request': request})
             return paginator.get_paginated_response(serializer.data)
         
@@ -192,6 +317,76 @@ class FeedView(APIView):
         return Response(serializer.data)
 
 
+class FeedNewPostsView(APIView):
+    """
+    View counting feed posts newer than the newest one the client has.
+    
+    Clients poll this with ``since_id`` (and ``since``, that post's
+    ``created_at``, to save a lookup) and only re-fetch the feed when the
+    count is above zero. The count stops at ``max_count``. It is answered
+    from the partial (author, -created_at) WHERE is_published index, one
+    range scan per followed author.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_count = 50
+    # Largest BigAutoField id; the database cannot compare anything larger.
+    max_since_id = 2 ** 63 - 1
+    
+    def get_watermark(self, params):
+        """Return (since, since_id) from the query string; raise ValueError if unusable."""
+        since = since_id = None
+        if params.get('since_id'):
+            try:
+                since_id = int(params['since_id'])
+            except ValueError:
+                since_id = -1
+            if not 0 <= since_id <= self.max_since_id:
+                raise ValueError("since_id must be a post id.")
+        if params.get('since'):
+            try:
+                since = parse_datetime(params['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise ValueError("since must be an ISO 8601 timestamp.")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        if since is None and since_id is None:
+            raise ValueError("Pass since_id, since, or both.")
+        return since, since_id
+    
+    def get_queryset(self, since, since_id=None):
+        """Ids of followed authors' published posts after the watermark, one past the cap."""
+        posts = Post.objects.filter(
+            author__in=Follow.objects.filter(follower=self.request.user).values('followed_id'),
+            is_published=True
+        )
+        if since_id is None:
+            posts = posts.filter(created_at__gt=since)
+        else:
+            # Posts sharing the watermark's timestamp are ordered by id.
+            posts = posts.filter(created_at__gte=since).exclude(created_at=since, id__lte=since_id)
+        return posts.order_by().values('id')[:self.max_count + 1]
+    
+    def count_response(self, count):
+        return Response({'count': min(count, self.max_count), 'capped': count > self.max_count})
+    
+    def get(self, request):
+        """Return how many newer posts the feed has, up to max_count."""
+        try:
+            since, since_id = self.get_watermark(request.query_params)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if since is None:
+            since = Post.objects.filter(pk=since_id).values_list('created_at', flat=True).first()
+            if since is None:
+                return Response(
+                    {"error": "since_id is not a post; pass since as well."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return self.count_response(self.get_queryset(since, since_id).count())
+
+
 # Add these imports at the top of the file if not already present
 from notifications.models import Notification
 from notifications.notify import NotificationManager
@@ -200,6 +395,8 @@ from notifications.notify import NotificationManager
 class LikePostView(APIView):
     """View to like a post."""
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = BUCKET_THROTTLES
+    throttle_scope = 'like'
     
     def post(self, request, pk):
         """Like a post."""
@@ -237,6 +434,8 @@ class LikePostView(APIView):
 class UnlikePostView(APIView):
     """View to unlike a post."""
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = BUCKET_THROTTLES
+    throttle_scope = 'like'
     
     def post(self, request, pk):
         """Unlike a post."""
@@ -291,4 +490,220 @@ class PostLikesListView(generics.ListAPIView):
             'post_title': post.title,
             'likes_count': post.likes_count,
             'likers': likers
-        })
\ No newline at end of file
+        })
+
+
+class MediaUploadCreateView(generics.CreateAPIView):
+    """View to start a resumable upload session."""
+    serializer_class = MediaUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+
+class MediaUploadDetailView(APIView):
+    """View to check progress of an upload and send its chunks."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_upload(self, request, upload_id):
+        return get_object_or_404(MediaUpload, id=upload_id, owner=request.user)
+    
+    def get(self, request, upload_id):
+        """Report how many bytes were received so a client can resume."""
+        upload = self.get_upload(request, upload_id)
+        return Response(MediaUploadSerializer(upload).data)
+    
+    def put(self, request, upload_id):
+        """Append one chunk described by the Content-Range header."""
+        upload = self.get_upload(request, upload_id)
+        if upload.status != 'uploading':
+            return Response(
+                {"error": "Upload is already finalized."},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        try:
+            start, end = parse_content_range(request.META.get('HTTP_CONTENT_RANGE'), upload.size)
+            if start != upload.received:
+                return Response(
+                    {"error": "Chunk does not start at the current offset.", "received": upload.received},
+                    status=status.HTTP_409_CONFLICT
+                )
+            # Read the raw body; request.data is never touched so DRF does not buffer it.
+            write_chunk(upload, request.stream, start, end, request.META.get('HTTP_X_CHUNK_SHA256'))
+        except UploadError as exc:
+            return Response({"error": str(exc), "received": upload.received}, status=status.HTTP_400_BAD_REQUEST)
+        
+        MediaUpload.objects.filter(pk=upload.pk, received=start).update(
+            received=end + 1,
+            updated_at=timezone.now()
+        )
+        upload.refresh_from_db()
+        return Response(MediaUploadSerializer(upload).data)
+
+
+class MediaUploadFinalizeView(APIView):
+    """View to verify a fully received upload and make it attachable."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, upload_id):
+        """Check size, checksum and image format, then store the file."""
+        upload = get_object_or_404(MediaUpload, id=upload_id, owner=request.user)
+        if upload.status != 'uploading':
+            return Response(MediaUploadSerializer(upload).data)
+        
+        try:
+            finalize_upload(upload, request.data.get('sha256'))
+        except UploadError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(MediaUploadSerializer(upload).data)
+
+
+class CounterMetricsView(APIView):
+    """View exposing the health of the buffered view/impression counters."""
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        """Return pending increments and flush lag."""
+        return Response(get_counter_buffer().metrics())
+
+
+class HashtagPostsView(generics.ListAPIView):
+    """View to list published posts using a hashtag, newest first."""
+    serializer_class = LeanPostListSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = HashtagCursorPagination
+    
+    def get_queryset(self):
+        """Walk the hashtag side table instead of searching post content."""
+        return PostHashtag.objects.filter(
+            tag=self.kwargs['tag'].lower().lstrip('#'),
+            post__is_published=True
+        ).values('id', 'post_id', 'created_at')
+    
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        ids = [hashtag['post_id'] for hashtag in page]
+        posts = LeanPostListSerializer.project(with_post_counts(Post.objects.filter(pk__in=ids)), request)
+        rows = {row['id']: row for row in posts}
+        serializer = self.get_serializer([rows[pk] for pk in ids if pk in rows], many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+
+class AsyncPostViewSet(AsyncDispatchMixin, PostViewSet):
+    """PostViewSet with list and retrieve on the async ORM, for ASGI."""
+
+    async def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = await apaginate(self.paginator, queryset.prefetch_related(None).values_list('pk', flat=True), request)
+        not_modified = await sync_to_async(self.evaluate_conditions)(request, ids, self.paginator.page.paginator.count)
+        if not_modified is not None:
+            return not_modified
+
+        # Load the page by primary key instead of repeating the offset scan.
+        posts = {row['id']: row async for row in self.get_page_rows(queryset, ids)}
+        serializer = self.get_serializer([posts[pk] for pk in ids if pk in posts], many=True)
+        response = self.get_paginated_response(serializer.data)
+        await sync_to_async(record_impressions)(list(posts))
+        return self.with_validators(response)
+
+    async def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: kwargs[lookup]})
+        ids = [pk async for pk in queryset.prefetch_related(None).values_list('pk', flat=True)]
+        if not ids:
+            raise Http404('No Post matches the given query.')
+
+        response = await sync_to_async(self.evaluate_conditions)(request, ids)
+        if response is None:
+            post = await queryset.aget()
+            self.check_object_permissions(request, post)
+            response = self.with_validators(Response(self.get_serializer(post).data))
+        await sync_to_async(record_views)(ids)
+        return response
+
+
+class AsyncFeedView(AsyncDispatchMixin, FeedView):
+    """FeedView on the async ORM, for ASGI."""
+
+    async def get(self, request):
+        paginator = StandardResultsSetPagination()
+        page = await apaginate(paginator, self.get_queryset(), request)
+        await sync_to_async(record_impressions)([post.id for post in page])
+        serializer = FeedPostSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+
+class AsyncFeedNewPostsView(AsyncDispatchMixin, FeedNewPostsView):
+    """FeedNewPostsView on the async ORM, for ASGI."""
+
+    async def get(self, request):
+        try:
+            since, since_id = self.get_watermark(request.query_params)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if since is None:
+            since = await Post.objects.filter(pk=since_id).values_list('created_at', flat=True).afirst()
+            if since is None:
+                return Response(
+                    {"error": "since_id is not a post; pass since as well."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return self.count_response(await self.get_queryset(since, since_id).acount())
+
+
+class EngagementDashboardView(APIView):
+    """View serving an author's engagement over time from the rollup tables."""
+    permission_classes = [permissions.IsAuthenticated]
+    # granularity -> (rollup model, period length, default periods, max periods)
+    GRANULARITIES = {
+        'hour': (HourlyEngagement, timedelta(hours=1), 48, 24 * 31),
+        'day': (DailyEngagement, timedelta(days=1), 30, 366),
+    }
+    METRICS = ('likes', 'comments', 'follows')
+    
+    def get(self, request):
+        """Return a zero-filled series ending with the current period, plus totals."""
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in self.GRANULARITIES:
+            return Response(
+                {"error": "granularity must be 'hour' or 'day'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        model, step, default, limit = self.GRANULARITIES[granularity]
+        try:
+            periods = int(request.query_params.get('periods', default))
+        except ValueError:
+            periods = 0
+        if not 1 <= periods <= limit:
+            return Response(
+                {"error": f"periods must be a whole number from 1 to {limit}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        current = timezone.now().replace(minute=0, second=0, microsecond=0)
+        if granularity == 'day':
+            current = current.replace(hour=0)
+        start = current - step * (periods - 1)
+        rows = {
+            row['period_start']: row
+            for row in model.objects.filter(author=request.user, period_start__gte=start)
+            .values('period_start', *self.METRICS)
+        }
+        series = []
+        for index in range(periods):
+            period = start + step * index
+            row = rows.get(period, {})
+            series.append({'period_start': period, **{metric: row.get(metric, 0) for metric in self.METRICS}})
+        
+        # The rollups are current as of the least recently caught-up source.
+        updated = RollupWatermark.objects.aggregate(updated_at=Min('updated_at'))['updated_at']
+        return Response({
+            'granularity': granularity,
+            'updated_at': updated,
+            'totals': {metric: sum(point[metric] for point in series) for metric in self.METRICS},
+            'series': series,
+        })
@@ -0,0 +1,80 @@
+"""
+Async request handling for DRF views served under ASGI.
+
+DRF dispatches synchronously, so an ``async def get`` on an ``APIView``
+would never be awaited. ``AsyncDispatchMixin`` replaces ``dispatch`` with a
+coroutine: async handlers run on the event loop and can use Django's async
+ORM, while sync handlers (writes, OPTIONS, other viewset actions) and the
+authentication/permission/throttle checks run in a worker thread through
+``sync_to_async``.
+
+The async variants are wired into the URLconf when ``ASYNC_VIEWS`` is on,
+which ``asgi.py`` does by default; WSGI deployments keep the sync views.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+
+
+class AsyncDispatchMixin:
+    """Dispatch DRF views and viewsets as coroutines."""
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        # ViewSetMixin.as_view does not mark its view function itself.
+        return markcoroutinefunction(super().as_view(*args, **kwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        """Mirror ``APIView.dispatch``, awaiting async handlers."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Token lookup and throttling hit the database or cache.
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+async def apaginate(pagination, queryset, request):
+    """
+    Async counterpart of ``PageNumberPagination.paginate_queryset``.
+
+    Counts and loads the page with the async ORM, leaving ``pagination``
+    ready for ``get_paginated_response``.
+    """
+    page_size = pagination.get_page_size(request)
+    if not page_size:
+        return None
+
+    paginator = pagination.django_paginator_class(queryset, page_size)
+    # Paginator.count is a cached_property; fill it so no sync query runs.
+    paginator.count = await queryset.acount()
+    page_number = pagination.get_page_number(request, paginator)
+    try:
+        page = paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+    page.object_list = [obj async for obj in page.object_list]
+    if paginator.num_pages > 1 and pagination.template is not None:
+        pagination.display_page_controls = True
+    pagination.page = page
+    pagination.request = request
+    return page.object_list
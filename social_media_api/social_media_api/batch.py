@@ -0,0 +1,216 @@
+"""
+Batched API requests: ``POST /api/batch/``.
+
+On launch, a mobile client needs the feed, notification count, profile
+and settings. Sent as separate calls, each one goes through the whole
+middleware stack and authenticates its token again. A batch sends them
+in one call:
+
+    {"requests": [{"method": "GET", "path": "/api/feed/"},
+                  {"method": "GET", "path": "/api/notifications/count/",
+                   "headers": {"If-None-Match": "W/\\"...\\""}},
+                  {"method": "POST", "path": "/api/posts/7/like/"}],
+     "concurrent": true}
+
+A bare list of requests is accepted too. Each sub-request is resolved
+through the URLconf and its view is called in-process. It reuses the
+batch's authenticated user and token, so authentication runs once. The
+responses come back in the same order:
+
+    {"responses": [{"status": 200, "headers": {"ETag": ...}, "body": {...}}, ...]}
+
+Sub-requests run in order. With ``"concurrent": true``, consecutive reads
+(GET/HEAD) run together on up to ``BATCH_MAX_WORKERS`` threads. A write
+waits for the reads before it, and the reads after it wait for the write.
+Database routing follows ``ReadYourWritesMiddleware`` per sub-request:
+reads go to replicas until the batch, or recently the client, has written.
+"""
+
+import contextvars
+import copy
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.exception import response_for_exception
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .db_router import replica_aliases, use_primary, wrote_recently
+
+
+READ_METHODS = ('GET', 'HEAD')
+METHODS = READ_METHODS + ('POST', 'PUT', 'PATCH', 'DELETE')
+# The body is embedded in the envelope, so these describe nothing useful.
+DROPPED_HEADERS = {'content-type', 'content-length'}
+
+
+def max_requests():
+    return getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+
+
+def max_workers():
+    return getattr(settings, 'BATCH_MAX_WORKERS', 4)
+
+
+def validation_error(specs):
+    """Return what is wrong with a list of sub-requests, or None."""
+    if not isinstance(specs, list) or not specs:
+        return "Send a non-empty list of requests, or {\"requests\": [...]}."
+    if len(specs) > max_requests():
+        return f"A batch can hold at most {max_requests()} requests."
+    for spec in specs:
+        if not isinstance(spec, dict) or not str(spec.get('path', '')).startswith('/'):
+            return "Every request needs a \"path\" starting with \"/\"."
+        if str(spec.get('method', 'GET')).upper() not in METHODS:
+            return f"Unsupported method {spec['method']!r}."
+        if not isinstance(spec.get('headers', {}), dict):
+            return "Request \"headers\" must be an object."
+    return None
+
+
+def fresh_user(user):
+    """
+    A copy of the batch's user for one sub-request.
+
+    Standalone requests never share a user object. Without a copy, values cached
+    on the user (follower counts...) by one sub-request would leak into the next.
+    """
+    user = copy.copy(user)
+    for name in ('followers_count', 'following_count'):
+        user.__dict__.pop(name, None)
+    return user
+
+
+class SubRequest(HttpRequest):
+    """An in-process request sharing the batch's client, scheme, session and credentials."""
+
+    def __init__(self, batch, spec):
+        super().__init__()
+        outer = batch._request
+        url = urlsplit(spec['path'])
+        body = b'' if spec.get('body') is None else json.dumps(spec['body']).encode()
+        self.outer = outer
+        self.method = str(spec.get('method', 'GET')).upper()
+        self.path = self.path_info = url.path
+        self.META = {key: value for key, value in outer.META.items() if not key.startswith(('CONTENT_', 'wsgi.'))}
+        self.META.update({
+            'REQUEST_METHOD': self.method,
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+        })
+        for name, value in spec.get('headers', {}).items():
+            self.META['HTTP_' + name.upper().replace('-', '_')] = str(value)
+        self.GET = QueryDict(url.query)
+        self.COOKIES = outer.COOKIES
+        if hasattr(outer, 'session'):
+            self.session = outer.session
+        self._stream = BytesIO(body)
+        self._read_started = False
+        if batch.user.is_authenticated:
+            # DRF's forced authentication: views skip their authenticators.
+            self._force_auth_user = fresh_user(batch.user)
+            self._force_auth_token = batch.auth
+
+    def _get_scheme(self):
+        return self.outer.scheme
+
+
+def describe(response):
+    """The envelope entry for a sub-request's response."""
+    if response.streaming:
+        return {
+            'status': status.HTTP_400_BAD_REQUEST,
+            'headers': {},
+            'body': {'error': 'Streaming responses cannot be batched.'}
+        }
+    headers = {name: value for name, value in response.items() if name.lower() not in DROPPED_HEADERS}
+    if isinstance(response, Response):
+        # Skip rendering: the data is rendered once, inside the envelope.
+        body = response.data
+    elif not response.content:
+        body = None
+    elif response.get('Content-Type', '').startswith('application/json'):
+        body = json.loads(response.content)
+    else:
+        body = response.content.decode(response.charset, errors='replace')
+    return {'status': response.status_code, 'headers': headers, 'body': body}
+
+
+class BatchView(APIView):
+    """Run several API requests in one round trip."""
+    # Each sub-request is checked by its own view's permissions.
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        specs, concurrent = request.data, False
+        if isinstance(specs, dict):
+            specs, concurrent = specs.get('requests'), bool(specs.get('concurrent', False))
+        error = validation_error(specs)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        responses = [None] * len(specs)
+        pinned = bool(replica_aliases()) and wrote_recently(request)
+        wrote, reads = False, []
+        for index, spec in enumerate(specs):
+            if str(spec.get('method', 'GET')).upper() in READ_METHODS:
+                reads.append(index)
+                continue
+            self.run_reads(request, specs, reads, responses, pinned, concurrent)
+            reads = []
+            responses[index] = self.run(request, spec, pinned=True)
+            pinned = wrote = True
+        self.run_reads(request, specs, reads, responses, pinned, concurrent)
+
+        response = Response({'responses': responses})
+        # Only pin the client to the primary if something was written.
+        response.read_only = not wrote
+        return response
+
+    def run_reads(self, request, specs, indexes, responses, pinned, concurrent):
+        if not concurrent or len(indexes) < 2:
+            for index in indexes:
+                responses[index] = self.run(request, specs[index], pinned)
+            return
+        with ThreadPoolExecutor(max_workers=min(max_workers(), len(indexes))) as pool:
+            futures = {
+                index: pool.submit(contextvars.copy_context().run, self.run_in_thread, request, specs[index], pinned)
+                for index in indexes
+            }
+        for index, future in futures.items():
+            responses[index] = future.result()
+
+    def run_in_thread(self, request, spec, pinned):
+        try:
+            return self.run(request, spec, pinned)
+        finally:
+            connections.close_all()
+
+    def run(self, request, spec, pinned):
+        """Dispatch one sub-request and describe its response."""
+        subrequest = SubRequest(request, spec)
+        with use_primary(pinned):
+            try:
+                match = resolve(subrequest.path_info)
+                if getattr(match.func, 'cls', None) is type(self):
+                    return describe(Response(
+                        {"error": "Batches cannot be nested."}, status=status.HTTP_400_BAD_REQUEST
+                    ))
+                subrequest.resolver_match = match
+                view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+                response = view(subrequest, *match.args, **match.kwargs)
+            except Resolver404:
+                response = Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+            except Exception as exc:
+                response = response_for_exception(subrequest, exc)
+        return describe(response)
@@ -0,0 +1,152 @@
+"""
+Primary/replica database routing with read-your-writes stickiness.
+
+Writes always go to ``default``. Reads made while serving a request go to
+a random alias from ``DATABASE_REPLICAS`` unless the request is pinned to
+the primary: every unsafe request is, and so is every request from a
+client that wrote within the last ``DATABASE_PRIMARY_STICKY_SECONDS``.
+Reads outside a request (management commands, background workers) stay on
+the primary: nothing there accounts for replication lag, and they often
+read rows that were just written. Unsafe requests that
+turn out not to write (a batch of reads) set ``response.read_only`` so the
+client is not pinned. Clients are recognised
+by a cookie and, for token clients that drop cookies, by a cache flag keyed
+on their Authorization header.
+"""
+
+import hashlib
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+PRIMARY = 'default'
+PIN_COOKIE = 'db_primary_until'
+
+# ReadYourWritesMiddleware (or use_primary) sets this for each request.
+_pinned = ContextVar('pinned_to_primary', default=True)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sticky_seconds():
+    return getattr(settings, 'DATABASE_PRIMARY_STICKY_SECONDS', 5)
+
+
+@contextmanager
+def use_primary(pinned=True):
+    """Send every read in the block to the primary (or, if not ``pinned``, to replicas)."""
+    token = _pinned.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Route reads to replicas and writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        # Reads inside a transaction must see its own uncommitted writes.
+        if not replicas or _pinned.get() or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary through replication.
+        return db == PRIMARY
+
+
+def _client_cache_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return 'db-primary-pin:' + hashlib.sha256(authorization.encode()).hexdigest()
+
+
+def wrote_recently(request):
+    """Return True if this client wrote within the sticky window."""
+    try:
+        if float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    key = _client_cache_key(request)
+    return bool(key and cache.get(key))
+
+
+class ReadYourWritesMiddleware:
+    """Pin writes, and reads shortly after a client's writes, to the primary."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+
+        writing = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        token = _pinned.set(writing or wrote_recently(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+
+        if writing and not getattr(response, 'read_only', False):
+            self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+
+        writing = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        # sync_to_async copies the context, so the pin reaches the ORM thread.
+        token = _pinned.set(writing or await sync_to_async(wrote_recently)(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pinned.reset(token)
+
+        if writing and not getattr(response, 'read_only', False):
+            await sync_to_async(self.pin)(request, response)
+        return response
+
+    def pin(self, request, response):
+        """Keep this client's reads on the primary for the sticky window."""
+        window = sticky_seconds()
+        response.set_cookie(
+            PIN_COOKIE,
+            str(int(time.time() + window) + 1),
+            max_age=window,
+            httponly=True,
+            samesite='Lax'
+        )
+        key = _client_cache_key(request)
+        if key:
+            cache.set(key, 1, window)
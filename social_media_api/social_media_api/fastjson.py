@@ -0,0 +1,66 @@
+"""
+orjson-backed JSON renderer and parser for DRF.
+
+``ORJSONRenderer`` produces the same bytes as DRF's ``JSONRenderer`` in its
+default compact, UTF-8 mode, except for floats: datetimes, UUIDs and dates
+are encoded natively by orjson, and anything orjson does not know (Decimals,
+lazy translation strings, timedeltas, querysets...) goes through DRF's own
+``JSONEncoder``. Data orjson refuses, such as integers wider than 64 bits,
+is rendered by the stdlib encoder instead, which also raises DRF's errors.
+Requests for indented output (``Accept: application/json; indent=4``, the
+browsable API) and ASCII or non-compact settings fall back to the stdlib
+renderer, as does everything when orjson is not installed.
+
+Floats keep their value but not always Python's spelling: orjson writes
+``1e16`` and ``0.00001`` where ``repr`` gives ``1e+16`` and ``1e-05``, and
+renders NaN and infinities as ``null`` where ``JSONRenderer`` raises
+``ValueError``. Checking for them would cost more than the stdlib render, and
+the API's serializers emit no floats.
+"""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Render JSON with orjson, matching JSONRenderer's bytes for all but floats."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Keep the output a strict JavaScript subset, like JSONRenderer.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """Parse UTF-8 JSON request bodies with orjson."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,272 @@
+"""
+Per-request SQL and latency instrumentation.
+
+``RequestMetricsMiddleware`` times every request. For a sampled share of
+requests (``INSTRUMENTATION_SAMPLE_RATE``) it also wraps each database
+connection with an execute wrapper to count queries, total SQL time and
+repeated statements, the usual sign of an N+1. Results go into
+in-process histograms served in the Prometheus text format at
+``/metrics``, and into a ``Server-Timing`` header on the response.
+
+Execute wrappers work with ``DEBUG = False`` and only add two clock reads
+per query, so the middleware can stay on in production. Each worker
+process keeps its own registry; scrape every worker, or let the
+Prometheus server aggregate per instance.
+"""
+
+import hmac
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted(self._series.items())
+            for label_values, (counts, total, count) in items:
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labels, label_values, ('le', bound))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = _format_labels(self.labels, label_values, ('le', '+Inf'))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {total:.6f}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class CounterMetric:
+    """Monotonic counter keyed by label values."""
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+REQUESTS = CounterMetric(
+    'http_requests_total', 'Requests handled, by view, method and status.',
+    ('view', 'method', 'status')
+)
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Wall time per request.',
+    ('view', 'method'), LATENCY_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL queries per sampled request.',
+    ('view',), QUERY_BUCKETS
+)
+DB_DURATION = Histogram(
+    'http_request_db_duration_seconds', 'Total SQL time per sampled request.',
+    ('view',), LATENCY_BUCKETS
+)
+DUPLICATE_QUERIES = CounterMetric(
+    'http_request_duplicate_queries_total',
+    'Queries that repeated an earlier statement in the same sampled request.',
+    ('view',)
+)
+METRICS = (REQUESTS, REQUEST_DURATION, DB_QUERIES, DB_DURATION, DUPLICATE_QUERIES)
+
+
+class QueryRecorder:
+    """Execute wrapper collecting statement text and timings."""
+
+    def __init__(self):
+        self.statements = Counter()
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.statements[sql] += 1
+
+    @property
+    def count(self):
+        return sum(self.statements.values())
+
+    @property
+    def duplicates(self):
+        return self.count - len(self.statements)
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match.route or 'unresolved'
+
+
+def sample_recorder():
+    rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 1.0)
+    return QueryRecorder() if rate and random.random() < rate else None
+
+
+def install_recorder(stack, recorder):
+    """Wrap every connection of the current thread with ``recorder``."""
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+
+class RequestMetricsMiddleware:
+    """Record wall time for every request and SQL stats for sampled ones."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        recorder = sample_recorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            if recorder is not None:
+                install_recorder(stack, recorder)
+            response = self.get_response(request)
+        return self.finish(request, response, time.perf_counter() - started, recorder)
+
+    async def __acall__(self, request):
+        recorder = sample_recorder()
+        started = time.perf_counter()
+        stack = ExitStack()
+        # Connections are per thread and the async ORM runs on the
+        # request's sync_to_async thread, so the wrappers go there.
+        if recorder is not None:
+            await sync_to_async(install_recorder)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, time.perf_counter() - started, recorder)
+
+    def finish(self, request, response, elapsed, recorder):
+        view = view_label(request)
+        REQUESTS.inc(1, view, request.method, response.status_code)
+        REQUEST_DURATION.observe(elapsed, view, request.method)
+
+        timings = [f'app;dur={elapsed * 1000:.1f}']
+        if recorder is not None:
+            DB_QUERIES.observe(recorder.count, view)
+            DB_DURATION.observe(recorder.duration, view)
+            if recorder.duplicates:
+                DUPLICATE_QUERIES.inc(recorder.duplicates, view)
+                self.report_duplicates(view, recorder)
+            timings.append(
+                f'db;dur={recorder.duration * 1000:.1f};'
+                f'desc="{recorder.count} queries, {recorder.duplicates} repeated"'
+            )
+        if getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def report_duplicates(self, view, recorder):
+        threshold = getattr(settings, 'INSTRUMENTATION_DUPLICATE_QUERY_THRESHOLD', 10)
+        sql, count = recorder.statements.most_common(1)[0]
+        if count >= threshold:
+            logger.warning('Possible N+1 in %s: %d runs of %s', view, count, sql[:300])
+
+
+def metrics_view(request):
+    """Serve the request histograms in the Prometheus text format."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    supplied = request.META.get('HTTP_AUTHORIZATION', '').encode()
+    if token and not hmac.compare_digest(supplied, f'Bearer {token}'.encode()):
+        return HttpResponseForbidden()
+
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.extend(counter_buffer_metrics())
+    return HttpResponse(
+        '\n'.join(lines) + '\n',
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def counter_buffer_metrics():
+    """Gauges for the buffered post view/impression counters."""
+    from posts.counters import get_counter_buffer
+
+    stats = get_counter_buffer().metrics()
+    gauges = (
+        ('post_counter_pending_posts', 'pending_posts', 'gauge'),
+        ('post_counter_flush_lag_seconds', 'flush_lag_seconds', 'gauge'),
+        ('post_counter_flushed_increments_total', 'flushed_increments_total', 'counter'),
+        ('post_counter_failed_flushes_total', 'failed_flushes_total', 'counter'),
+    )
+    lines = []
+    for name, key, kind in gauges:
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'{name} {stats[key]}')
+    return lines
@@ -0,0 +1,307 @@
+"""
+Asyncio load harness for the API.
+
+Each virtual user holds one keep-alive HTTP/1.1 connection and repeats a
+scripted session until the run ends: read the feed, page through posts,
+like (and un-like) a post from the feed, sometimes comment on it, and poll
+the unread notification count. Latencies are recorded per endpoint and
+summarised as p50/p95/p99 and throughput, in a JSON document that can be
+saved as a baseline and compared against later runs.
+
+The client is a minimal HTTP/1.1 implementation on asyncio streams so the
+harness needs nothing beyond the standard library.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=b''):
+        """Send a request and return ``(status, body)``, reconnecting once if the server hung up."""
+        reused = self.writer is not None
+        try:
+            return await self._send(method, path, headers or {}, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            if not reused:
+                raise
+            return await self._send(method, path, headers or {}, body)
+
+    async def _send(self, method, path, headers, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Server closed the connection')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in response_headers:
+            payload = await self.reader.readexactly(int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            payload = await self._read_chunked()
+        else:
+            payload = await self.reader.read()
+            self.close()
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, payload
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await self.reader.readline()
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class Recorder:
+    """Latencies and status codes per endpoint."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+
+    def record(self, endpoint, seconds, status):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        self.statuses.setdefault(endpoint, Counter())[str(status)] += 1
+
+    def summary(self, duration):
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            statuses = self.statuses[endpoint]
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'errors': sum(count for status, count in statuses.items() if not status.startswith(('2', '3'))),
+                'statuses': dict(sorted(statuses.items())),
+                'throughput': round(len(values) / duration, 2),
+                'mean_ms': round(sum(values) / len(values) * 1000, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2),
+            }
+        requests = sum(item['requests'] for item in endpoints.values())
+        return {
+            'duration_seconds': round(duration, 2),
+            'totals': {
+                'requests': requests,
+                'errors': sum(item['errors'] for item in endpoints.values()),
+                'throughput': round(requests / duration, 2),
+            },
+            'endpoints': endpoints,
+        }
+
+
+class VirtualUser:
+    """Runs scripted sessions for one account over one connection."""
+
+    def __init__(self, connection, prefix, user_id, token, recorder, rng, think_time, comment_rate, writes):
+        self.connection = connection
+        self.prefix = prefix
+        self.user_id = user_id
+        self.headers = {'Authorization': f'Token {token}', 'Accept': 'application/json'}
+        self.recorder = recorder
+        self.rng = rng
+        self.think_time = think_time
+        self.comment_rate = comment_rate
+        self.writes = writes
+
+    async def call(self, endpoint, method, path, data=None):
+        headers = dict(self.headers)
+        body = b''
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        if not path.startswith(self.prefix):
+            path = self.prefix + path
+        started = time.perf_counter()
+        try:
+            status, payload = await self.connection.request(method, path, headers, body)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            self.connection.close()
+            status, payload = 'failed', b''
+        self.recorder.record(endpoint, time.perf_counter() - started, status)
+        if self.think_time:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+        if status == 200:
+            try:
+                return json.loads(payload)
+            except ValueError:
+                return None
+        return None
+
+    async def session(self):
+        feed = await self.call('feed', 'GET', '/api/feed/')
+        post_ids = [post['id'] for post in (feed or {}).get('results', [])]
+        page = await self.call('post-list', 'GET', '/api/posts/')
+        for _ in range(self.rng.randint(0, 2)):
+            if not (page or {}).get('next'):
+                break
+            next_url = urlsplit(page['next'])
+            page = await self.call('post-list', 'GET', f'{next_url.path}?{next_url.query}')
+        if post_ids and self.writes:
+            post_id = self.rng.choice(post_ids)
+            # The like action toggles, so a second call restores the original state.
+            await self.call('post-like', 'POST', f'/api/posts/{post_id}/like/')
+            await self.call('post-like', 'POST', f'/api/posts/{post_id}/like/')
+            if self.rng.random() < self.comment_rate:
+                await self.call('comment-create', 'POST', '/api/comments/', {
+                    'post_id': post_id,
+                    'author_id': self.user_id,
+                    'content': 'Load test comment',
+                })
+        await self.call('notification-count', 'GET', '/api/notifications/count/')
+
+    async def run(self, deadline):
+        try:
+            while time.monotonic() < deadline:
+                await self.session()
+        finally:
+            self.connection.close()
+
+
+async def run_load(base_url, accounts, concurrency=10, duration=30, think_time=0.0,
+                   comment_rate=0.2, seed=42, writes=True):
+    """
+    Run ``concurrency`` virtual users against ``base_url`` for ``duration`` seconds.
+
+    ``accounts`` is a list of ``(user_id, token)`` pairs shared round-robin
+    between the virtual users. With ``writes`` off the sessions skip the
+    like and comment steps. Returns the summary produced by ``Recorder``.
+    """
+    if not accounts:
+        raise ValueError('At least one account is needed')
+    url = urlsplit(base_url)
+    prefix = url.path.rstrip('/')
+    recorder = Recorder()
+    rng = random.Random(seed)
+    users = [
+        VirtualUser(
+            Connection(url.hostname, url.port or 80),
+            prefix,
+            *accounts[index % len(accounts)],
+            recorder=recorder,
+            rng=random.Random(rng.random()),
+            think_time=think_time,
+            comment_rate=comment_rate,
+            writes=writes,
+        )
+        for index in range(concurrency)
+    ]
+    started = time.monotonic()
+    await asyncio.gather(*(user.run(started + duration) for user in users))
+    result = recorder.summary(time.monotonic() - started)
+    result['started_at'] = datetime.now(timezone.utc).isoformat()
+    result['config'] = {
+        'base_url': base_url,
+        'concurrency': concurrency,
+        'duration': duration,
+        'think_time': think_time,
+        'comment_rate': comment_rate,
+        'writes': writes,
+        'seed': seed,
+        'accounts': len(accounts),
+    }
+    return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(argv, port, env=None, timeout=30):
+    """Start a server process and wait until it accepts connections on ``port``."""
+    env = dict(os.environ, DJANGO_ALLOWED_HOSTS='127.0.0.1,localhost', **(env or {}))
+    server = subprocess.Popen(argv, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'Server exited with status {server.returncode}: {" ".join(argv)}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError(f'Server did not start within {timeout} seconds: {" ".join(argv)}')
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def compare(result, baseline, tolerance=0.2):
+    """
+    List regressions of ``result`` against ``baseline``.
+
+    A latency percentile regresses when it grows by more than ``tolerance``
+    (a fraction); throughput regresses when it drops by more than that.
+    Returns ``(endpoint, metric, baseline_value, current_value)`` tuples.
+    """
+    regressions = []
+    for endpoint, base in baseline.get('endpoints', {}).items():
+        current = result['endpoints'].get(endpoint)
+        if current is None:
+            continue
+        for metric in LATENCY_METRICS:
+            if current[metric] > base[metric] * (1 + tolerance):
+                regressions.append((endpoint, metric, base[metric], current[metric]))
+        if current['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append((endpoint, 'throughput', base['throughput'], current['throughput']))
+    return regressions
@@ -29,6 +29,40 @@ DATABASES = {
     )
 }
 
+# Comma-separated replica URLs; reads are spread across them by
+# social_media_api.db_router and writes stay on the primary.
+for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    DATABASES[f'replica_{index}'] = {
+        **dj_database_url.parse(url.strip(), conn_max_age=600, ssl_require=True),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+# CACHE CONFIGURATION
+# Token lookups are cached, so every worker must share one cache for
+# logout/password-change invalidation to take effect everywhere; with a
+# per-process cache other workers would accept a revoked token for up to
+# TOKEN_CACHE_TIMEOUT. Production refuses to start without REDIS_URL.
+# Throttle buckets stay in the per-process 'throttle' cache.
+CACHES = {
+    **CACHES,
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+}
+
+# Heroku's router appends one X-Forwarded-For hop; throttles key anonymous
+# and per-IP buckets on the address it saw.
+REST_FRAMEWORK['NUM_PROXIES'] = int(os.environ.get('NUM_PROXIES', 1))
+
+# REQUEST METRICS
+# Record SQL for a share of requests only; wall time is always recorded.
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('INSTRUMENTATION_SAMPLE_RATE', 0.1))
+# /metrics exposes per-route latency and SQL statistics, so production
+# refuses to start without a bearer token to protect it.
+METRICS_TOKEN = os.environ['METRICS_TOKEN']
+
 # STATIC FILES (using WhiteNoise for Heroku)[citation:5]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATIC_URL = 'static/'
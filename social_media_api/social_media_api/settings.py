@@ -18,7 +18,7 @@ SECRET_KEY = os.environ.get(
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get('DJANGO_DEBUG', '') != 'False'
 DEBUG = False
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -42,7 +42,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'social_media_api.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'social_media_api.db_router.ReadYourWritesMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,10 +79,24 @@ WSGI_APPLICATION = 'social_media_api.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLITE_PATH points a local run at another database, e.g. a generated benchmark set.
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Read replicas (see social_media_api.db_router). To try routing locally,
+# copy db.sqlite3 and point SQLITE_REPLICA_PATH at the copy.
+if os.environ.get('SQLITE_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['SQLITE_REPLICA_PATH'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['social_media_api.db_router.PrimaryReplicaRouter']
+# Seconds a client's reads stay on the primary after it writes
+DATABASE_PRIMARY_STICKY_SECONDS = 5
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -113,9 +129,64 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resized post image / profile picture variants (see posts.renditions)
+IMAGE_RENDITION_WORKERS = 2
+IMAGE_RENDITIONS_ASYNC = True
+
+# Resumable chunked uploads (see posts.uploads)
+CHUNKED_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'uploads', 'partial')
+CHUNKED_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_TTL = 24 * 60 * 60  # seconds an unfinished upload is kept
+
+# Buffered post view/impression counters (see posts.counters)
+POST_COUNTER_FLUSH_INTERVAL = 10  # seconds
+POST_COUNTER_FLUSH_THRESHOLD = 1000  # pending posts
+
+# Per-request SQL/latency metrics (see social_media_api.instrumentation)
+INSTRUMENTATION_SAMPLE_RATE = 1.0  # share of requests whose queries are recorded
+INSTRUMENTATION_SERVER_TIMING = True
+INSTRUMENTATION_DUPLICATE_QUERY_THRESHOLD = 10  # repeats logged as a possible N+1
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token for /metrics
+
+# Async variants of the read-heavy views (see social_media_api.async_views);
+# asgi.py turns this on, WSGI servers keep the sync views.
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '') == 'True'
+
+# POST /api/batch/ (see social_media_api.batch): sub-requests per batch, and
+# threads for running independent reads concurrently
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+
+# Engagement rollups (see posts.rollups): rows younger than this many seconds
+# wait for the next run of rollup_engagement, so slow transactions are not
+# skipped
+ROLLUP_LAG_SECONDS = 60
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Per-process token buckets (see social_media_api.throttling)
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+THROTTLE_CACHE = 'throttle'
+
+# Seconds a token -> user lookup stays cached
+TOKEN_CACHE_TIMEOUT = 300
+
+# Failed account purges are retried after 1, 2, 4... minutes (see
+# process_account_deletions), up to this many attempts in total
+ACCOUNT_DELETION_MAX_ATTEMPTS = 5
+
 # Custom user model
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
@@ -125,9 +196,32 @@ CORS_ALLOW_ALL_ORIGINS = True  # For development only
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed JSON (social_media_api.fastjson); falls back to the stdlib
+    # encoder when orjson is not installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'social_media_api.fastjson.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'social_media_api.fastjson.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Token buckets per user and per IP ('<scope>-ip') for the views with a
+    # throttle_scope; each holds N requests and refills N per period.
+    'DEFAULT_THROTTLE_RATES': {
+        'like': '120/min',
+        'like-ip': '600/min',
+        'comment': '30/min',
+        'comment-ip': '120/min',
+        'follow': '60/min',
+        'follow-ip': '300/min',
+        'search': '60/min',
+        'search-ip': '300/min',
+    },
 }
\ No newline at end of file
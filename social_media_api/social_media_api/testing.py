@@ -0,0 +1,51 @@
+"""
+Shared helpers for the per-app query budget tests.
+"""
+
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+
+from posts.counters import get_counter_buffer
+
+
+class QueryBudgetMixin:
+    """
+    Pin the number of SQL queries each endpoint may run.
+
+    List endpoints are requested at several page sizes and detail endpoints
+    for objects with few and many related rows; every variant must run
+    exactly ``budget`` queries, so anything that grows per row fails.
+    """
+
+    page_sizes = (5, 20)
+
+    def setUp(self):
+        super().setUp()
+        # Content types are cached per process; start every test cold.
+        ContentType.objects.clear_cache()
+        # Keep buffered view/impression flushes out of the counts.
+        buffer = get_counter_buffer()
+        patcher = mock.patch.multiple(buffer, flush_interval=float('inf'), flush_threshold=float('inf'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertQueryBudget(self, budget, *urls, method='get', data=None, paginate=False, **extra):
+        """Request each url (at each page size if ``paginate``) within ``budget`` queries."""
+        variants = [
+            f"{url}{'&' if '?' in url else '?'}page_size={size}"
+            for url in urls
+            for size in self.page_sizes
+        ] if paginate else urls
+
+        response = None
+        for url in variants:
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                response = getattr(self.client, method)(url, data, **extra)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400, getattr(response, 'data', None))
+            if paginate:
+                # A short page would hide per-row queries.
+                self.assertEqual(len(response.data['results']), int(url.rsplit('=', 1)[1]))
+        return response
@@ -0,0 +1,527 @@
+"""
+Tests for project-level infrastructure.
+"""
+
+import asyncio
+import json
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, router
+from django.http import HttpResponse
+from django.test import LiveServerTestCase, RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from accounts.authentication import CachedTokenAuthentication
+from accounts.deletion import request_account_deletion
+from accounts.models import CustomUser
+from posts.models import Comment, Like, Post
+from posts.renditions import get_executor, run_in_worker
+from posts.scheduling import publish_due_posts
+
+from . import fastjson, instrumentation, loadtest, throttling
+from .db_router import PIN_COOKIE, PrimaryReplicaRouter, ReadYourWritesMiddleware, use_primary
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_PRIMARY_STICKY_SECONDS=5)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """Tests for read/write routing and read-your-writes stickiness."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.routed = []
+
+        def view(request):
+            self.routed.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        self.middleware = ReadYourWritesMiddleware(view)
+
+    def test_router(self):
+        db_router = PrimaryReplicaRouter()
+        with use_primary(False):
+            self.assertEqual(db_router.db_for_read(Post), 'replica')
+        self.assertEqual(db_router.db_for_write(Post), 'default')
+        with use_primary():
+            self.assertEqual(db_router.db_for_read(Post), 'default')
+        self.assertTrue(db_router.allow_migrate('default', 'posts'))
+        self.assertFalse(db_router.allow_migrate('replica', 'posts'))
+
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(db_router.db_for_read(Post), 'default')
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        self.middleware(self.factory.get('/api/posts/'))
+        response = self.middleware(self.factory.post('/api/posts/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = self.factory.get('/api/posts/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.middleware(request)
+        self.assertEqual(self.routed, ['replica', 'default', 'default'])
+
+    def test_token_clients_without_cookies_stick_to_primary(self):
+        self.middleware(self.factory.post('/api/posts/', HTTP_AUTHORIZATION='Token abc'))
+        self.middleware(self.factory.get('/api/posts/', HTTP_AUTHORIZATION='Token abc'))
+        self.middleware(self.factory.get('/api/posts/', HTTP_AUTHORIZATION='Token other'))
+        self.assertEqual(self.routed, ['default', 'default', 'replica'])
+
+    async def test_async_views_see_the_pin_in_orm_threads(self):
+        async def view(request):
+            self.routed.append(await sync_to_async(router.db_for_read)(Post))
+            return HttpResponse()
+
+        middleware = ReadYourWritesMiddleware(view)
+        await middleware(self.factory.get('/api/posts/', HTTP_AUTHORIZATION='Token abc'))
+        await middleware(self.factory.post('/api/posts/', HTTP_AUTHORIZATION='Token abc'))
+        await middleware(self.factory.get('/api/posts/', HTTP_AUTHORIZATION='Token abc'))
+        self.assertEqual(self.routed, ['replica', 'default', 'default'])
+
+    def test_read_only_unsafe_requests_do_not_pin(self):
+        def view(request):
+            with use_primary(False):
+                self.routed.append(router.db_for_read(Post))
+            response = HttpResponse()
+            response.read_only = True
+            return response
+
+        response = ReadYourWritesMiddleware(view)(self.factory.post('/api/batch/', HTTP_AUTHORIZATION='Token abc'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.middleware(self.factory.get('/api/posts/', HTTP_AUTHORIZATION='Token abc'))
+        self.assertEqual(self.routed, ['replica', 'replica'])
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+        def view(request):
+            # Worker threads, such as the renditions pool, do not inherit the request's routing.
+            with ThreadPoolExecutor(1) as pool:
+                self.routed += [router.db_for_read(Post), pool.submit(router.db_for_read, Post).result()]
+            return HttpResponse()
+
+        ReadYourWritesMiddleware(view)(self.factory.get('/api/posts/'))
+        self.assertEqual(self.routed, ['replica', 'default'])
+
+    def test_expired_pin_reads_from_replica(self):
+        request = self.factory.get('/api/posts/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.middleware(request)
+        self.assertEqual(self.routed, ['replica'])
+
+
+
+@override_settings(DATABASE_REPLICAS=['lagging'])
+class ReplicaLagTests(APITransactionTestCase):
+    """
+    Background jobs read the rows they act on from the primary.
+
+    ``lagging`` is not a configured database, so any read routed to it
+    fails, as a replica missing recent writes would.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = CustomUser.objects.create_user(username='lagged', password='pw')
+
+    def test_publisher_and_account_purge(self):
+        Post.objects.create(
+            author=self.user, title='Due', content='x', is_published=False,
+            publish_at=datetime.now(dt_timezone.utc) - timedelta(minutes=1)
+        )
+        self.assertEqual(publish_due_posts(), 1)
+
+        request_account_deletion(self.user)
+        call_command('process_account_deletions', stdout=StringIO())
+        self.assertFalse(CustomUser.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Post.objects.exists())
+
+    def test_rendition_worker_started_from_a_replica_read(self):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200)).save(buffer, format='PNG')
+        post = Post.objects.create(author=self.user, title='Photo', content='x')
+        Post.objects.filter(pk=post.pk).update(image=default_storage.save('posts/images/a.png', buffer))
+
+        with use_primary(False):
+            get_executor().submit(run_in_worker, Post, post.pk, 'image', 'image_renditions').result()
+        post.refresh_from_db()
+        self.assertEqual(post.image_renditions['thumbnail']['width'], 150)
+
+
+class RequestMetricsTests(APITestCase):
+    """Tests for the per-request SQL/latency middleware and /metrics."""
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='metrics', password='pw')
+        post = Post.objects.create(author=user, title='Counted', content='x')
+        for index in range(3):
+            Comment.objects.create(post=post, author=user, content=str(index))
+        self.client.force_authenticate(user)
+
+    def test_server_timing_and_prometheus_output(self):
+        response = self.client.get(reverse('post-list'))
+        self.assertRegex(response['Server-Timing'], r'app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries')
+
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertRegex(body, r'http_requests_total\{view="post-list",method="GET",status="200"\} \d+')
+        self.assertRegex(body, r'http_request_db_queries_bucket\{view="post-list",le="\+Inf"\} \d+')
+        self.assertIn('post_counter_pending_posts', body)
+
+    def test_repeated_statements_are_counted(self):
+        recorder = instrumentation.QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for comment in Comment.objects.all():
+                comment.post.title
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(recorder.duplicates, 2)
+
+    async def test_async_requests_are_recorded(self):
+        # The async client runs the middleware chain in async mode.
+        response = await self.async_client.get(reverse('post-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries')
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0, METRICS_TOKEN='secret')
+    def test_unsampled_requests_and_metrics_token(self):
+        response = self.client.get(reverse('post-list'))
+        self.assertNotIn('db;', response['Server-Timing'])
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        for wrong in ('Bearer secre', 'Bearer s\u00e9cret'):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION=wrong).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+class LoadTestHarnessTests(LiveServerTestCase):
+    """Tests for the asyncio load harness."""
+
+    def test_sessions_against_live_server(self):
+        users = [CustomUser.objects.create_user(username=f'load{index}', password='pw') for index in range(2)]
+        users[0].follow(users[1])
+        users[1].follow(users[0])
+        for user in users:
+            Post.objects.create(author=user, title='Hello', content='Load')
+        accounts = [(user.id, Token.objects.get_or_create(user=user)[0].key) for user in users]
+
+        result = asyncio.run(loadtest.run_load(
+            self.live_server_url, accounts, concurrency=2, duration=0.5, comment_rate=1
+        ))
+        endpoints = result['endpoints']
+        self.assertEqual(
+            set(endpoints), {'feed', 'post-list', 'post-like', 'comment-create', 'notification-count'}
+        )
+        self.assertEqual(result['totals']['errors'], 0, endpoints)
+        self.assertLessEqual(endpoints['feed']['p50_ms'], endpoints['feed']['p99_ms'])
+        # Likes are toggled back at the end of each session.
+        self.assertFalse(Like.objects.exists())
+
+        slower = json.loads(json.dumps(result))
+        slower['endpoints']['feed']['p95_ms'] = endpoints['feed']['p95_ms'] * 2 + 1
+        self.assertEqual(loadtest.compare(result, result), [])
+        self.assertEqual(
+            [(endpoint, metric) for endpoint, metric, *_ in loadtest.compare(slower, result)],
+            [('feed', 'p95_ms')]
+        )
+
+
+class FastJSONTests(APITestCase):
+    """Tests for the orjson renderer and parser."""
+
+    def assertSameAsStdlib(self, data, accepted_media_type=None):
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(fastjson.ORJSONRenderer().render(data, accepted_media_type), expected)
+        return expected
+
+    def test_renders_like_json_renderer(self):
+        data = {
+            'utc': datetime(2024, 5, 1, 12, 30, 1, 250000, tzinfo=dt_timezone.utc),
+            'offset': datetime(2024, 5, 1, 12, 30, tzinfo=dt_timezone(timedelta(hours=2))),
+            'naive': datetime(2024, 5, 1, 12, 30),
+            'day': date(2024, 5, 1),
+            'price': Decimal('1.50'),
+            'lazy': gettext_lazy('Not found.'),
+            'id': uuid.UUID(int=1),
+            'duration': timedelta(minutes=2),
+            'text': 'caf\u00e9 \u2028 \U0001f600',
+            'ints': {1: 'one'},
+            'nested': [{'a': None, 'b': True, 'c': 1.5}],
+        }
+        self.assertSameAsStdlib(data)
+        self.assertSameAsStdlib(data, 'application/json; indent=4')
+        with mock.patch.object(fastjson, 'orjson', None):
+            self.assertSameAsStdlib(data)
+
+    def test_falls_back_to_stdlib_for_data_orjson_refuses(self):
+        self.assertSameAsStdlib({'big': 2 ** 64, 'small': -2 ** 70, 'ok': 2 ** 63 - 1})
+        with self.assertRaises(TypeError):
+            fastjson.ORJSONRenderer().render({'unknown': object()})
+
+    def test_float_spelling_differs_from_stdlib(self):
+        renderer = fastjson.ORJSONRenderer()
+        self.assertSameAsStdlib([0.1, -2.5, 1 / 3, 1e15, 0.0001])
+        self.assertEqual(renderer.render([1e16, 1e-05]), b'[1e16,0.00001]')
+        self.assertEqual(renderer.render([float('nan'), float('inf')]), b'[null,null]')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render([float('nan')])
+
+    def test_api_responses_are_unchanged(self):
+        user = CustomUser.objects.create_user(username='writer', password='pw')
+        post = Post.objects.create(author=user, title='T\u00eftle', content='Body #tag')
+        Comment.objects.create(post=post, author=user, content='Nice \u2029')
+        Like.objects.create(user=user, post=post)
+        self.client.force_authenticate(user)
+
+        response = self.client.get(reverse('post-detail', args=[post.id]))
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        response = self.client.post(
+            reverse('post-list'),
+            data=json.dumps({'title': 'New', 'content': 'Hello', 'author_id': user.id}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_parser(self):
+        parser = fastjson.ORJSONParser()
+        self.assertEqual(parser.parse(BytesIO(b'{"a": [1, "\xc3\xa9"]}')), {'a': [1, '\u00e9']})
+        for body in (b'{"a": ', b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                parser.parse(BytesIO(body))
+        with mock.patch.object(fastjson, 'orjson', None):
+            self.assertEqual(parser.parse(BytesIO(b'{"a": 1}')), {'a': 1})
+
+
+class BatchRequestTests(APITestCase):
+    """Tests for POST /api/batch/."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='batcher', password='pw')
+        author = CustomUser.objects.create_user(username='author', password='pw')
+        self.user.follow(author)
+        self.post = Post.objects.create(author=author, title='Hello', content='World')
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def batch(self, *requests, **options):
+        response = self.client.post(reverse('batch'), {'requests': list(requests), **options}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['responses']
+
+    def test_reads_match_individual_requests_with_one_authentication(self):
+        paths = ['/api/feed/', '/api/notifications/count/', '/api/auth/profile/', '/api/posts/?page_size=5']
+        expected = [self.client.get(path) for path in paths]
+        with mock.patch.object(
+            CachedTokenAuthentication, 'authenticate', autospec=True,
+            side_effect=CachedTokenAuthentication.authenticate
+        ) as authenticate:
+            responses = self.batch(*[{'path': path} for path in paths])
+        self.assertEqual(authenticate.call_count, 1)
+        self.assertEqual([entry['status'] for entry in responses], [200] * 4)
+        self.assertEqual([entry['body'] for entry in responses], [response.json() for response in expected])
+        self.assertEqual(responses[3]['headers']['ETag'], expected[3]['ETag'])
+
+        again = self.batch({'path': '/api/posts/?page_size=5', 'headers': {'If-None-Match': expected[3]['ETag']}})
+        self.assertEqual(again[0]['status'], 304)
+        self.assertIsNone(again[0]['body'])
+
+    def test_writes_run_in_order_and_are_seen_by_later_reads(self):
+        like = {'method': 'POST', 'path': f'/api/posts/{self.post.id}/like/'}
+        comment = {
+            'method': 'POST',
+            'path': '/api/comments/',
+            'body': {'post_id': self.post.id, 'author_id': self.user.id, 'content': 'Batched'}
+        }
+        detail = {'path': f'/api/posts/{self.post.id}/'}
+        responses = self.batch(like, comment, detail, concurrent=True)
+        self.assertEqual([entry['status'] for entry in responses], [200, 201, 200])
+        self.assertEqual(responses[2]['body']['likes_count'], 1)
+        self.assertEqual([c['content'] for c in responses[2]['body']['comments']], ['Batched'])
+
+    def test_follow_counts_are_not_shared_between_sub_requests(self):
+        other = CustomUser.objects.create_user(username='other', password='pw')
+        responses = self.batch(
+            {'method': 'POST', 'path': f'/api/auth/follow/{other.id}/'},
+            {'method': 'POST', 'path': f'/api/auth/unfollow/{other.id}/'},
+        )
+        self.assertEqual([entry['status'] for entry in responses], [200, 200])
+        self.assertEqual(responses[0]['body']['following_count'], 2)
+        self.assertEqual(responses[1]['body']['following_count'], 1)
+
+    def test_errors_are_reported_per_request(self):
+        responses = self.batch(
+            {'path': '/api/nowhere/'},
+            {'path': '/api/posts/999999/'},
+            {'method': 'POST', 'path': '/api/comments/', 'body': {'content': ''}},
+            {'method': 'POST', 'path': '/api/batch/', 'body': []},
+            {'path': '/api/auth/account/export/'},
+        )
+        self.assertEqual([entry['status'] for entry in responses], [404, 404, 400, 400, 400])
+        self.assertIn('post_id', responses[2]['body'])
+
+        for payload in ([], {'requests': 'nope'}, [{'path': 'no-slash'}], [{'path': '/', 'method': 'TRACE'}]):
+            response = self.client.post(reverse('batch'), payload, format='json')
+            self.assertEqual(response.status_code, 400, payload)
+        with override_settings(BATCH_MAX_REQUESTS=2):
+            response = self.client.post(reverse('batch'), [{'path': '/api/feed/'}] * 3, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_anonymous_sub_requests_get_their_own_permission_checks(self):
+        self.client.credentials()
+        response = self.client.post(
+            reverse('batch'), [{'path': '/api/posts/'}, {'path': '/api/feed/'}], format='json'
+        )
+        self.assertEqual([entry['status'] for entry in response.json()['responses']], [200, 401])
+
+
+class ConcurrentBatchTests(APITransactionTestCase):
+    """Concurrent batches see committed data from worker threads."""
+
+    def test_concurrent_reads_match_sequential(self):
+        user = CustomUser.objects.create_user(username='batcher', password='pw')
+        for index in range(3):
+            Post.objects.create(author=user, title=f'Post {index}', content='x')
+        self.client.force_authenticate(user)
+        requests = [{'path': path} for path in (
+            '/api/posts/', '/api/feed/', '/api/notifications/count/', '/api/auth/profile/', '/api/comments/'
+        )]
+        sequential = self.client.post(reverse('batch'), requests, format='json').json()
+        concurrent = self.client.post(
+            reverse('batch'), {'requests': requests, 'concurrent': True}, format='json'
+        ).json()
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual([entry['status'] for entry in concurrent['responses']], [200] * 5)
+
+
+class TokenBucketThrottleTests(APITestCase):
+    """Tests for the per-user and per-IP token-bucket throttles."""
+
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+        self.users = [CustomUser.objects.create_user(username=f'bucket{index}', password='pw') for index in range(2)]
+        self.post = Post.objects.create(author=self.users[1], title='Hello', content='World')
+        self.now = 1_000_000.0
+        patcher = mock.patch.object(throttling.time, 'time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def rates(self, **rates):
+        return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+    def like(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('post-like', args=[self.post.id]))
+
+    def test_bucket_allows_a_burst_then_refills_evenly(self):
+        with self.rates(like='3/min'):
+            self.assertEqual([self.like(self.users[0]).status_code for _ in range(3)], [200] * 3)
+            response = self.like(self.users[0])
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '20')
+            # Another user has a bucket of their own.
+            self.assertEqual(self.like(self.users[1]).status_code, 200)
+
+            self.now += 10
+            response = self.like(self.users[0])
+            self.assertEqual((response.status_code, response['Retry-After']), (429, '10'))
+            # Rejected requests spend nothing: one token is back after 20s.
+            self.now += 10
+            self.assertEqual(self.like(self.users[0]).status_code, 200)
+            self.assertEqual(self.like(self.users[0]).status_code, 429)
+
+            # An idle bucket refills to its capacity, not beyond.
+            self.now += 3600
+            self.assertEqual([self.like(self.users[0]).status_code for _ in range(4)], [200, 200, 200, 429])
+
+    def test_concurrent_requests_on_an_idle_bucket_each_spend_one_token(self):
+        bucket_cache = caches[settings.THROTTLE_CACHE]
+
+        class InterleavingCache:
+            """Hand over to other threads after every cache call."""
+            def __getattr__(self, name):
+                def call(*args, **kwargs):
+                    result = getattr(bucket_cache, name)(*args, **kwargs)
+                    time.sleep(0.002)
+                    return result
+                return call
+
+        view = SimpleNamespace(throttle_scope='like')
+        request = SimpleNamespace(user=self.users[0], META={'REMOTE_ADDR': '127.0.0.1'})
+        barrier = threading.Barrier(3)
+
+        def like(_):
+            barrier.wait()
+            return throttling.UserTokenBucketThrottle().allow_request(request, view)
+
+        with self.rates(like='120/min'):
+            self.assertTrue(throttling.UserTokenBucketThrottle().allow_request(request, view))
+            self.now += 30
+            with mock.patch.object(throttling, 'throttle_cache', InterleavingCache), ThreadPoolExecutor(3) as pool:
+                self.assertEqual(list(pool.map(like, range(3))), [True] * 3)
+            # The refill happened once: 117 of the 120 tokens are left.
+            allowed = 0
+            while throttling.UserTokenBucketThrottle().allow_request(request, view):
+                allowed += 1
+            self.assertEqual(allowed, 117)
+
+    def test_ip_bucket_is_shared_by_accounts(self):
+        with self.rates(search='5/min', **{'search-ip': '3/min'}):
+            statuses = []
+            for index in range(4):
+                self.client.force_authenticate(self.users[index % 2])
+                statuses.append(self.client.get(reverse('user_search'), {'q': 'bucket'}).status_code)
+            self.assertEqual(statuses, [200, 200, 200, 429])
+            response = self.client.get(reverse('user_search'), {'q': 'bucket'}, REMOTE_ADDR='10.0.0.9')
+            self.assertEqual(response.status_code, 200)
+
+    def test_only_comment_creation_is_throttled(self):
+        self.client.force_authenticate(self.users[0])
+        data = {'post_id': self.post.id, 'author_id': self.users[0].id, 'content': 'Hi'}
+        with self.rates(comment='1/min'):
+            self.assertEqual(self.client.post(reverse('comment-list'), data).status_code, 201)
+            self.assertEqual(self.client.post(reverse('comment-list'), data).status_code, 429)
+            self.assertEqual(self.client.get(reverse('comment-list')).status_code, 200)
+        # Scopes without a rate are not throttled.
+        with self.rates():
+            self.assertEqual(self.client.post(reverse('comment-list'), data).status_code, 201)
+
+    def test_follow_endpoints_share_a_budget(self):
+        self.client.force_authenticate(self.users[0])
+        with self.rates(follow='2/min'):
+            self.assertEqual(self.client.post(reverse('follow_user', args=[self.users[1].id])).status_code, 200)
+            self.assertEqual(self.client.post(reverse('unfollow_user', args=[self.users[1].id])).status_code, 200)
+            self.assertEqual(self.client.post(reverse('follow_user', args=[self.users[1].id])).status_code, 429)
+
+    def test_check_costs_well_under_a_millisecond(self):
+        throttle = throttling.UserTokenBucketThrottle()
+        view = mock.Mock(throttle_scope='like')
+        request = mock.Mock(user=self.users[0])
+        with self.rates(like='1000000/s'):
+            started = time.perf_counter()
+            for _ in range(1000):
+                self.assertTrue(throttle.allow_request(request, view))
+            self.assertLess((time.perf_counter() - started) / 1000, 0.001)
@@ -0,0 +1,121 @@
+"""
+Token-bucket throttles for endpoints that write or search.
+
+DRF's ``SimpleRateThrottle`` stores a list of request timestamps per client
+and reads, trims and rewrites it on every request. A token bucket needs a
+single integer. Here it is the bucket's "theoretical arrival time" in
+milliseconds (the GCRA formulation), stored with a version tag. Spending a
+token is a compare-and-set: the request first wins ``cache.add`` on a
+claim key for the version it read, which every cache backend does
+atomically, and only then writes the new state. A request that loses
+reads the bucket again. So concurrent requests can neither both spend the
+last token nor both apply a refill. An allowed request makes three cache
+calls, a rejected one makes a single read.
+
+Budgets are DRF-style ``'<tokens>/<period>'`` strings in
+``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']``, looked up by the view's
+``throttle_scope``: the bucket holds that many tokens and refills them
+evenly over the period. ``UserTokenBucketThrottle`` keeps a bucket per
+user (per IP for anonymous clients) and ``IPTokenBucketThrottle`` one per
+client IP under the ``<scope>-ip`` rate, so an address cycling through
+accounts is capped too. Scopes without a rate are not throttled.
+
+Buckets live in the ``THROTTLE_CACHE`` alias, a LocMemCache by default,
+so budgets apply per worker process and a check costs microseconds.
+Point the alias at a shared cache to enforce budgets across workers.
+"""
+
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Return (tokens, period in seconds) for a rate such as ``'30/min'``."""
+    tokens, period = rate.split('/')
+    return int(tokens), PERIODS[period[0]]
+
+
+def new_version():
+    return secrets.token_hex(8)
+
+
+def throttle_cache():
+    return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Allow bursts of up to N requests, refilled at N per period."""
+    scope_suffix = ''
+    # Compare-and-set retries before a request is rejected.
+    max_attempts = 10
+    # Seconds a claim on a bucket version is kept; the claimer replaces
+    # the bucket right after taking it.
+    claim_timeout = 5
+
+    def get_bucket(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f'{scope}{self.scope_suffix}') if scope else None
+        if rate is None:
+            return True
+
+        tokens, period = parse_rate(rate)
+        interval = period * 1000 // tokens
+        capacity = interval * tokens
+        key = f'throttle:{scope}{self.scope_suffix}:{self.get_bucket(request)}'
+        cache = throttle_cache()
+
+        for _ in range(self.max_attempts):
+            now = int(time.time() * 1000)
+            state = cache.get(key)
+            if state is None:
+                # No bucket yet, so it is full.
+                if cache.add(key, (new_version(), now + interval), period + 1):
+                    return True
+                continue
+            version, tat = state
+            # An idle bucket refills up to its capacity, not beyond.
+            tat = max(tat, now) + interval
+            if tat - now > capacity:
+                self.retry_after = (tat - now - capacity) / 1000
+                return False
+            # Only one request may replace this version of the bucket.
+            if cache.add(f'{key}:{version}', 1, self.claim_timeout):
+                cache.set(key, (new_version(), tat), period + 1)
+                return True
+        # Still losing races to this client's other requests: turn it away.
+        self.retry_after = interval / 1000
+        return False
+
+    def wait(self):
+        return getattr(self, 'retry_after', None)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per authenticated user, or per IP for anonymous clients."""
+
+    def get_bucket(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per client IP, budgeted by the ``<scope>-ip`` rate."""
+    scope_suffix = '-ip'
+
+    def get_bucket(self, request):
+        return f'ip:{self.get_ident(request)}'
+
+
+BUCKET_THROTTLES = [UserTokenBucketThrottle, IPTokenBucketThrottle]
@@ -3,11 +3,16 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .batch import BatchView
+from .instrumentation import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('accounts.urls')),
+    path('api/batch/', BatchView.as_view(), name='batch'),
     path('api/', include('posts.urls')),
     path('api/notifications/', include('notifications.urls')),  # Add this line
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development